@@ -8,16 +8,21 @@ Features:
 - RESTful API endpoints
 """
 from flask import Flask, jsonify, render_template
-from decouple import config
+from decouple import config, Csv
+from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
 import os
 
 # Import database
-from models import db, init_db
+from models import db, init_db, init_replicas
 
 # Import blueprints
 from routes.api import api_bp
 from routes.database import db_bp
+from utils.search_index import init_search_index
+from utils.admission import init_admission
+from utils.memory_profile import init_memory_profiling
+from utils.summaries import init_summaries
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,8 +46,111 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Optional read replicas (comma-separated URLs) for GET endpoints
+    app.config['SQLALCHEMY_REPLICA_URIS'] = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+    app.config['SQLALCHEMY_REPLICA_STRATEGY'] = config('DATABASE_REPLICA_STRATEGY', default='round_robin')
+    app.config['SQLALCHEMY_REPLICA_EJECT_SECONDS'] = config('DATABASE_REPLICA_EJECT_SECONDS', default=30.0, cast=float)
+    app.config['SQLALCHEMY_REPLICA_STICKY_SECONDS'] = config('DATABASE_REPLICA_STICKY_SECONDS', default=5.0, cast=float)
+    
+    # PowerPoint parsing runs in sandboxed worker processes so it doesn't stall request threads (0 = inline)
+    app.config['PARSE_EXECUTOR_WORKERS'] = config('PARSE_EXECUTOR_WORKERS', default=1, cast=int)
+    app.config['PARSE_TIMEOUT_SECONDS'] = config('PARSE_TIMEOUT_SECONDS', default=300.0, cast=float)
+    # Limits for untrusted uploads (0 disables a limit); workers are replaced after PARSE_WORKER_MAX_JOBS parses
+    app.config['PARSE_CPU_SECONDS'] = config('PARSE_CPU_SECONDS', default=120, cast=int)
+    app.config['PARSE_MAX_RSS_MB'] = config('PARSE_MAX_RSS_MB', default=1024, cast=int)
+    app.config['PARSE_MAX_UNCOMPRESSED_MB'] = config('PARSE_MAX_UNCOMPRESSED_MB', default=500, cast=int)
+    app.config['PARSE_MAX_SLIDES'] = config('PARSE_MAX_SLIDES', default=2000, cast=int)
+    app.config['PARSE_MAX_ZIP_ENTRIES'] = config('PARSE_MAX_ZIP_ENTRIES', default=20000, cast=int)
+    app.config['PARSE_WORKER_MAX_JOBS'] = config('PARSE_WORKER_MAX_JOBS', default=50, cast=int)
+    # Append speaker notes to each slide's text and links
+    app.config['PARSE_INCLUDE_NOTES'] = config('PARSE_INCLUDE_NOTES', default=False, cast=bool)
+    
+    # Optional PostgreSQL partitioning of slides and URLs: none, hash (by file_id) or month
+    app.config['DB_PARTITIONING'] = config('DB_PARTITIONING', default='none')
+    app.config['DB_PARTITION_COUNT'] = config('DB_PARTITION_COUNT', default=8, cast=int)
+    app.config['DB_PARTITION_MONTHS_AHEAD'] = config('DB_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+    
+    # Slide bodies at least this long are stored zlib-compressed in slide_texts (0 = never)
+    app.config['SLIDE_TEXT_COMPRESS_MIN_CHARS'] = config('SLIDE_TEXT_COMPRESS_MIN_CHARS', default=0, cast=int)
+    
+    # Link health checks (scripts/check_links.py)
+    app.config['LINK_CHECK_TTL_SECONDS'] = config('LINK_CHECK_TTL_SECONDS', default=86400, cast=int)
+    app.config['LINK_CHECK_CONCURRENCY'] = config('LINK_CHECK_CONCURRENCY', default=50, cast=int)
+    app.config['LINK_CHECK_PER_DOMAIN'] = config('LINK_CHECK_PER_DOMAIN', default=4, cast=int)
+    app.config['LINK_CHECK_TIMEOUT_SECONDS'] = config('LINK_CHECK_TIMEOUT_SECONDS', default=10.0, cast=float)
+    app.config['LINK_CHECK_BATCH_SIZE'] = config('LINK_CHECK_BATCH_SIZE', default=500, cast=int)
+    # Let checks reach loopback, private and link-local addresses (e.g. an intranet); off for uploads from anyone
+    app.config['LINK_CHECK_ALLOW_PRIVATE'] = config('LINK_CHECK_ALLOW_PRIVATE', default=False, cast=bool)
+    
+    # MinHash/LSH near-duplicate index (changing NUM_PERM or BANDS requires scripts/build_similarity_index.py --rebuild)
+    app.config['SIMILARITY_INDEX_ENABLED'] = config('SIMILARITY_INDEX_ENABLED', default=True, cast=bool)
+    app.config['SIMILARITY_NUM_PERM'] = config('SIMILARITY_NUM_PERM', default=128, cast=int)
+    app.config['SIMILARITY_BANDS'] = config('SIMILARITY_BANDS', default=16, cast=int)
+    
+    # TF-IDF search index, memory-mapped from disk and shared by all workers on the host
+    # (changing NUM_FEATURES requires scripts/build_search_index.py)
+    app.config['SEARCH_INDEX_ENABLED'] = config('SEARCH_INDEX_ENABLED', default=True, cast=bool)
+    app.config['SEARCH_INDEX_DIR'] = config('SEARCH_INDEX_DIR', default='/tmp/search_index')
+    app.config['SEARCH_NUM_FEATURES'] = config('SEARCH_NUM_FEATURES', default=1 << 20, cast=int)
+    app.config['SEARCH_COMPACT_INTERVAL_SECONDS'] = config('SEARCH_COMPACT_INTERVAL_SECONDS', default=300, cast=float)
+    
+    # Resumable chunked uploads (POST /db/uploads); abandoned sessions are removed after the TTL
+    app.config['UPLOAD_SESSION_DIR'] = config('UPLOAD_SESSION_DIR', default='/tmp/uploads/sessions')
+    app.config['UPLOAD_SESSION_TTL_SECONDS'] = config('UPLOAD_SESSION_TTL_SECONDS', default=86400, cast=int)
+    app.config['UPLOAD_MAX_BYTES'] = config('UPLOAD_MAX_BYTES', default=1 << 30, cast=int)
+    app.config['UPLOAD_CHUNK_MAX_BYTES'] = config('UPLOAD_CHUNK_MAX_BYTES', default=64 << 20, cast=int)
+    
+    # Admission control: per-path concurrency limits and per-client token buckets (count/seconds).
+    # Limited requests share ADMISSION_HEAVY_SLOTS threads per worker; the rest of the threads stay
+    # free for health checks and cheap reads. Over-limit requests get 429/503 with Retry-After.
+    app.config['ADMISSION_ENABLED'] = config('ADMISSION_ENABLED', default=True, cast=bool)
+    app.config['ADMISSION_CONCURRENCY'] = config(
+        'ADMISSION_CONCURRENCY',
+        default='POST /db/upload=2,/db/uploads=4,/db/test-parse=2,/db/table/presentation_slides=2',
+        cast=Csv()
+    )
+    app.config['ADMISSION_RATE_LIMITS'] = config(
+        'ADMISSION_RATE_LIMITS',
+        default='POST /db/upload=20/60,/db/test-parse=20/60,/db/table/presentation_slides=60/60',
+        cast=Csv()
+    )
+    app.config['GUNICORN_THREADS'] = config('GUNICORN_THREADS', default=8, cast=int)
+    app.config['ADMISSION_HEAVY_SLOTS'] = config(
+        'ADMISSION_HEAVY_SLOTS', default=max(1, app.config['GUNICORN_THREADS'] - 2), cast=int
+    )
+    app.config['ADMISSION_QUEUE_TIMEOUT_SECONDS'] = config('ADMISSION_QUEUE_TIMEOUT_SECONDS', default=0.0, cast=float)
+    app.config['ADMISSION_RETRY_AFTER_SECONDS'] = config('ADMISSION_RETRY_AFTER_SECONDS', default=2, cast=int)
+    
+    # Number of reverse proxies in front of the app whose X-Forwarded-For is trusted (0 trusts none).
+    # Client addresses (admission buckets, logs) come from the entry that many hops from the right.
+    app.config['PROXY_FIX_X_FOR'] = config('PROXY_FIX_X_FOR', default=0, cast=int)
+    
+    # Memory profiling of uploads (tracemalloc snapshots per phase, peak RSS); slows allocation-heavy code.
+    # Profiles are served by GET /api/admin/memory, which requires ADMIN_API_TOKEN.
+    app.config['MEMORY_PROFILE_ENABLED'] = config('MEMORY_PROFILE_ENABLED', default=False, cast=bool)
+    app.config['MEMORY_PROFILE_TOP'] = config('MEMORY_PROFILE_TOP', default=10, cast=int)
+    app.config['MEMORY_PROFILE_FRAMES'] = config('MEMORY_PROFILE_FRAMES', default=1, cast=int)
+    app.config['MEMORY_PROFILE_KEEP'] = config('MEMORY_PROFILE_KEEP', default=20, cast=int)
+    app.config['ADMIN_API_TOKEN'] = config('ADMIN_API_TOKEN', default='')
+    
+    # Columnar snapshot exports (scripts/export_snapshot.py); downloads require EXPORT_API_TOKEN
+    app.config['EXPORT_DIR'] = config('EXPORT_DIR', default='/tmp/exports')
+    app.config['EXPORT_FORMAT'] = config('EXPORT_FORMAT', default='parquet')
+    app.config['EXPORT_COMPRESSION'] = config('EXPORT_COMPRESSION', default='zstd')
+    app.config['EXPORT_BATCH_SIZE'] = config('EXPORT_BATCH_SIZE', default=10000, cast=int)
+    app.config['EXPORT_WATERMARK_WAIT_SECONDS'] = config('EXPORT_WATERMARK_WAIT_SECONDS', default=60, cast=float)
+    app.config['EXPORT_API_TOKEN'] = config('EXPORT_API_TOKEN', default='')
+    
+    if app.config['PROXY_FIX_X_FOR'] > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
     # Initialize database
     init_db(app)
+    init_replicas(app)
+    init_summaries(app)
+    init_search_index(app)
+    init_admission(app)
+    init_memory_profiling(app)
     
     # Register blueprints
     app.register_blueprint(api_bp)
@@ -0,0 +1,19 @@
+"""
+Gunicorn configuration
+
+The default `gthread` worker class serves each request on a thread, so a slow
+database read or upload only ties up one thread instead of a whole process.
+Set GUNICORN_WORKER_CLASS=sync to get the previous one-request-per-process
+behaviour (e.g. when benchmarking with scripts/bench_concurrency.py).
+"""
+# Gunicorn treats every module-level name as a setting, and `config` is one,
+# so decouple is imported as a module rather than `from decouple import config`
+import decouple
+import multiprocessing
+
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:5000')
+worker_class = decouple.config('GUNICORN_WORKER_CLASS', default='gthread')
+workers = decouple.config('GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=8, cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=120, cast=int)
+keepalive = decouple.config('GUNICORN_KEEPALIVE', default=5, cast=int)
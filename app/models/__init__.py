@@ -1,5 +1,9 @@
 # Models module for data structures and ML models
 from .database import db, init_db
-from .tables import PresentationFile, PresentationSlide, SlideUrl
+from .tables import (PresentationFile, PresentationSlide, SlideText, SlideUrl, LinkStatus, TextSignature, TextLshBucket,
+                     FileSummary, FileDomain, DomainSummary, SummaryTotals)
+from .replicas import init_replicas, read_session
 
-__all__ = ['db', 'init_db', 'PresentationFile', 'PresentationSlide', 'SlideUrl']
+__all__ = ['db', 'init_db', 'PresentationFile', 'PresentationSlide', 'SlideText', 'SlideUrl', 'LinkStatus',
+           'TextSignature', 'TextLshBucket', 'FileSummary', 'FileDomain', 'DomainSummary', 'SummaryTotals',
+           'init_replicas', 'read_session']
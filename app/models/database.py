@@ -1,15 +1,124 @@
 """Database configuration and initialization"""
+from contextlib import contextmanager
+import time
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 db = SQLAlchemy()
 
+# Dialects whose insert() supports ON CONFLICT clauses, for bulk insert-if-absent and upserts
+DIALECT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert
+}
+
+# pg_advisory_lock key that serializes schema changes between workers starting at the same time
+SCHEMA_LOCK_ID = 0x70707478
+SCHEMA_LOCK_POLL_SECONDS = 0.5
+
+@contextmanager
+def schema_lock(engine):
+    """
+    Hold a PostgreSQL advisory lock while checking and changing the schema.
+
+    Every gunicorn worker runs init_db on boot. With the lock, the first one
+    makes any changes and the others find nothing left to do, instead of
+    racing on the same DDL. Other databases have a single writer process.
+    """
+    if engine.dialect.name != 'postgresql':
+        yield
+        return
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        # Poll instead of blocking in pg_advisory_lock: a waiting statement counts as a running
+        # transaction, which CREATE INDEX CONCURRENTLY in the lock holder would wait for
+        while not conn.execute(text('SELECT pg_try_advisory_lock(:id)'), {'id': SCHEMA_LOCK_ID}).scalar():
+            time.sleep(SCHEMA_LOCK_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': SCHEMA_LOCK_ID})
+
+def create_missing_index(index):
+    """
+    Create ``index`` on an existing table without blocking writes where possible.
+
+    PostgreSQL builds it CONCURRENTLY, which can't run in a transaction or on
+    a partitioned parent table; an interrupted concurrent build leaves an
+    invalid index behind, so it is dropped again before the error is raised.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        with engine.begin() as conn:
+            index.create(conn, checkfirst=True)
+        return
+    columns = ', '.join(column.name for column in index.columns)
+    unique = 'UNIQUE ' if index.unique else ''
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        partitioned = conn.execute(text(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(:table AS regclass)"
+        ), {'table': index.table.name}).scalar()
+        concurrently = '' if partitioned else 'CONCURRENTLY '
+        try:
+            conn.execute(text(
+                f'CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} ON {index.table.name} ({columns})'
+            ))
+        except Exception:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+            raise
+
+def add_missing_columns():
+    """
+    Add nullable columns that models gained after their table was created.
+
+    There is no migration tool in this project and ``create_all`` never alters
+    existing tables, so new optional columns are added here on startup, with
+    the foreign key they declare. Indexes the models declare are created when
+    missing, which also repairs columns added before this function created them.
+    Call it under schema_lock(); an up-to-date schema issues no DDL at all.
+    """
+    inspector = inspect(db.engine)
+    missing_indexes = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                definition = f'{column.name} {column.type.compile(dialect=db.engine.dialect)}'
+                for fk in column.foreign_keys:
+                    definition += f' REFERENCES {fk.column.table.name} ({fk.column.name})'
+                    if fk.ondelete:
+                        definition += f' ON DELETE {fk.ondelete}'
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {definition}'))
+                print(f"✅ Added column {table.name}.{column.name}")
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            missing_indexes += [index for index in table.indexes if index.name not in existing_indexes]
+    # After the column changes commit, so their brief exclusive locks aren't held during index builds
+    for index in missing_indexes:
+        create_missing_index(index)
+        print(f"✅ Added index {index.name}")
+
 def init_db(app: Flask):
     """Initialize database with Flask app"""
+    from .partitioning import ensure_partitioned_tables
+    
     db.init_app(app)
     
-    with app.app_context():
+    with app.app_context(), schema_lock(db.engine):
+        # Partitioned tables (if enabled) must exist before create_all makes plain ones
+        ensure_partitioned_tables(
+            db.engine,
+            app.config.get('DB_PARTITIONING', 'none'),
+            partition_count=app.config.get('DB_PARTITION_COUNT', 8),
+            months_ahead=app.config.get('DB_PARTITION_MONTHS_AHEAD', 3)
+        )
+        
         # Create all tables
         db.create_all()
+        add_missing_columns()
         print("✅ Database tables created")
-
@@ -0,0 +1,221 @@
+"""Optional PostgreSQL declarative partitioning for presentation_slides and slide_urls
+
+Two schemes are supported:
+- ``hash``: both tables are hash-partitioned on ``file_id``, so every row of an
+  upload lives in one partition and deleting a file touches only that partition.
+- ``month``: both tables are range-partitioned on ``created_at`` by month. Ingest
+  stamps slides and URLs with the file's ``uploaded_at``, so an upload lands in a
+  single month and retention becomes a partition detach/drop.
+
+The partitioned DDL is derived from the ORM tables, so the models stay the
+single source of truth and keep working unpartitioned (e.g. on SQLite).
+"""
+from datetime import date, datetime
+from sqlalchemy import MetaData, PrimaryKeyConstraint, ForeignKeyConstraint, inspect, select, text
+import logging
+
+from .tables import PresentationFile, PresentationSlide, SlideText, SlideUrl
+
+logger = logging.getLogger(__name__)
+
+SCHEMES = ('none', 'hash', 'month')
+PARTITIONED_TABLES = (PresentationSlide.__tablename__, SlideUrl.__tablename__)
+
+
+def partition_key(scheme: str) -> str:
+    """Column both tables are partitioned on"""
+    return 'file_id' if scheme == 'hash' else 'created_at'
+
+
+def month_bounds(value):
+    """First day of the month containing ``value`` and of the following month"""
+    start = date(value.year, value.month, 1)
+    end = date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return start, end
+
+
+def prune_filters(model, presentation_file, scheme: str):
+    """
+    WHERE clauses that restrict a query on ``model`` to one upload's partition.
+
+    ``file_id`` alone prunes hash partitions; month partitions additionally need
+    the upload's month range as constants.
+    """
+    filters = [model.file_id == presentation_file.id]
+    if scheme == 'month' and presentation_file.uploaded_at:
+        start, end = month_bounds(presentation_file.uploaded_at)
+        filters += [model.created_at >= start, model.created_at < end]
+    return filters
+
+
+def _partitioned_tables(scheme: str):
+    """Copies of the ORM tables with partition-compatible keys and PARTITION BY clauses"""
+    key = partition_key(scheme)
+    meta = MetaData()
+    # Referenced tables are copied too so the foreign keys can be compiled
+    PresentationFile.__table__.to_metadata(meta)
+    SlideText.__table__.to_metadata(meta)
+    slides = PresentationSlide.__table__.to_metadata(meta)
+    urls = SlideUrl.__table__.to_metadata(meta)
+
+    for table in (slides, urls):
+        # PostgreSQL requires the partition key in every unique constraint
+        table.c[key].nullable = False
+        table.c[key].primary_key = True
+        table.c.id.autoincrement = True
+        table.append_constraint(PrimaryKeyConstraint('id', key))
+        if scheme == 'hash':
+            table.dialect_kwargs['postgresql_partition_by'] = f'HASH ({key})'
+        else:
+            table.dialect_kwargs['postgresql_partition_by'] = f'RANGE ({key})'
+
+    # slide_urls can't reference presentation_slides(id) once id alone isn't unique
+    for fk in list(urls.foreign_key_constraints):
+        if fk.referred_table is slides:
+            urls.constraints.discard(fk)
+            for column in fk.columns:
+                column.foreign_keys.difference_update(fk.elements)
+    if scheme == 'hash':
+        urls.append_constraint(ForeignKeyConstraint(
+            ['slide_id', 'file_id'], ['presentation_slides.id', 'presentation_slides.file_id'],
+            ondelete='CASCADE'
+        ))
+    # Under the month scheme URLs are removed with their slides' partition or by
+    # the bulk deletes in routes/database.py instead of a database-level cascade
+
+    return meta, [slides, urls]
+
+
+def range_partitioned_tables(conn):
+    """Which of PARTITIONED_TABLES are range-partitioned; tables created before partitioning was enabled are plain"""
+    return set(conn.execute(text(
+        "SELECT c.relname FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE p.partstrat = 'r' AND c.relname = ANY(:tables)"
+    ), {'tables': list(PARTITIONED_TABLES)}).scalars())
+
+
+def ensure_month_partitions(conn, months_ahead: int = 3, start=None):
+    """
+    Create month partitions from ``start`` (default: this month) through ``months_ahead`` later.
+
+    Returns:
+        list: The tables that got partitions; plain or hash-partitioned tables are skipped
+    """
+    tables = [table for table in PARTITIONED_TABLES if table in range_partitioned_tables(conn)]
+    skipped = [table for table in PARTITIONED_TABLES if table not in tables]
+    if skipped:
+        logger.warning(f"Tables {skipped} are not range-partitioned; no month partitions created for them")
+    month, _ = month_bounds(start or datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        _, next_month = month_bounds(month)
+        for table in tables:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_y{month.year}m{month.month:02d} "
+                f"PARTITION OF {table} FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            ))
+        month = next_month
+    return tables
+
+
+def ensure_partitioned_tables(engine, scheme: str, partition_count: int = 8, months_ahead: int = 3):
+    """
+    Create partitioned presentation_slides and slide_urls tables if they don't exist yet.
+
+    Must run before ``db.create_all()``, which would otherwise create them as
+    plain heap tables. Existing tables are left alone: converting a populated
+    table needs a manual copy into a fresh partitioned table.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown partitioning scheme '{scheme}', expected one of {SCHEMES}")
+    if scheme == 'none':
+        return False
+    if engine.dialect.name != 'postgresql':
+        logger.warning(f"Partitioning scheme '{scheme}' needs PostgreSQL; using plain tables on {engine.dialect.name}")
+        return False
+
+    inspector = inspect(engine)
+    existing = [name for name in PARTITIONED_TABLES if inspector.has_table(name)]
+    if existing:
+        logger.info(f"Tables {existing} already exist; leaving their storage layout unchanged")
+        if scheme == 'month':
+            with engine.begin() as conn:
+                ensure_month_partitions(conn, months_ahead)
+        return False
+
+    PresentationFile.__table__.create(bind=engine, checkfirst=True)
+    SlideText.__table__.create(bind=engine, checkfirst=True)
+    meta, tables = _partitioned_tables(scheme)
+    with engine.begin() as conn:
+        meta.create_all(bind=conn, tables=tables)
+        for table in PARTITIONED_TABLES:
+            if scheme == 'hash':
+                for remainder in range(partition_count):
+                    conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {table}_p{remainder} PARTITION OF {table} "
+                        f"FOR VALUES WITH (MODULUS {partition_count}, REMAINDER {remainder})"
+                    ))
+            else:
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+        if scheme == 'month':
+            ensure_month_partitions(conn, months_ahead)
+
+    logger.info(f"Created {scheme}-partitioned tables {list(PARTITIONED_TABLES)}")
+    return True
+
+
+def list_month_partitions(conn, table: str):
+    """Month partitions of ``table`` as (partition_name, month_start) sorted by month"""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {'table': table}).scalars()
+    partitions = []
+    prefix = f'{table}_y'
+    for name in rows:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split('m')
+            partitions.append((name, date(int(year), int(month), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_months_before(engine, cutoff: date):
+    """
+    Retention for the month scheme: drop every month partition older than ``cutoff``.
+
+    Whole partitions are detached and dropped instead of deleting row by row;
+    stragglers in the default partition and the matching presentation_files
+    rows are deleted afterwards, after taking the files out of the dashboard
+    summaries in the same transaction.
+
+    Returns:
+        dict: partition names dropped per table and presentation_files rows deleted
+    """
+    cutoff, _ = month_bounds(cutoff)
+    dropped = {}
+    with engine.begin() as conn:
+        # URLs first: slide_urls partitions hold no FK into presentation_slides, but keep the logical order
+        for table in reversed(PARTITIONED_TABLES):
+            dropped[table] = []
+            for name, month in list_month_partitions(conn, table):
+                if month >= cutoff:
+                    continue
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped[table].append(name)
+            conn.execute(text(f"DELETE FROM {table} WHERE created_at < :cutoff"), {'cutoff': cutoff})
+        # Summary rows reference the files, and the totals must drop in the same transaction
+        from utils.summaries import record_bulk_delete  # utils.summaries imports models
+        expiring = select(PresentationFile.id).where(PresentationFile.uploaded_at < cutoff)
+        record_bulk_delete(conn, expiring)
+        result = conn.execute(text("DELETE FROM presentation_files WHERE uploaded_at < :cutoff"), {'cutoff': cutoff})
+        dropped['presentation_files'] = result.rowcount
+        # Shared slide bodies that no remaining slide references, index entries first
+        orphaned = "NOT EXISTS (SELECT 1 FROM presentation_slides s WHERE s.text_hash = {column})"
+        for table in ('text_lsh_buckets', 'text_signatures'):
+            conn.execute(text(f"DELETE FROM {table} x WHERE " + orphaned.format(column='x.text_hash')))
+        result = conn.execute(text("DELETE FROM slide_texts t WHERE " + orphaned.format(column='t.hash')))
+        dropped['slide_texts'] = result.rowcount
+    logger.info(f"Dropped partitions older than {cutoff.isoformat()}: {dropped}")
+    return dropped
@@ -0,0 +1,175 @@
+"""Read-replica routing for read-only queries"""
+from flask import Flask, current_app, g, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+import itertools
+import logging
+import threading
+import time
+
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('round_robin', 'least_connections')
+PRIMARY_COOKIE = 'db_read_primary_until'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+class Replica:
+    """A read-only database engine plus its health and load state"""
+
+    def __init__(self, url: str, engine_options: dict = None):
+        self.url = url
+        self.engine = create_engine(url, pool_pre_ping=True, **(engine_options or {}))
+        self.in_flight = 0
+        self.ejected_until = 0.0
+        self.failures = 0
+
+    def is_available(self, now: float) -> bool:
+        """Ejected replicas become eligible again once their cooldown expires"""
+        return self.ejected_until <= now
+
+    def to_dict(self):
+        return {
+            'url': self.engine.url.render_as_string(hide_password=True),
+            'in_flight': self.in_flight,
+            'failures': self.failures,
+            'ejected': self.ejected_until > time.time()
+        }
+
+
+class ReplicaRouter:
+    """Pick a healthy replica per request, ejecting replicas that fail to connect or to run queries"""
+
+    def __init__(self, urls, strategy: str = 'round_robin', eject_seconds: float = 30.0,
+                 engine_options: dict = None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy '{strategy}', expected one of {STRATEGIES}")
+        self.replicas = [Replica(url, engine_options) for url in urls]
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            self._watch(replica)
+
+    def _watch(self, replica):
+        """Eject ``replica`` when a query on it fails with an operational (server or connection) error"""
+        @event.listens_for(replica.engine, 'handle_error')
+        def eject_on_query_error(context):
+            # Connect failures are handled by acquire(); a failed pre-ping just reconnects
+            if context.connection is None or context.is_pre_ping:
+                return
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+                self.mark_failed(replica, context.original_exception)
+
+    def _candidates(self):
+        """Available replicas in the order they should be tried"""
+        now = time.time()
+        healthy = [r for r in self.replicas if r.is_available(now)]
+        if not healthy:
+            return []
+        if self.strategy == 'least_connections':
+            return sorted(healthy, key=lambda r: r.in_flight)
+        start = next(self._counter) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def acquire(self):
+        """
+        Open a session on the next healthy replica.
+
+        Returns:
+            tuple: (replica, session), or (None, None) when every replica is ejected
+        """
+        with self._lock:
+            candidates = self._candidates()
+        for replica in candidates:
+            session = Session(bind=replica.engine)
+            try:
+                # Connect eagerly so a dead replica is ejected before any query runs
+                session.connection()
+            except DBAPIError as e:
+                session.close()
+                self.mark_failed(replica, e)
+                continue
+            with self._lock:
+                replica.in_flight += 1
+                replica.failures = 0
+            return replica, session
+        return None, None
+
+    def release(self, replica, session):
+        session.close()
+        with self._lock:
+            replica.in_flight -= 1
+
+    def mark_failed(self, replica, error):
+        with self._lock:
+            replica.failures += 1
+            replica.ejected_until = time.time() + self.eject_seconds
+        logger.warning(f"Ejecting read replica {replica.engine.url.render_as_string(hide_password=True)} "
+                       f"for {self.eject_seconds}s: {error}")
+
+
+def _sticky_to_primary() -> bool:
+    """True while a client is inside its read-your-writes window"""
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_session():
+    """
+    Session for read-only queries in the current request.
+
+    GET requests use a replica when replicas are configured; writes and
+    requests that recently wrote stay on the primary (``db.session``).
+    """
+    if 'read_session' in g:
+        return g.read_session
+
+    router = current_app.extensions.get('replica_router')
+    session = db.session
+    if router is not None and request.method == 'GET' and not _sticky_to_primary():
+        replica, replica_session = router.acquire()
+        if replica is not None:
+            g.read_replica = replica
+            session = replica_session
+    g.read_session = session
+    return session
+
+
+def init_replicas(app: Flask):
+    """Configure replica routing from ``SQLALCHEMY_REPLICA_URIS`` (no-op when empty)"""
+    urls = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not urls:
+        return None
+
+    router = ReplicaRouter(
+        urls,
+        strategy=app.config.get('SQLALCHEMY_REPLICA_STRATEGY', 'round_robin'),
+        eject_seconds=app.config.get('SQLALCHEMY_REPLICA_EJECT_SECONDS', 30.0)
+    )
+    app.extensions['replica_router'] = router
+    sticky_seconds = app.config.get('SQLALCHEMY_REPLICA_STICKY_SECONDS', 5.0)
+
+    @app.after_request
+    def stick_writers_to_primary(response):
+        # Replication lag would hide a fresh upload, so pin the client to the primary for a while
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            response.set_cookie(PRIMARY_COOKIE, str(time.time() + sticky_seconds),
+                                max_age=int(sticky_seconds) + 1, httponly=True)
+        return response
+
+    @app.teardown_appcontext
+    def release_read_session(exception=None):
+        replica = g.pop('read_replica', None)
+        session = g.pop('read_session', None)
+        if replica is not None:
+            router.release(replica, session)
+
+    logger.info(f"Read replica routing enabled: {len(urls)} replica(s), strategy={router.strategy}")
+    return router
@@ -1,6 +1,7 @@
 """Database table models"""
 from .database import db
 from datetime import datetime
+import zlib
 
 class PresentationFile(db.Model):
     """Track uploaded PowerPoint files"""
@@ -9,7 +10,7 @@ class PresentationFile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=False)
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     slide_count = db.Column(db.Integer, default=0)
     url_count = db.Column(db.Integer, default=0)
     
@@ -73,19 +74,71 @@ class Product(db.Model):
     def __repr__(self):
         return f'<Product {self.name}>'
 
+class SlideText(db.Model):
+    """Slide text stored once per distinct content, keyed by its SHA-256"""
+    __tablename__ = 'slide_texts'
+    
+    hash = db.Column(db.String(64), primary_key=True)
+    text = db.Column(db.Text)
+    compressed_text = db.Column(db.LargeBinary)  # zlib-compressed UTF-8, set instead of text for long bodies
+    length = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def value(self):
+        if self.compressed_text is not None:
+            return zlib.decompress(self.compressed_text).decode('utf-8')
+        return self.text
+    
+    def __repr__(self):
+        return f'<SlideText {self.hash[:12]}>'
+
+class TextSignature(db.Model):
+    """MinHash signature of a slide body, used to verify near-duplicate candidates"""
+    __tablename__ = 'text_signatures'
+    
+    text_hash = db.Column(db.String(64), db.ForeignKey('slide_texts.hash'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)  # num_perm little-endian uint32 values
+    
+    def __repr__(self):
+        return f'<TextSignature {self.text_hash[:12]}>'
+
+class TextLshBucket(db.Model):
+    """LSH band bucket of a slide body; bodies sharing a bucket are near-duplicate candidates"""
+    __tablename__ = 'text_lsh_buckets'
+    
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    text_hash = db.Column(db.String(64), db.ForeignKey('slide_texts.hash'), primary_key=True, index=True)
+    
+    def __repr__(self):
+        return f'<TextLshBucket {self.band}:{self.bucket}>'
+
 class PresentationSlide(db.Model):
     """Presentation slide data extracted from .pptx files"""
     __tablename__ = 'presentation_slides'
+    # Lets GET /db/table/presentation_slides page in slide number order without sorting the table
+    __table_args__ = (db.Index('ix_presentation_slides_slide_number_id', 'slide_number', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     slide_number = db.Column(db.Integer, nullable=False)
-    text = db.Column(db.Text)
+    # Inline text of slides stored before slide_texts existed; new slides leave it empty
+    inline_text = db.Column('text', db.Text)
+    text_hash = db.Column(db.String(64), db.ForeignKey('slide_texts.hash'), nullable=True, index=True)
     source_file = db.Column(db.String(255))  # Keep for backward compatibility
-    file_id = db.Column(db.Integer, db.ForeignKey('presentation_files.id'), nullable=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('presentation_files.id'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship to URLs
     urls = db.relationship('SlideUrl', backref='slide', lazy=True, cascade='all, delete-orphan')
+    # Shared text body, loaded with the slide so to_dict doesn't issue a query per slide
+    content = db.relationship('SlideText', lazy='joined')
+    
+    @property
+    def text(self):
+        if self.content is not None:
+            return self.content.value
+        return self.inline_text
     
     def to_dict(self):
         return {
@@ -108,8 +161,12 @@ class SlideUrl(db.Model):
     __tablename__ = 'slide_urls'
     
     id = db.Column(db.Integer, primary_key=True)
-    slide_id = db.Column(db.Integer, db.ForeignKey('presentation_slides.id'), nullable=False)
+    slide_id = db.Column(db.Integer, db.ForeignKey('presentation_slides.id'), nullable=False, index=True)
+    # Denormalized from the slide so URLs can be partitioned and bulk-deleted per file
+    file_id = db.Column(db.Integer, db.ForeignKey('presentation_files.id'), nullable=True, index=True)
     url = db.Column(db.String(500), nullable=False)
+    # Link checker cache key (utils/link_checker.normalize_url); '' when the URL can't be checked over HTTP
+    normalized_url = db.Column(db.String(500), nullable=True, index=True)
     link_text = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -124,3 +181,111 @@ class SlideUrl(db.Model):
     def __repr__(self):
         return f'<SlideUrl {self.url[:50]}>'
 
+class LinkStatus(db.Model):
+    """Result of the last health check of a normalized URL, shared by every slide linking to it"""
+    __tablename__ = 'link_status'
+    
+    url = db.Column(db.String(500), primary_key=True)  # Normalized URL
+    status_code = db.Column(db.Integer)
+    ok = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    method = db.Column(db.String(8))  # HEAD, or GET when HEAD was refused
+    error = db.Column(db.String(255))
+    elapsed_ms = db.Column(db.Integer)
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'status_code': self.status_code,
+            'ok': self.ok,
+            'method': self.method,
+            'error': self.error,
+            'elapsed_ms': self.elapsed_ms,
+            'checked_at': self.checked_at.isoformat() if self.checked_at else None
+        }
+    
+    def __repr__(self):
+        return f'<LinkStatus {self.status_code} {self.url[:50]}>'
+
+class FileSummary(db.Model):
+    """Aggregates of one uploaded file, maintained on ingest and delete (see utils/summaries.py)"""
+    __tablename__ = 'file_summaries'
+    
+    file_id = db.Column(db.Integer, db.ForeignKey('presentation_files.id'), primary_key=True)
+    original_filename = db.Column(db.String(255), nullable=False)
+    uploaded_at = db.Column(db.DateTime, index=True)
+    slide_count = db.Column(db.Integer, nullable=False, default=0)
+    url_count = db.Column(db.Integer, nullable=False, default=0)
+    domain_count = db.Column(db.Integer, nullable=False, default=0)
+    text_chars = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'file_id': self.file_id,
+            'original_filename': self.original_filename,
+            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
+            'slide_count': self.slide_count,
+            'url_count': self.url_count,
+            'domain_count': self.domain_count,
+            'text_chars': self.text_chars,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<FileSummary {self.file_id}>'
+
+class FileDomain(db.Model):
+    """Number of URLs a file links to on one domain"""
+    __tablename__ = 'file_domains'
+    
+    file_id = db.Column(db.Integer, db.ForeignKey('presentation_files.id'), primary_key=True)
+    domain = db.Column(db.String(255), primary_key=True)
+    url_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {'domain': self.domain, 'url_count': self.url_count}
+    
+    def __repr__(self):
+        return f'<FileDomain {self.file_id} {self.domain}>'
+
+class DomainSummary(db.Model):
+    """URLs and files linking to one domain, across all uploads"""
+    __tablename__ = 'domain_summaries'
+    
+    domain = db.Column(db.String(255), primary_key=True)
+    url_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    file_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {'domain': self.domain, 'url_count': self.url_count, 'file_count': self.file_count}
+    
+    def __repr__(self):
+        return f'<DomainSummary {self.domain}>'
+
+class SummaryTotals(db.Model):
+    """Global aggregates in a single row (id 1); updating it serializes concurrent ingests"""
+    __tablename__ = 'summary_totals'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    file_count = db.Column(db.Integer, nullable=False, default=0)
+    slide_count = db.Column(db.Integer, nullable=False, default=0)
+    url_count = db.Column(db.Integer, nullable=False, default=0)
+    domain_count = db.Column(db.Integer, nullable=False, default=0)
+    text_chars = db.Column(db.BigInteger, nullable=False, default=0)
+    last_upload_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'file_count': self.file_count,
+            'slide_count': self.slide_count,
+            'url_count': self.url_count,
+            'domain_count': self.domain_count,
+            'text_chars': self.text_chars,
+            'last_upload_at': self.last_upload_at.isoformat() if self.last_upload_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<SummaryTotals {self.file_count} files>'
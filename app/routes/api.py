@@ -1,4 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+from models import read_session
+from utils.search_index import get_search_index, resolve_hits
+from utils.parse_executor import parse_stats
+from utils.admission import admission_stats
+from utils.memory_profile import memory_status, recent_profiles
+from utils.auth import require_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,10 +22,41 @@ def health():
     except Exception as e:
         db_status = f"error: {str(e)}"
     
-    return jsonify({
+    response = {
         "status": "healthy", 
         "service": "flask-app",
         "database": db_status
+    }
+    
+    router = current_app.extensions.get('replica_router')
+    if router is not None:
+        response["replicas"] = [replica.to_dict() for replica in router.replicas]
+    
+    # Parsed, rejected and killed uploads handled by this worker process
+    response["parser"] = parse_stats()
+    
+    # Admitted, queued and rejected requests per limited path in this worker process
+    admission = admission_stats(current_app)
+    if admission is not None:
+        response["admission"] = admission
+    
+    return jsonify(response), 200
+
+@api_bp.route('/admin/memory', methods=['GET'])
+@require_token('ADMIN_API_TOKEN')
+def memory_profiles():
+    """
+    Memory use of this worker and its recent upload profiles (requires the admin bearer token).
+    
+    Query parameters:
+        limit: Maximum number of profiles, newest first (default all kept)
+    """
+    profiles = recent_profiles(request.args.get('limit', type=int))
+    return jsonify({
+        'enabled': current_app.config.get('MEMORY_PROFILE_ENABLED', False),
+        'process': memory_status(),
+        'count': len(profiles),
+        'profiles': profiles
     }), 200
 
 @api_bp.route('/example', methods=['GET', 'POST'])
@@ -40,3 +77,75 @@ def example():
         "note": "This is where you'd process data with AI/ML models"
     }), 200
 
+
+def _search_k():
+    return max(1, min(request.args.get('k', 10, type=int), 100))
+
+@api_bp.route('/search', methods=['GET', 'POST'])
+def search():
+    """
+    Relevance-ranked TF-IDF search over slide text.
+    
+    GET  /api/search?q=...&k=10
+    POST /api/search  {"queries": ["...", "..."], "k": 10}  (all queries scored in one pass)
+    """
+    if not current_app.config.get('SEARCH_INDEX_ENABLED', True):
+        return jsonify({'error': 'Search index is disabled'}), 404
+    
+    if request.method == 'GET':
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        queries = [query]
+        k = _search_k()
+    else:
+        data = request.get_json() or {}
+        queries = data.get('queries')
+        if not isinstance(queries, list) or not queries or not all(isinstance(q, str) for q in queries):
+            return jsonify({'error': 'queries must be a non-empty list of strings'}), 400
+        if len(queries) > 100:
+            return jsonify({'error': 'At most 100 queries per request'}), 400
+        try:
+            k = max(1, min(int(data.get('k', 10)), 100))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k must be an integer'}), 400
+    
+    try:
+        # Over-fetch so slides deleted since they were indexed don't leave the page short
+        hits = get_search_index(current_app.config).search(queries, k=k * 2 + 10)
+        session = read_session()
+        results = [{'query': query, 'results': resolve_hits(session, query_hits, k)}
+                   for query, query_hits in zip(queries, hits)]
+    except Exception as e:
+        logger.error(f"Error searching slides: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    if request.method == 'GET':
+        return jsonify(results[0]), 200
+    return jsonify({'count': len(results), 'results': results}), 200
+
+@api_bp.route('/search/similar/<int:slide_id>', methods=['GET'])
+def search_similar(slide_id):
+    """More-like-this: slides whose TF-IDF vectors are closest to a slide (?k=10)"""
+    if not current_app.config.get('SEARCH_INDEX_ENABLED', True):
+        return jsonify({'error': 'Search index is disabled'}), 404
+    
+    try:
+        k = _search_k()
+        hits = get_search_index(current_app.config).more_like_this([slide_id], k=k * 2 + 10)[0]
+        if hits is None:
+            return jsonify({'error': f'Slide {slide_id} is not in the search index'}), 404
+        results = resolve_hits(read_session(), hits, k)
+        return jsonify({'slide_id': slide_id, 'count': len(results), 'results': results}), 200
+    except Exception as e:
+        logger.error(f"Error finding slides like {slide_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/search/stats', methods=['GET'])
+def search_stats():
+    """Size and generation of the search index as seen by this worker"""
+    try:
+        return jsonify(get_search_index(current_app.config).stats()), 200
+    except Exception as e:
+        logger.error(f"Error reading search index stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
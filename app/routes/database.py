@@ -1,11 +1,23 @@
 """Database routes for displaying tables and records"""
-from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for
+from flask import Blueprint, current_app, render_template, jsonify, request, flash, redirect, url_for, send_from_directory
 from werkzeug.utils import secure_filename
-from models import db, PresentationFile, PresentationSlide, SlideUrl
-from utils.pptx_parser import extract_text_and_urls
+from sqlalchemy.orm import selectinload
+from models import (db, read_session, PresentationFile, PresentationSlide, SlideText, SlideUrl, LinkStatus,
+                    SummaryTotals, FileSummary)
+from utils.parse_executor import parse_presentation, last_parse_peak_rss, ParseLimits, ParseError, ParseRejected
+from utils.ingest import ingest_presentation, delete_unreferenced_texts
+from models.partitioning import prune_filters
+from utils.similarity_index import get_hasher, unindex_texts, similar_slides, similar_files
+from utils.search_index import index_new_slides, clear_search_index
+from utils.snapshot_export import TABLES as EXPORT_TABLES, read_manifest, find_snapshot
+from utils.auth import require_token
+from utils.chunked_upload import get_upload_store, UploadError
+from utils.memory_profile import memory_profile
+from utils.summaries import TOTALS_ID, dashboard, file_summary, record_delete, reset_summaries
 import logging
 import os
-from datetime import datetime
+import re
+import tempfile
 
 logger = logging.getLogger(__name__)
 
@@ -14,20 +26,26 @@ db_bp = Blueprint('database', __name__, url_prefix='/db')
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pptx'}
 UPLOAD_FOLDER = '/tmp/uploads'  # Temporary upload folder in container (mounted volume)
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
 
 # Table model mapping for dynamic query handling
+# Pages are ordered by indexed columns, with id breaking ties so paging is stable
 TABLE_MODELS = {
     'presentation_files': {
         'model': PresentationFile,
-        'order_by': lambda m: m.uploaded_at.desc()
+        'order_by': lambda m: (m.uploaded_at.desc(), m.id.desc()),
+        'options': ()
     },
     'presentation_slides': {
         'model': PresentationSlide,
-        'order_by': lambda m: m.slide_number
+        'order_by': lambda m: (m.slide_number, m.id),
+        # One query each for the page's URLs and files instead of one per slide
+        'options': (selectinload(PresentationSlide.urls), selectinload(PresentationSlide.file))
     },
     'slide_urls': {
         'model': SlideUrl,
-        'order_by': None
+        'order_by': lambda m: (m.id,),
+        'options': ()
     }
 }
 
@@ -40,37 +58,89 @@ def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_upload(file):
+    """Save an uploaded file under a unique name, so concurrent uploads of the same filename don't collide"""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    fd, filepath = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix='.pptx')
+    os.close(fd)
+    try:
+        file.save(filepath)
+    except Exception:
+        os.remove(filepath)
+        raise
+    return filepath
+
+def parse_uploaded_file(filepath):
+    """Parse a saved upload in a sandboxed worker process when a parse executor is configured"""
+    return parse_presentation(
+        filepath,
+        max_workers=current_app.config.get('PARSE_EXECUTOR_WORKERS', 0),
+        limits=ParseLimits.from_config(current_app.config),
+        include_notes=current_app.config.get('PARSE_INCLUDE_NOTES', False)
+    )
+
+def parse_error_response(error, filepath):
+    """JSON error for an upload that was rejected or whose parse was killed"""
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    logger.warning(f"Parse of {os.path.basename(filepath)} stopped ({error.reason}): {str(error)}")
+    if error.reason == 'invalid_zip':
+        status = 400
+    elif isinstance(error, ParseRejected):
+        status = 413
+    else:
+        # The file passed the pre-checks but can't be processed within the limits
+        status = 422
+    return jsonify({'error': str(error), 'reason': error.reason}), status
+
+def table_counts(session):
+    """Row counts of the browsable tables, from the summary totals row when it exists"""
+    totals = session.get(SummaryTotals, TOTALS_ID)
+    if totals is not None:
+        return {'presentation_files': totals.file_count, 'presentation_slides': totals.slide_count,
+                'slide_urls': totals.url_count}
+    return {name: session.query(config['model']).count() for name, config in TABLE_MODELS.items()}
+
 @db_bp.route('/tables')
 def list_tables():
     """Get list of all tables (only showing presentation-related tables)"""
+    counts = table_counts(read_session())
     tables = [
-        {'name': 'presentation_files', 'display_name': 'Uploaded Files', 'count': PresentationFile.query.count()},
-        {'name': 'presentation_slides', 'display_name': 'Presentation Slides', 'count': PresentationSlide.query.count()},
-        {'name': 'slide_urls', 'display_name': 'Slide URLs', 'count': SlideUrl.query.count()}
+        {'name': 'presentation_files', 'display_name': 'Uploaded Files', 'count': counts['presentation_files']},
+        {'name': 'presentation_slides', 'display_name': 'Presentation Slides', 'count': counts['presentation_slides']},
+        {'name': 'slide_urls', 'display_name': 'Slide URLs', 'count': counts['slide_urls']}
     ]
     return jsonify({'tables': tables})
 
 @db_bp.route('/table/<table_name>')
 def get_table_data(table_name):
-    """Get all records from a specific table"""
+    """
+    Get one page of records from a specific table, with the table's total row count
+
+    Query parameters:
+        limit: Page size (default 100, max 1000)
+        offset: Records to skip (default 0)
+    """
     try:
         if table_name not in TABLE_MODELS:
             return jsonify({'error': f'Table {table_name} not found'}), 404
         
         table_config = TABLE_MODELS[table_name]
         model = table_config['model']
-        order_by = table_config['order_by']
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        offset = max(request.args.get('offset', 0, type=int), 0)
         
-        query = model.query
-        if order_by:
-            query = query.order_by(order_by(model))
-        
-        records = query.all()
+        session = read_session()
+        records = session.query(model).options(*table_config['options']) \
+            .order_by(*table_config['order_by'](model)).limit(limit).offset(offset).all()
         data = [record.to_dict() for record in records]
         
         return jsonify({
             'table': table_name,
+            'total': table_counts(session)[table_name],
             'count': len(data),
+            'offset': offset,
+            'limit': limit,
             'records': data
         })
     except Exception as e:
@@ -85,7 +155,9 @@ def get_record(table_name, record_id):
             return jsonify({'error': f'Table {table_name} not found'}), 404
         
         model = TABLE_MODELS[table_name]['model']
-        record = model.query.get_or_404(record_id)
+        record = read_session().get(model, record_id)
+        if record is None:
+            return jsonify({'error': f'Record {record_id} not found in {table_name}'}), 404
         
         return jsonify({
             'table': table_name,
@@ -113,76 +185,168 @@ def upload_pptx():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type. Only .pptx files are allowed'}), 400
     
+    filepath = None
     try:
-        # Create upload directory if it doesn't exist
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        # Save uploaded file
+        # The name on disk is unique per request; the uploaded name is only kept as metadata
         original_filename = file.filename
         filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        filepath = save_upload(file)
         
+        return process_saved_upload(filepath, filename, original_filename)
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error processing file: {str(e)}")
+        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
+    finally:
+        # Clean up uploaded file
+        if filepath and os.path.exists(filepath):
+            os.remove(filepath)
+
+def process_saved_upload(filepath, filename, original_filename):
+    """Parse and ingest a .pptx that is complete on disk; shared by single-request and chunked uploads"""
+    # No-op unless MEMORY_PROFILE_ENABLED (see utils/memory_profile.py)
+    profile = memory_profile(current_app.config, original_filename)
+    
+    try:
         # Parse the PowerPoint file
         logger.info(f"Parsing PowerPoint file: {filepath}")
-        slides_data = extract_text_and_urls(filepath)
-        
-        # Create or get PresentationFile record
-        presentation_file = PresentationFile(
-            filename=filename,
-            original_filename=original_filename,
-            uploaded_at=datetime.utcnow()
-        )
-        db.session.add(presentation_file)
-        db.session.flush()  # Get the file ID
-        
-        # Save to database
-        saved_count = 0
-        url_count = 0
-        
-        for slide_data in slides_data:
-            # Create slide record
-            slide = PresentationSlide(
-                slide_number=slide_data['slide_number'],
-                text=slide_data['text'],
-                source_file=filename,  # Keep for backward compatibility
-                file_id=presentation_file.id
-            )
-            db.session.add(slide)
-            db.session.flush()  # Get the slide ID
-            
-            # Create URL records
-            for url_data in slide_data['urls']:
-                url_record = SlideUrl(
-                    slide_id=slide.id,
-                    url=url_data['url'],
-                    link_text=url_data.get('text', '')
-                )
-                db.session.add(url_record)
-                url_count += 1
-            
-            saved_count += 1
-        
-        # Update file counts
-        presentation_file.slide_count = saved_count
-        presentation_file.url_count = url_count
+        try:
+            slides_data = parse_uploaded_file(filepath)
+        except ParseError as e:
+            profile.finish(error=e.reason, parse_peak_rss_bytes=last_parse_peak_rss())
+            return parse_error_response(e, filepath)
+        profile.mark('parse')
+        
+        presentation_file = ingest_presentation(filename, original_filename, slides_data)
+        db.session.flush()
+        profile.mark('ingest')
+        file_id = presentation_file.id
+        saved_count = presentation_file.slide_count
+        url_count = presentation_file.url_count
         
         db.session.commit()
-        
-        # Clean up uploaded file
-        os.remove(filepath)
-        
-        return jsonify({
-            'message': 'File uploaded and parsed successfully',
-            'slides_imported': saved_count,
-            'urls_extracted': url_count,
-            'filename': filename,
-            'file_id': presentation_file.id
-        }), 200
-        
+        profile.mark('commit')
+        
+        # Make the new slides searchable; the periodic compaction folds them into the base index
+        index_error = None
+        try:
+            index_new_slides(current_app.config, presentation_file.slides)
+        except Exception as e:
+            index_error = str(e)
+            logger.error(f"Error adding file {file_id} to the search index: {index_error}")
+        profile.mark('index')
+        
+        # The file holds every new slide (and their URLs and texts) through its relationships;
+        # detach them all so they are freed now rather than when the request ends
+        db.session.expunge_all()
+        del presentation_file, slides_data
+        profile.mark('release')
+    except Exception as e:
+        # Failed uploads are the ones worth profiling; record the phases that ran before re-raising
+        profile.finish(error=f'{type(e).__name__}: {e}', parse_peak_rss_bytes=last_parse_peak_rss())
+        raise
+    profile.finish(file_id=file_id, slides=saved_count, urls=url_count, index_error=index_error,
+                   parse_peak_rss_bytes=last_parse_peak_rss())
+    
+    return jsonify({
+        'message': 'File uploaded and parsed successfully',
+        'slides_imported': saved_count,
+        'urls_extracted': url_count,
+        'filename': filename,
+        'file_id': file_id
+    }), 200
+
+def upload_session_response(session, status=200):
+    response = jsonify({
+        'upload_id': session['id'],
+        'filename': session['filename'],
+        'size': session['size'],
+        'offset': session['offset'],
+        'expires_at': session['expires_at']
+    })
+    response.headers['Upload-Offset'] = str(session['offset'])
+    response.headers['Upload-Length'] = str(session['size'])
+    return response, status
+
+def upload_error_response(error):
+    return jsonify({'error': str(error)}), error.status
+
+@db_bp.route('/uploads', methods=['POST'])
+def create_upload_session():
+    """
+    Start a resumable upload.
+    
+    JSON body:
+        filename: Name of the .pptx file
+        size: Total size in bytes
+        sha256: Optional hex digest of the whole file, verified on finalize
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type. Only .pptx files are allowed'}), 400
+    # bool is an int subclass, so JSON true would otherwise pass as 1 byte
+    if not isinstance(data.get('size'), int) or isinstance(data['size'], bool):
+        return jsonify({'error': 'size (bytes) is required'}), 400
+    
+    try:
+        session = get_upload_store(current_app.config).create(filename, data['size'], data.get('sha256'))
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    response, status = upload_session_response(session, 201)
+    response.headers['Location'] = url_for('database.upload_session', upload_id=session['id'])
+    return response, status
+
+@db_bp.route('/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def upload_session(upload_id):
+    """
+    Query (GET/HEAD), extend (PUT) or abort (DELETE) a resumable upload.
+    
+    PUT bodies are raw bytes with a ``Content-Range: bytes <start>-<end>/<size>``
+    header and an optional ``X-Chunk-SHA256`` hex digest. A chunk must start at
+    the received offset; on 409 query the offset and resume from there.
+    """
+    store = get_upload_store(current_app.config)
+    try:
+        if request.method in ('GET', 'HEAD'):
+            return upload_session_response(store.status(upload_id))
+        
+        if request.method == 'DELETE':
+            store.abort(upload_id)
+            return jsonify({'message': f'Upload {upload_id} aborted'}), 200
+        
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return jsonify({'error': 'Content-Range: bytes <start>-<end>/<size> header is required'}), 400
+        start, end = int(match.group(1)), int(match.group(2))
+        total = int(match.group(3)) if match.group(3) != '*' else None
+        length = end - start + 1
+        if request.content_length is not None and request.content_length != length:
+            return jsonify({'error': f'Content-Length {request.content_length} does not match Content-Range'}), 400
+        
+        session = store.write_chunk(upload_id, start, length, request.stream,
+                                    sha256=request.headers.get('X-Chunk-SHA256'), total=total)
+        return upload_session_response(session)
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        logger.error(f"Error handling upload {upload_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@db_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Verify a complete resumable upload and parse it like POST /db/upload (optional JSON body: sha256)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        with get_upload_store(current_app.config).finalized(upload_id, data.get('sha256')) as (session, filepath):
+            return process_saved_upload(filepath, secure_filename(session['filename']), session['filename'])
+    except UploadError as e:
+        return upload_error_response(e)
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error processing file: {str(e)}")
+        logger.error(f"Error processing upload {upload_id}: {str(e)}")
         return jsonify({'error': f'Error processing file: {str(e)}'}), 500
 
 @db_bp.route('/test-parse', methods=['POST'])
@@ -195,30 +359,28 @@ def test_parse():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type'}), 400
     
+    filepath = None
     try:
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        filepath = save_upload(file)
         
         # Parse and return detailed info
-        slides_data = extract_text_and_urls(filepath)
-        
-        # Clean up
-        os.remove(filepath)
+        try:
+            slides_data = parse_uploaded_file(filepath)
+        except ParseError as e:
+            return parse_error_response(e, filepath)
         
         # Return detailed parsing results
         result = {
             'total_slides': len(slides_data),
-            'total_urls': sum(len(slide['urls']) for slide in slides_data),
+            'total_urls': sum(slide.url_count for slide in slides_data),
             'slides': []
         }
         
         for slide in slides_data:
             result['slides'].append({
-                'slide_number': slide['slide_number'],
-                'text_preview': slide['text'][:100] + '...' if len(slide['text']) > 100 else slide['text'],
-                'url_count': len(slide['urls']),
+                'slide_number': slide.slide_number,
+                'text_preview': slide.text[:100] + '...' if len(slide.text) > 100 else slide.text,
+                'url_count': slide.url_count,
                 'urls': slide['urls']
             })
         
@@ -231,6 +393,9 @@ def test_parse():
             'error': str(e),
             'traceback': traceback.format_exc()
         }), 500
+    finally:
+        if filepath and os.path.exists(filepath):
+            os.remove(filepath)
 
 @db_bp.route('/clear', methods=['POST'])
 def clear_database():
@@ -241,14 +406,24 @@ def clear_database():
         slide_count = PresentationSlide.query.count()
         url_count = SlideUrl.query.count()
         
+        # Summaries reference the files, so they go first
+        reset_summaries()
         # Delete all URLs first (due to foreign key constraint)
         SlideUrl.query.delete()
         # Delete all slides
         PresentationSlide.query.delete()
         # Delete all files
         PresentationFile.query.delete()
+        # Delete the near-duplicate index and all shared slide bodies
+        unindex_texts()
+        SlideText.query.delete()
         
         db.session.commit()
+        # Otherwise every search would skip the deleted slides until the next compaction
+        try:
+            clear_search_index(current_app.config)
+        except OSError as e:
+            logger.error(f"Error clearing search index (the next compaction drops the slides): {str(e)}")
         
         logger.info(f"Cleared database: {file_count} files, {slide_count} slides and {url_count} URLs removed")
         
@@ -266,10 +441,13 @@ def clear_database():
 
 @db_bp.route('/files', methods=['GET'])
 def list_files():
-    """Get list of all uploaded files"""
+    """Get list of all uploaded files, newest first, with the counts from their summaries"""
     try:
-        files = PresentationFile.query.order_by(PresentationFile.uploaded_at.desc()).all()
-        data = [file.to_dict() for file in files]
+        rows = read_session().query(FileSummary, PresentationFile.filename) \
+            .join(PresentationFile, PresentationFile.id == FileSummary.file_id) \
+            .order_by(FileSummary.uploaded_at.desc()).all()
+        # Same keys as PresentationFile.to_dict(), plus the summary's domain and text counts
+        data = [{'id': summary.file_id, 'filename': filename, **summary.to_dict()} for summary, filename in rows]
         return jsonify({'files': data, 'count': len(data)}), 200
     except Exception as e:
         logger.error(f"Error fetching files: {str(e)}")
@@ -279,18 +457,31 @@ def list_files():
 def delete_file_data(file_id):
     """Delete all data associated with a specific file"""
     try:
-        presentation_file = PresentationFile.query.get_or_404(file_id)
-        
-        # Count what will be deleted (get actual counts from relationships)
-        slide_count = len(presentation_file.slides)
-        url_count = sum(len(slide.urls) for slide in presentation_file.slides)
+        presentation_file = db.session.get(PresentationFile, file_id)
+        if presentation_file is None:
+            return jsonify({'error': f'File {file_id} not found'}), 404
         
         # Store filenames for logging before deletion
         filename = presentation_file.original_filename
         filepath = presentation_file.filename
         
-        # Delete the file record - this will cascade delete all related slides and URLs
-        # due to the cascade='all, delete-orphan' relationship defined in the model
+        # Bulk-delete by file_id (plus the upload month when partitioned by month) so
+        # PostgreSQL only touches this upload's partition instead of loading every row
+        scheme = current_app.config.get('DB_PARTITIONING', 'none')
+        if scheme == 'none':
+            # URLs stored before slide_urls.file_id existed can only be found through their slide
+            url_filters = [SlideUrl.slide_id.in_(
+                db.session.query(PresentationSlide.id).filter(PresentationSlide.file_id == presentation_file.id)
+            )]
+        else:
+            url_filters = prune_filters(SlideUrl, presentation_file, scheme)
+        url_count = db.session.query(SlideUrl).filter(*url_filters).delete(synchronize_session=False)
+        slide_filters = prune_filters(PresentationSlide, presentation_file, scheme)
+        text_hashes = {h for (h,) in db.session.query(PresentationSlide.text_hash).filter(*slide_filters).distinct() if h}
+        slide_count = db.session.query(PresentationSlide).filter(*slide_filters).delete(synchronize_session=False)
+        # Shared slide bodies stay as long as another deck still uses them
+        delete_unreferenced_texts(text_hashes)
+        record_delete(presentation_file.id)
         db.session.delete(presentation_file)
         db.session.commit()
         
@@ -307,3 +498,174 @@ def delete_file_data(file_id):
         logger.error(f"Error deleting file: {str(e)}")
         return jsonify({'error': f'Error deleting file: {str(e)}'}), 500
 
+@db_bp.route('/files/<int:file_id>/summary', methods=['GET'])
+def get_file_summary(file_id):
+    """Get a file's slide, URL and text totals and its URLs per domain"""
+    try:
+        summary = file_summary(read_session(), file_id)
+        if summary is None:
+            return jsonify({'error': f'File {file_id} not found'}), 404
+        return jsonify(summary), 200
+    except Exception as e:
+        logger.error(f"Error fetching file summary: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@db_bp.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    """
+    Get global totals, the most recent uploads and the most linked domains.
+    
+    Served from the summary tables, so the cost does not grow with the data.
+    
+    Query parameters:
+        files: Number of recent files (default 10, max 100)
+        domains: Number of top domains (default 10, max 100)
+    """
+    try:
+        files = min(max(request.args.get('files', 10, type=int), 1), 100)
+        domains = min(max(request.args.get('domains', 10, type=int), 1), 100)
+        return jsonify(dashboard(read_session(), files=files, domains=domains)), 200
+    except Exception as e:
+        logger.error(f"Error fetching dashboard: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+
+@db_bp.route('/links', methods=['GET'])
+def list_link_status():
+    """
+    Get link health check results, one page of distinct normalized URLs at a time.
+    
+    Query parameters:
+        status: 'ok', 'broken' or 'unchecked' to filter results
+        file_id: Only URLs linked from this file
+        limit: Page size (default 100, max 1000)
+        offset: URLs to skip, in URL order (default 0)
+    """
+    try:
+        session = read_session()
+        status = request.args.get('status')
+        file_id = request.args.get('file_id', type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        urls = session.query(SlideUrl.normalized_url.label('url')).filter(SlideUrl.normalized_url != '')
+        if file_id is not None:
+            urls = urls.filter(SlideUrl.file_id == file_id)
+        urls = urls.distinct().subquery()
+        joined = lambda query: query.outerjoin(LinkStatus, LinkStatus.url == urls.c.url)
+        
+        total, ok, broken = joined(session.query(
+            db.func.count(),
+            db.func.count(db.case((LinkStatus.ok.is_(True), 1))),
+            db.func.count(db.case((LinkStatus.ok.is_(False), 1)))
+        ).select_from(urls)).one()
+        summary = {'total': total, 'ok': ok, 'broken': broken, 'unchecked': total - ok - broken}
+        
+        page = joined(session.query(urls.c.url, LinkStatus).select_from(urls))
+        if status == 'ok':
+            page = page.filter(LinkStatus.ok.is_(True))
+        elif status == 'broken':
+            page = page.filter(LinkStatus.ok.is_(False))
+        elif status == 'unchecked':
+            page = page.filter(LinkStatus.url.is_(None))
+        page = page.order_by(urls.c.url).offset(offset).limit(limit)
+        
+        records = [link.to_dict() if link is not None else {'url': url, 'ok': None, 'checked_at': None}
+                   for url, link in page]
+        return jsonify({
+            'summary': summary,
+            'count': len(records),
+            'offset': offset,
+            'limit': limit,
+            'links': records
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching link status: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@db_bp.route('/slides/<int:slide_id>/similar', methods=['GET'])
+def get_similar_slides(slide_id):
+    """
+    Get near-duplicate slides of a slide.
+    
+    Query parameters:
+        threshold: Minimum estimated Jaccard similarity (default 0.5)
+        limit: Maximum number of slides (default 20)
+    """
+    try:
+        session = read_session()
+        slide = session.get(PresentationSlide, slide_id)
+        if slide is None:
+            return jsonify({'error': f'Slide {slide_id} not found'}), 404
+        
+        similar = similar_slides(
+            session, slide, get_hasher(current_app.config),
+            threshold=request.args.get('threshold', 0.5, type=float),
+            limit=request.args.get('limit', 20, type=int)
+        )
+        return jsonify({'slide_id': slide_id, 'count': len(similar), 'similar': similar}), 200
+    except Exception as e:
+        logger.error(f"Error finding similar slides: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@db_bp.route('/files/<int:file_id>/similar', methods=['GET'])
+def get_similar_files(file_id):
+    """
+    Get decks that share near-duplicate slides with a file.
+    
+    Query parameters:
+        threshold: Minimum estimated Jaccard similarity for two slides to match (default 0.5)
+        min_score: Minimum deck similarity (default 0.3)
+        limit: Maximum number of decks (default 20)
+    """
+    try:
+        session = read_session()
+        presentation_file = session.get(PresentationFile, file_id)
+        if presentation_file is None:
+            return jsonify({'error': f'File {file_id} not found'}), 404
+        
+        similar = similar_files(
+            session, presentation_file, get_hasher(current_app.config),
+            threshold=request.args.get('threshold', 0.5, type=float),
+            min_score=request.args.get('min_score', 0.3, type=float),
+            limit=request.args.get('limit', 20, type=int)
+        )
+        return jsonify({'file_id': file_id, 'count': len(similar), 'similar': similar}), 200
+    except Exception as e:
+        logger.error(f"Error finding similar files: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@db_bp.route('/exports', methods=['GET'])
+@require_token('EXPORT_API_TOKEN')
+def list_exports():
+    """List columnar snapshots written by scripts/export_snapshot.py (requires the export bearer token)"""
+    try:
+        manifest = read_manifest(current_app.config.get('EXPORT_DIR', '/tmp/exports'))
+        return jsonify({'count': len(manifest['snapshots']), 'snapshots': manifest['snapshots']}), 200
+    except Exception as e:
+        logger.error(f"Error reading export manifest: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@db_bp.route('/exports/<snapshot_id>/<table_name>', methods=['GET'])
+@require_token('EXPORT_API_TOKEN')
+def download_export(snapshot_id, table_name):
+    """Download one table of a snapshot; snapshot_id may be 'latest' (requires the export bearer token)"""
+    if table_name not in EXPORT_TABLES:
+        return jsonify({'error': f'Table {table_name} is not exported'}), 404
+    
+    export_dir = current_app.config.get('EXPORT_DIR', '/tmp/exports')
+    snapshot = find_snapshot(export_dir, snapshot_id)
+    if snapshot is None:
+        return jsonify({'error': f'Snapshot {snapshot_id} not found'}), 404
+    entry = snapshot['tables'].get(table_name)
+    if entry is None:
+        return jsonify({'error': f'Snapshot {snapshot["id"]} does not include {table_name}'}), 404
+    
+    response = send_from_directory(
+        os.path.join(export_dir, snapshot['id']), entry['file'], as_attachment=True,
+        download_name=f"{snapshot['id']}-{entry['file']}", mimetype='application/octet-stream'
+    )
+    response.headers['X-Export-Watermark'] = str(entry['watermark'])
+    response.headers['X-Export-Rows'] = str(entry['rows'])
+    return response
@@ -0,0 +1,119 @@
+"""Benchmark request concurrency and tail latency against a running deployment
+
+Run it once against the sync deployment and once against the threaded one:
+
+    GUNICORN_WORKER_CLASS=sync gunicorn --config gunicorn.conf.py app:app
+    python scripts/bench_concurrency.py --url http://localhost:5000 --concurrency 32
+
+    gunicorn --config gunicorn.conf.py app:app
+    python scripts/bench_concurrency.py --url http://localhost:5000 --concurrency 32
+
+Pass --upload path/to/deck.pptx to mix uploads into the read traffic, which is
+where a blocked worker hurts the read endpoints most.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import itertools
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+DEFAULT_PATHS = ['/db/tables', '/db/files', '/db/table/presentation_slides', '/api/health']
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _upload_request(base_url, pptx_path):
+    """Build a multipart POST to /db/upload without third-party dependencies"""
+    boundary = uuid.uuid4().hex
+    with open(pptx_path, 'rb') as f:
+        payload = f.read()
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="bench.pptx"\r\n'
+        f'Content-Type: application/vnd.openxmlformats-officedocument.presentationml.presentation\r\n\r\n'
+    ).encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+    return urllib.request.Request(
+        base_url + '/db/upload', data=body, method='POST',
+        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}
+    )
+
+
+def timed_request(req, timeout):
+    """Return (path, latency_seconds, ok)"""
+    path = req.full_url if isinstance(req, urllib.request.Request) else req
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return path, time.perf_counter() - start, ok
+
+
+def run(base_url, paths, concurrency, total, timeout, upload=None, upload_every=10):
+    requests_to_send = []
+    path_cycle = itertools.cycle(paths)
+    for i in range(total):
+        if upload and i % upload_every == 0:
+            requests_to_send.append(_upload_request(base_url, upload))
+        else:
+            requests_to_send.append(base_url + next(path_cycle))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda r: timed_request(r, timeout), requests_to_send))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency, ok in results if ok)
+    errors = sum(1 for _, _, ok in results if not ok)
+    return {
+        'url': base_url,
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the deployment')
+    parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--upload', help='Optional .pptx to upload every --upload-every requests')
+    parser.add_argument('--upload-every', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args()
+
+    result = run(args.url.rstrip('/'), args.paths or DEFAULT_PATHS, args.concurrency,
+                 args.requests, args.timeout, args.upload, args.upload_every)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"📊 {result['requests']} requests to {result['url']} at concurrency {result['concurrency']}")
+        print(f"   - throughput: {result['throughput_rps']} req/s ({result['errors']} errors)")
+        print(f"   - latency p50/p95/p99: {result['p50_ms']} / {result['p95_ms']} / {result['p99_ms']} ms")
+        print(f"   - max latency: {result['max_ms']} ms")
+    return 1 if result['errors'] == result['requests'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Compare the memory cost of the parser's result model with the legacy dict shape
+
+Usage:
+    python scripts/bench_parse_memory.py [--pptx deck.pptx] [--decks 20] [--slides 200] [--links 5]
+
+Without --pptx, synthetic decks of --slides slides with --links links each are
+generated. With --pptx, the deck is parsed once and --decks copies of its
+result are built, like a batch import holding many decks at once. Memory is
+measured with tracemalloc: the bytes still allocated once the results are
+built, the peak while building them and the number of live allocations. The
+pickled size is what crosses the pipe from a sandboxed parse worker.
+"""
+import sys
+import os
+import argparse
+import gc
+import pickle
+import tracemalloc
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parse_result import ParsedSlide, SlideLink
+
+def legacy_slide(slide_number, text, links):
+    """The dict shape extract_text_and_urls returned before ParsedSlide"""
+    urls = [{'url': url, 'text': link_text, 'slide': slide_number} for url, link_text in links]
+    return {'slide_number': slide_number, 'text': text, 'urls': urls, 'url_count': len(urls)}
+
+def compact_slide(slide_number, text, links):
+    return ParsedSlide(slide_number, text, [SlideLink(url, link_text) for url, link_text in links])
+
+def synthetic_decks(decks, slides, links):
+    """Raw (slide_number, text, [(url, text)]) tuples; strings are rebuilt by each builder"""
+    def deck(d):
+        for n in range(1, slides + 1):
+            yield (n, f'Deck {d} slide {n} ' + 'body text ' * 20,
+                   [(f'https://example.com/{d}/{n}/{i}', f'link {i}') for i in range(links)])
+    return [deck(d) for d in range(decks)]
+
+def parsed_decks(pptx_path, decks):
+    from utils.pptx_parser import extract_text_and_urls
+    slides = extract_text_and_urls(pptx_path)
+    raw = [(s.slide_number, s.text, [(link.url, link.text) for link in s.urls]) for s in slides]
+
+    def deck():
+        # Copy the strings so every deck owns its data, as separately parsed decks would
+        for slide_number, text, links in raw:
+            yield (slide_number, ''.join(text), [(''.join(url), ''.join(link_text)) for url, link_text in links])
+    return [deck() for _ in range(decks)]
+
+def measure(make_source, build):
+    """Retained bytes, peak bytes and live allocations of building every deck with ``build``"""
+    source = make_source()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    result = [[build(*slide) for slide in deck] for deck in source]
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return result, current - start, peak - start, allocations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pptx', help='Measure results of this deck instead of synthetic ones')
+    parser.add_argument('--decks', type=int, default=20, help='Decks held in memory at once')
+    parser.add_argument('--slides', type=int, default=200, help='Slides per synthetic deck')
+    parser.add_argument('--links', type=int, default=5, help='Links per synthetic slide')
+    args = parser.parse_args()
+
+    if args.pptx:
+        make_source = lambda: parsed_decks(args.pptx, args.decks)
+        print(f"📄 {args.decks} copies of {args.pptx}")
+    else:
+        make_source = lambda: synthetic_decks(args.decks, args.slides, args.links)
+        print(f"📄 {args.decks} synthetic decks x {args.slides} slides x {args.links} links")
+
+    rows = []
+    for name, build in (('dicts (legacy)', legacy_slide), ('ParsedSlide', compact_slide)):
+        result, retained, peak, allocations = measure(make_source, build)
+        pickled = sum(len(pickle.dumps(deck, protocol=pickle.HIGHEST_PROTOCOL)) for deck in result)
+        rows.append((name, retained, peak, allocations, pickled))
+        del result
+
+    print(f"{'model':<16} {'retained':>12} {'peak':>12} {'allocations':>12} {'pickled':>12}")
+    for name, retained, peak, allocations, pickled in rows:
+        print(f"{name:<16} {retained / 1024:>10.0f}KB {peak / 1024:>10.0f}KB {allocations:>12} {pickled / 1024:>10.0f}KB")
+    legacy, compact = rows
+    print(f"✅ ParsedSlide retains {100 * (1 - compact[1] / legacy[1]):.0f}% less memory "
+          f"with {100 * (1 - compact[3] / legacy[3]):.0f}% fewer allocations")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Rebuild the TF-IDF search index from presentation_slides
+
+Usage:
+    python scripts/build_search_index.py [--compact] [--batch-size 5000]
+
+Uploads are added incrementally and compacted in the background, so a full
+build is only needed for an empty index directory, after scripts/migrate_slide_text.py
+or after changing SEARCH_NUM_FEATURES. --compact merges pending deltas and
+drops deleted slides without re-reading every slide.
+"""
+import sys
+import os
+import argparse
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, PresentationSlide
+from utils.search_index import get_search_index, slide_documents
+
+def build(compact, batch_size):
+    app = create_app()
+    index = get_search_index(app.config)
+
+    with app.app_context():
+        if compact:
+            alive_ids = lambda: db.session.execute(db.select(PresentationSlide.id)).scalars().all()
+            if index.compact(alive_ids):
+                print("✅ Search index compacted")
+            else:
+                print("✅ Nothing to compact (or another process holds the lock)")
+        else:
+            print(f"📄 Building search index in {index.path}")
+            count = index.build(slide_documents(db.session, batch_size=batch_size), batch_size=batch_size)
+            print(f"✅ Search index built ({count} slides)")
+
+    stats = index.stats()
+    print(f"   - generation {stats['generation']}, {stats['documents']} slides, "
+          f"{stats['pending_deltas']} pending deltas")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compact', action='store_true', help='Only merge deltas and drop deleted slides')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+    build(args.compact, args.batch_size)
@@ -0,0 +1,54 @@
+"""Index slide bodies that are missing from the near-duplicate (MinHash/LSH) index
+
+Usage:
+    python scripts/build_similarity_index.py [--rebuild] [--batch-size 500]
+
+New uploads are indexed on ingest; run this after scripts/migrate_slide_text.py
+or with --rebuild after changing SIMILARITY_NUM_PERM or SIMILARITY_BANDS.
+"""
+import sys
+import os
+import argparse
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, SlideText, TextSignature
+from utils.similarity_index import get_hasher, index_texts, unindex_texts
+
+def build(rebuild, batch_size):
+    app = create_app()
+    hasher = get_hasher(app.config)
+    indexed = 0
+
+    with app.app_context():
+        if rebuild:
+            unindex_texts()
+            db.session.commit()
+            print("🗑️  Cleared existing similarity index")
+
+        last_hash = ''
+        while True:
+            batch = db.session.query(SlideText).outerjoin(
+                TextSignature, TextSignature.text_hash == SlideText.hash
+            ).filter(
+                TextSignature.text_hash.is_(None), SlideText.hash > last_hash
+            ).order_by(SlideText.hash).limit(batch_size).all()
+            if not batch:
+                break
+
+            indexed += index_texts({text.hash: text.value for text in batch}, hasher)
+            last_hash = batch[-1].hash
+            db.session.commit()
+            db.session.expunge_all()
+            print(f"   - {indexed} slide bodies indexed")
+
+    print(f"✅ Similarity index up to date ({indexed} slide bodies added)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='Drop and rebuild the whole index')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    build(args.rebuild, args.batch_size)
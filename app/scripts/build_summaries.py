@@ -0,0 +1,37 @@
+"""Rebuild the dashboard summaries from the presentation tables
+
+Usage:
+    python scripts/build_summaries.py [--batch-size 10000]
+
+Uploads and deletes keep the summaries up to date, and the app builds them on
+first start, so a rebuild is only needed after changing rows outside the app
+(bulk SQL, restores, scripts/migrate_slide_text.py) or if they drift.
+"""
+import sys
+import os
+import argparse
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db
+from utils.summaries import rebuild_summaries
+
+def build(batch_size):
+    app = create_app()
+
+    with app.app_context():
+        print("📄 Rebuilding dashboard summaries")
+        totals = rebuild_summaries(batch_size=batch_size)
+        db.session.commit()
+
+    print(f"✅ Dashboard summaries rebuilt")
+    print(f"   - {totals['file_count']} files, {totals['slide_count']} slides, {totals['url_count']} URLs")
+    print(f"   - {totals['domain_count']} domains, {totals['text_chars']} characters of slide text")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+    build(args.batch_size)
@@ -0,0 +1,41 @@
+"""Check extracted slide URLs and record which ones are dead
+
+Usage:
+    python scripts/check_links.py [--limit N] [--file-id ID] [--force] [--show-broken]
+
+URLs checked within LINK_CHECK_TTL_SECONDS are skipped unless --force is given.
+Results are served by GET /db/links.
+"""
+import sys
+import os
+import argparse
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, LinkStatus
+from utils.link_checker import run_link_check
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, help='Check at most this many URLs')
+    parser.add_argument('--file-id', type=int, help='Only check URLs from this file')
+    parser.add_argument('--force', action='store_true', help='Recheck URLs even if their result is still fresh')
+    parser.add_argument('--show-broken', action='store_true', help='List every broken URL afterwards')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print("🔗 Checking slide URLs...")
+        stats = run_link_check(app.config, limit=args.limit, file_id=args.file_id, force=args.force)
+        print(f"✅ Checked {stats['checked']} URLs")
+        print(f"   - {stats['ok']} ok")
+        print(f"   - {stats['broken']} broken")
+
+        if args.show_broken:
+            for link in db.session.query(LinkStatus).filter(LinkStatus.ok.is_(False)).order_by(LinkStatus.url):
+                print(f"   ❌ {link.status_code or link.error}: {link.url}")
+
+if __name__ == '__main__':
+    main()
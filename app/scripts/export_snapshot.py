@@ -0,0 +1,50 @@
+"""Export presentation_files, presentation_slides and slide_urls as columnar snapshots
+
+Usage:
+    python scripts/export_snapshot.py [--incremental] [--format parquet|arrow] [--table NAME ...] [--list]
+
+Snapshots are written under EXPORT_DIR and listed in its manifest.json.
+--incremental exports only rows with an id above the previous snapshot's watermark.
+Downloads are served by GET /db/exports/<snapshot_id>/<table> with the EXPORT_API_TOKEN bearer token.
+"""
+import sys
+import os
+import argparse
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from utils.snapshot_export import FORMATS, TABLES, create_snapshot, read_manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--incremental', action='store_true', help='Only rows above the last watermark')
+    parser.add_argument('--format', choices=sorted(FORMATS), help='Output format (default EXPORT_FORMAT)')
+    parser.add_argument('--table', action='append', choices=sorted(TABLES), help='Export only this table (repeatable)')
+    parser.add_argument('--list', action='store_true', help='List existing snapshots and exit')
+    args = parser.parse_args()
+
+    app = create_app()
+    export_dir = app.config['EXPORT_DIR']
+
+    if args.list:
+        for snapshot in read_manifest(export_dir)['snapshots']:
+            rows = ', '.join(f"{table}={entry['rows']}" for table, entry in snapshot['tables'].items())
+            print(f"📄 {snapshot['id']} ({snapshot['format']}): {rows}")
+        return
+
+    with app.app_context():
+        try:
+            snapshot = create_snapshot(app.config, incremental=args.incremental, file_format=args.format,
+                                       tables=args.table)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+
+    print(f"✅ Snapshot {snapshot['id']} written to {os.path.join(export_dir, snapshot['id'])}")
+    for table, entry in snapshot['tables'].items():
+        print(f"   - {table}: {entry['rows']} rows, {entry['bytes']} bytes (watermark {entry['watermark']})")
+
+if __name__ == '__main__':
+    main()
@@ -6,9 +6,10 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app
-from models import db, PresentationFile, PresentationSlide, SlideUrl
+from models import db
 from utils.pptx_parser import extract_text_and_urls
-from datetime import datetime
+from utils.ingest import ingest_presentation
+from utils.search_index import index_new_slides
 
 def init_sample_data():
     """Initialize database with sample data (legacy function - not currently used)"""
@@ -32,38 +33,18 @@ def init_from_pptx(pptx_path):
         
         # Parse PowerPoint file
         print(f"📄 Parsing PowerPoint file: {pptx_path}")
-        slides_data = extract_text_and_urls(pptx_path)
+        slides_data = extract_text_and_urls(pptx_path, app.config['PARSE_INCLUDE_NOTES'])
         
         # Get filename
         filename = os.path.basename(pptx_path)
         
         # Save to database
-        saved_count = 0
-        url_count = 0
-        
-        for slide_data in slides_data:
-            # Create slide record
-            slide = PresentationSlide(
-                slide_number=slide_data['slide_number'],
-                text=slide_data['text'],
-                source_file=filename
-            )
-            db.session.add(slide)
-            db.session.flush()  # Get the slide ID
-            
-            # Create URL records
-            for url_data in slide_data['urls']:
-                url_record = SlideUrl(
-                    slide_id=slide.id,
-                    url=url_data['url'],
-                    link_text=url_data.get('text', '')
-                )
-                db.session.add(url_record)
-                url_count += 1
-            
-            saved_count += 1
+        presentation_file = ingest_presentation(filename, filename, slides_data)
+        saved_count = presentation_file.slide_count
+        url_count = presentation_file.url_count
         
         db.session.commit()
+        index_new_slides(app.config, presentation_file.slides)
         print("✅ PowerPoint data imported!")
         print(f"   - {saved_count} slides imported")
         print(f"   - {url_count} URLs extracted")
@@ -0,0 +1,50 @@
+"""Move inline slide text of existing slides into the content-addressed slide_texts table
+
+Usage:
+    python scripts/migrate_slide_text.py [--batch-size 1000]
+
+Slides keep working without this (their inline text is still read), but only
+migrated slides benefit from deduplication and compression.
+"""
+import sys
+import os
+import argparse
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, PresentationSlide
+from utils.ingest import store_slide_texts
+
+def migrate(batch_size):
+    app = create_app()
+    compress_min_chars = app.config['SLIDE_TEXT_COMPRESS_MIN_CHARS']
+    migrated = 0
+
+    with app.app_context():
+        while True:
+            batch = db.session.execute(
+                db.select(PresentationSlide.id, PresentationSlide.inline_text)
+                .where(PresentationSlide.text_hash.is_(None))
+                .order_by(PresentationSlide.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+
+            hashes = store_slide_texts((text or '' for _, text in batch), compress_min_chars)
+            db.session.execute(
+                db.update(PresentationSlide),
+                [{'id': slide_id, 'text_hash': hashes[text or ''], 'inline_text': None} for slide_id, text in batch]
+            )
+            db.session.commit()
+            migrated += len(batch)
+            print(f"   - {migrated} slides migrated")
+
+    print(f"✅ Slide text migration complete ({migrated} slides)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    migrate(parser.parse_args().batch_size)
@@ -0,0 +1,77 @@
+"""Manage PostgreSQL partitions of presentation_slides and slide_urls
+
+Usage:
+    python scripts/partitions.py list
+    python scripts/partitions.py ensure-months [--ahead 3]
+    python scripts/partitions.py drop-before 2025-01
+
+Run `ensure-months` regularly (e.g. from cron) under DB_PARTITIONING=month so
+next month's partitions exist before the first upload lands in them.
+"""
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app import create_app
+from models import db
+from models.partitioning import PARTITIONED_TABLES, ensure_month_partitions, drop_months_before
+
+def list_partitions():
+    with db.engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            rows = conn.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table ORDER BY c.relname"
+            ), {'table': table}).all()
+            print(f"📦 {table}: {len(rows)} partition(s)")
+            for name, bound in rows:
+                print(f"   - {name}: {bound}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='Show partitions and their bounds')
+    ensure = commands.add_parser('ensure-months', help='Create upcoming month partitions')
+    ensure.add_argument('--ahead', type=int, default=3, help='Months after the current one to create')
+    drop = commands.add_parser('drop-before', help='Drop month partitions (and their files) older than YYYY-MM')
+    drop.add_argument('month', help='First month to keep, as YYYY-MM')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print(f"❌ Error: partitioning needs PostgreSQL, not {db.engine.dialect.name}")
+            sys.exit(1)
+
+        scheme = app.config['DB_PARTITIONING']
+        if args.command != 'list' and scheme != 'month':
+            print(f"❌ Error: {args.command} requires DB_PARTITIONING=month (currently '{scheme}')")
+            sys.exit(1)
+
+        if args.command == 'list':
+            list_partitions()
+        elif args.command == 'ensure-months':
+            with db.engine.begin() as conn:
+                tables = ensure_month_partitions(conn, args.ahead)
+            if not tables:
+                print("❌ Error: the tables are not range-partitioned (they existed before DB_PARTITIONING=month)")
+                sys.exit(1)
+            print(f"✅ Month partitions ensured through {args.ahead} month(s) ahead for {', '.join(tables)}")
+        elif args.command == 'drop-before':
+            cutoff = datetime.strptime(args.month, '%Y-%m').date()
+            dropped = drop_months_before(db.engine, cutoff)
+            print(f"✅ Dropped data older than {args.month}")
+            for table in PARTITIONED_TABLES:
+                print(f"   - {table}: {len(dropped[table])} partition(s)")
+            print(f"   - presentation_files: {dropped['presentation_files']} row(s)")
+            print(f"   - slide_texts: {dropped['slide_texts']} row(s)")
+
+if __name__ == '__main__':
+    main()
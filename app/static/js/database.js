@@ -1,6 +1,7 @@
 // Database viewer JavaScript
 
 let currentTable = null;
+const RECORDS_PAGE_SIZE = 100;  // rows per page of the table viewer
 
 // Load tables on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -181,7 +182,7 @@ function displayTables(tables) {
     `).join('');
 }
 
-async function loadTableRecords(tableName) {
+async function loadTableRecords(tableName, offset = 0) {
     currentTable = tableName;
     
     // Show loading
@@ -193,7 +194,8 @@ async function loadTableRecords(tableName) {
     document.getElementById('records-section').scrollIntoView({ behavior: 'smooth' });
     
     try {
-        const response = await fetch(`/db/table/${tableName}`);
+        // The server returns one page at a time
+        const response = await fetch(`/db/table/${tableName}?limit=${RECORDS_PAGE_SIZE}&offset=${offset}`);
         const data = await response.json();
         
         if (data.error) {
@@ -203,6 +205,7 @@ async function loadTableRecords(tableName) {
         }
         
         displayRecords(data.records, data.table);
+        displayPager(data);
     } catch (error) {
         console.error('Error loading records:', error);
         document.getElementById('records-container').innerHTML = 
@@ -278,11 +281,30 @@ function displayRecords(records, tableName) {
     });
     
     html += '</tbody></table>';
-    html += `<div style="margin-top: 15px; color: #666;">Total: ${records.length} records</div>`;
     
     container.innerHTML = html;
 }
 
+function displayPager(data) {
+    const first = data.count ? data.offset + 1 : 0;
+    const last = data.offset + data.count;
+    const previous = Math.max(data.offset - data.limit, 0);
+    const hasNext = last < data.total;
+    
+    let html = `<div style="margin-top: 15px; color: #666;">Showing ${first}-${last} of ${data.total} records`;
+    if (data.offset > 0) {
+        html += ` <button onclick="loadTableRecords('${data.table}', ${previous})" class="btn btn-secondary" 
+                          style="padding: 5px 10px; font-size: 12px;">Previous</button>`;
+    }
+    if (hasNext) {
+        html += ` <button onclick="loadTableRecords('${data.table}', ${last})" class="btn btn-secondary" 
+                          style="padding: 5px 10px; font-size: 12px;">Next</button>`;
+    }
+    html += '</div>';
+    
+    document.getElementById('records-container').insertAdjacentHTML('beforeend', html);
+}
+
 function closeRecords() {
     document.getElementById('records-section').style.display = 'none';
     currentTable = null;
@@ -0,0 +1,29 @@
+"""Shared fixtures: every test app runs on throwaway SQLite files"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py builds a module-level app on import, so it needs a usable environment first
+_BASE_DIR = tempfile.mkdtemp(prefix='app_tests_')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_BASE_DIR}/import.db')
+os.environ.setdefault('SEARCH_INDEX_DIR', os.path.join(_BASE_DIR, 'search_index'))
+os.environ['ADMISSION_ENABLED'] = 'False'
+os.environ['PARSE_EXECUTOR_WORKERS'] = '0'
+
+
+@pytest.fixture
+def make_app(monkeypatch, tmp_path):
+    """Factory for apps on a fresh primary database in ``tmp_path``; keyword arguments become env vars"""
+    from app import create_app
+
+    def factory(**env):
+        monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path}/primary.db')
+        monkeypatch.setenv('SEARCH_INDEX_DIR', str(tmp_path / 'search_index'))
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        return create_app()
+    return factory
@@ -0,0 +1,32 @@
+"""Admission rules: method-specific paths and client addresses behind a proxy"""
+import pytest
+
+from utils.admission import parse_rules
+
+
+def limited_app(make_app, **env):
+    return make_app(ADMISSION_ENABLED=True, ADMISSION_CONCURRENCY='', ADMISSION_RATE_LIMITS='POST /db/upload=1/60', **env)
+
+
+def test_parse_rules_accepts_a_method():
+    assert parse_rules(['post /db/upload/=2', '/db/uploads=4']) == {'POST /db/upload': '2', '/db/uploads': '4'}
+    with pytest.raises(ValueError):
+        parse_rules(['POST/db/upload=2'])
+
+
+def test_method_rule_leaves_the_form_alone(make_app):
+    client = limited_app(make_app).test_client()
+    assert client.post('/db/upload').status_code == 400  # admitted, no file
+    assert client.post('/db/upload').status_code == 429
+    assert client.get('/db/upload').status_code == 200
+
+
+def test_forwarded_for_is_only_trusted_when_configured(make_app):
+    client = limited_app(make_app).test_client()
+    assert client.post('/db/upload', headers={'X-Forwarded-For': '203.0.113.1'}).status_code == 400
+    assert client.post('/db/upload', headers={'X-Forwarded-For': '203.0.113.2'}).status_code == 429
+
+    client = limited_app(make_app, PROXY_FIX_X_FOR=1).test_client()
+    assert client.post('/db/upload', headers={'X-Forwarded-For': '203.0.113.1'}).status_code == 400
+    assert client.post('/db/upload', headers={'X-Forwarded-For': '203.0.113.2'}).status_code == 400
+    assert client.post('/db/upload', headers={'X-Forwarded-For': '198.51.100.9, 203.0.113.2'}).status_code == 429
@@ -0,0 +1,75 @@
+"""Resumable uploads: validation, finalize failures and the expiry sweep"""
+import hashlib
+import os
+import time
+
+import pytest
+
+from utils import chunked_upload
+from utils.chunked_upload import UploadSessionStore
+
+
+@pytest.fixture
+def client(make_app, tmp_path):
+    app = make_app(UPLOAD_SESSION_DIR=tmp_path / 'sessions')
+    return app.test_client()
+
+
+def start(client, size, **extra):
+    response = client.post('/db/uploads', json={'filename': 'deck.pptx', 'size': size, **extra})
+    assert response.status_code == 201
+    return f"/db/uploads/{response.get_json()['upload_id']}"
+
+
+def test_size_must_be_an_integer(client):
+    assert client.post('/db/uploads', json={'filename': 'deck.pptx', 'size': True}).status_code == 400
+    assert client.post('/db/uploads', json={'filename': 'deck.pptx', 'size': '10'}).status_code == 400
+
+
+def test_content_range_size_must_match(client):
+    url = start(client, 10)
+    response = client.put(url, data=b'12345', headers={'Content-Range': 'bytes 0-4/11'})
+    assert response.status_code == 400
+    assert client.put(url, data=b'12345', headers={'Content-Range': 'bytes 0-4/*'}).status_code == 200
+    assert client.put(url, data=b'67890', headers={'Content-Range': 'bytes 5-9/10'}).get_json()['offset'] == 10
+
+
+def test_session_survives_a_failed_ingest(client, monkeypatch):
+    data = b'not really a deck' * 4
+    url = start(client, len(data), sha256=hashlib.sha256(data).hexdigest())
+    client.put(url, data=data, headers={'Content-Range': f'bytes 0-{len(data) - 1}/{len(data)}'})
+
+    def failing_upload(*args):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr('routes.database.process_saved_upload', failing_upload)
+    assert client.post(f'{url}/finalize').status_code == 500
+    assert client.get(url).get_json()['offset'] == len(data)
+
+    monkeypatch.setattr('routes.database.process_saved_upload', lambda *args: ('done', 200))
+    assert client.post(f'{url}/finalize').status_code == 200
+    assert client.get(url).status_code == 404
+
+
+def test_expiry_sweep_runs_under_the_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, 'ORPHAN_GRACE_SECONDS', 0)
+    store = UploadSessionStore(str(tmp_path), ttl_seconds=0.1)
+    busy = store.create('busy.pptx', 10)['id']
+    idle = store.create('idle.pptx', 10)['id']
+    for name in ('0' * 32 + '.part', '1' * 32 + '.json', f'{idle}.json.abc.tmp'):
+        open(tmp_path / name, 'w').close()
+    time.sleep(0.2)
+
+    with store._locked(busy):
+        assert store.expire() == 4
+    assert sorted(os.listdir(tmp_path)) == [f'{busy}.json', f'{busy}.part']
+    assert store.expire() == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_sessions_expire_on_any_access(make_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, 'EXPIRE_INTERVAL_SECONDS', 0)
+    client = make_app(UPLOAD_SESSION_DIR=tmp_path / 'sessions', UPLOAD_SESSION_TTL_SECONDS=1).test_client()
+    start(client, 10)
+    time.sleep(1.1)
+    assert client.get('/db/uploads/' + '0' * 32).status_code == 404
+    assert os.listdir(tmp_path / 'sessions') == []
@@ -0,0 +1,159 @@
+"""Link checks against a local stub HTTP server"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from models import db, SlideUrl
+from utils.ingest import ingest_presentation
+from utils import link_checker
+from utils.link_checker import LinkChecker, run_link_check
+from utils.parse_result import ParsedSlide, SlideLink
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """200 for anything, 404 under /dead, 405 to HEAD under /nohead, half a second late under /slow,
+    and /redirect?<url> redirects to <url>"""
+
+    def respond(self, body=b''):
+        if self.path.startswith('/redirect?'):
+            self.send_response(302)
+            self.send_header('Location', self.path.split('?', 1)[1])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        if self.path.startswith('/dead'):
+            status = 404
+        elif self.path.startswith('/nohead') and self.command == 'HEAD':
+            status = 405
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.respond()
+
+    def do_GET(self):
+        self.respond(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_port():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_head_get_fallback_and_failures(stub_port):
+    base = f'http://127.0.0.1:{stub_port}'
+    results = {result['url']: result for result in LinkChecker(timeout=5, allow_private=True).check(
+        [f'{base}/page', f'{base}/nohead', f'{base}/dead', 'http://127.0.0.1:1/closed']
+    )}
+    assert results[f'{base}/page']['ok'] and results[f'{base}/page']['method'] == 'HEAD'
+    assert results[f'{base}/nohead']['ok'] and results[f'{base}/nohead']['method'] == 'GET'
+    assert results[f'{base}/dead']['status_code'] == 404 and not results[f'{base}/dead']['ok']
+    closed = results['http://127.0.0.1:1/closed']
+    assert not closed['ok'] and closed['status_code'] is None and closed['error']
+
+
+def test_non_public_targets_are_blocked(stub_port, monkeypatch):
+    results = {result['url']: result for result in LinkChecker(timeout=5).check(
+        [f'http://127.0.0.1:{stub_port}/page', f'http://localhost:{stub_port}/page', 'http://169.254.169.254/']
+    )}
+    assert all(not result['ok'] and result['error'].startswith('blocked:') for result in results.values())
+
+    # Pretend 127.0.0.1 is public: a redirect from it to another loopback address is still refused
+    monkeypatch.setattr(link_checker, 'is_public_address', lambda address: address == '127.0.0.1')
+    target = f'http://127.0.0.2:{stub_port}/page'
+    result, = LinkChecker(timeout=5).check([f'http://127.0.0.1:{stub_port}/redirect?{target}'])
+    assert result['error'] == 'blocked: 127.0.0.2 is not a public address'
+    ok, = LinkChecker(timeout=5).check([f'http://127.0.0.1:{stub_port}/redirect?/page'])
+    assert ok['ok'] and ok['status_code'] == 200
+
+
+def test_busy_host_does_not_hold_global_slots(stub_port):
+    # Two global slots, one per host: the slow host's queue must not take the second one
+    slow = [f'http://127.0.0.1:{stub_port}/slow/{n}' for n in range(4)]
+    other = f'http://localhost:{stub_port}/page'
+    results = LinkChecker(concurrency=2, per_domain=1, timeout=5, allow_private=True).check(slow + [other])
+    elapsed = {result['url']: result['elapsed_ms'] for result in results}
+    assert all(result['ok'] for result in results)
+    assert elapsed[other] < 400
+    assert max(elapsed[url] for url in slow) >= 1900
+
+
+def test_links_route_pages_in_url_order(make_app, stub_port):
+    base = f'http://127.0.0.1:{stub_port}'
+    app = make_app(LINK_CHECK_TIMEOUT_SECONDS=5, LINK_CHECK_ALLOW_PRIVATE=True, LINK_CHECK_BATCH_SIZE=1)
+    with app.app_context():
+        first = ingest_presentation('a.pptx', 'a.pptx', [
+            ParsedSlide(1, 'one', [SlideLink(f'{base}/a', 'a'), SlideLink(f'{base}/dead', 'dead')]),
+            ParsedSlide(2, 'two', [SlideLink(f'{base}/a#top', 'a again'), SlideLink('mailto:x@example.com', 'mail')]),
+        ])
+        ingest_presentation('b.pptx', 'b.pptx', [ParsedSlide(1, 'three', [SlideLink(f'{base}/b', 'b')])])
+        db.session.commit()
+        first_id = first.id
+
+        stats = run_link_check(app.config, file_id=first_id)
+        assert stats == {'checked': 2, 'ok': 1, 'broken': 1}
+        unchecked = app.test_client().get('/db/links?status=unchecked').get_json()
+        assert [link['url'] for link in unchecked['links']] == [f'{base}/b']
+        # Rows stored before ingest normalized URLs are picked up by the next check
+        db.session.execute(db.update(SlideUrl).where(SlideUrl.url == f'{base}/b').values(normalized_url=None))
+        db.session.commit()
+
+    client = app.test_client()
+    body = client.get('/db/links?limit=2').get_json()
+    assert body['summary'] == {'total': 2, 'ok': 1, 'broken': 1, 'unchecked': 0}
+    assert [link['url'] for link in body['links']] == [f'{base}/a', f'{base}/dead']
+
+    with app.app_context():
+        assert run_link_check(app.config) == {'checked': 1, 'ok': 1, 'broken': 0}
+
+    body = client.get('/db/links?limit=2&offset=1').get_json()
+    assert body['summary'] == {'total': 3, 'ok': 2, 'broken': 1, 'unchecked': 0}
+    assert [link['url'] for link in body['links']] == [f'{base}/b', f'{base}/dead']
+    assert [link['url'] for link in client.get('/db/links?status=broken').get_json()['links']] == [f'{base}/dead']
+
+    body = client.get(f'/db/links?file_id={first_id}').get_json()
+    assert body['summary']['total'] == 2
+    assert client.get('/db/links?status=unchecked').get_json()['links'] == []
+
+
+def test_batches_are_saved_as_they_finish(make_app, stub_port, monkeypatch):
+    base = f'http://127.0.0.1:{stub_port}'
+    app = make_app(LINK_CHECK_TIMEOUT_SECONDS=5, LINK_CHECK_ALLOW_PRIVATE=True, LINK_CHECK_BATCH_SIZE=2)
+    with app.app_context():
+        ingest_presentation('a.pptx', 'a.pptx', [
+            ParsedSlide(1, 'one', [SlideLink(f'{base}/{name}', name) for name in 'abcde'])
+        ])
+        db.session.commit()
+
+        batches = []
+        check = LinkChecker.check
+
+        def failing_third_batch(self, urls):
+            batches.append(list(urls))
+            if len(batches) == 3:
+                raise RuntimeError('worker killed')
+            return check(self, urls)
+        monkeypatch.setattr(LinkChecker, 'check', failing_third_batch)
+        with pytest.raises(RuntimeError):
+            run_link_check(app.config)
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+
+        monkeypatch.setattr(LinkChecker, 'check', check)
+        assert run_link_check(app.config) == {'checked': 1, 'ok': 1, 'broken': 0}
@@ -0,0 +1,30 @@
+"""Upload memory profiles are recorded for failed uploads too"""
+import tracemalloc
+
+from pptx import Presentation
+
+from utils.memory_profile import recent_profiles
+
+
+def test_failed_ingest_is_profiled(make_app, tmp_path, monkeypatch):
+    deck = tmp_path / 'deck.pptx'
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = 'Hello'
+    prs.save(deck)
+
+    app = make_app(MEMORY_PROFILE_ENABLED=True)
+
+    def failing_ingest(*args):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr('routes.database.ingest_presentation', failing_ingest)
+    try:
+        with open(deck, 'rb') as f:
+            response = app.test_client().post('/db/upload', data={'file': (f, 'deck.pptx')})
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 500
+    profile = recent_profiles(1)[0]
+    assert profile['label'] == 'deck.pptx'
+    assert profile['error'] == 'RuntimeError: database unavailable'
+    assert [phase['phase'] for phase in profile['phases']] == ['parse']
@@ -0,0 +1,88 @@
+"""Read-replica routing against two SQLite files standing in for replicas"""
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from models import db, read_session
+from models.replicas import PRIMARY_COOKIE
+
+
+@pytest.fixture
+def replica_urls(tmp_path):
+    urls = [f'sqlite:///{tmp_path}/replica1.db', f'sqlite:///{tmp_path}/replica2.db']
+    for url in urls:
+        engine = create_engine(url)
+        db.metadata.create_all(engine)
+        engine.dispose()
+    return urls
+
+
+def served_by(app, path='/db/files', method='GET', cookie=None):
+    """URL of the engine read_session() picks for a request"""
+    headers = {'Cookie': f'{PRIMARY_COOKIE}={cookie}'} if cookie else {}
+    with app.test_request_context(path, method=method, headers=headers):
+        session = read_session()
+        return str(session.get_bind().url)
+
+
+def test_round_robin_alternates(make_app, replica_urls):
+    app = make_app(DATABASE_REPLICA_URLS=','.join(replica_urls))
+    picks = [served_by(app) for _ in range(4)]
+    assert set(picks) == set(replica_urls)
+    assert picks[0] != picks[1] and picks[0] == picks[2]
+
+
+def test_least_connections_prefers_idle_replica(make_app, replica_urls):
+    app = make_app(DATABASE_REPLICA_URLS=','.join(replica_urls), DATABASE_REPLICA_STRATEGY='least_connections')
+    router = app.extensions['replica_router']
+    busy, session = router.acquire()
+    try:
+        for _ in range(3):
+            assert served_by(app) != busy.url
+    finally:
+        router.release(busy, session)
+
+
+def test_writes_and_sticky_reads_use_primary(make_app, replica_urls):
+    app = make_app(DATABASE_REPLICA_URLS=','.join(replica_urls))
+    primary = app.config['SQLALCHEMY_DATABASE_URI']
+    assert served_by(app, method='POST') == primary
+
+    response = app.test_client().post('/db/clear')
+    assert response.status_code == 200
+    cookie = response.headers['Set-Cookie']
+    assert cookie.startswith(PRIMARY_COOKIE)
+    until = cookie.split(';')[0].split('=', 1)[1]
+    assert served_by(app, cookie=until) == primary
+    # An expired window goes back to the replicas
+    assert served_by(app, cookie='1') in replica_urls
+
+
+def test_unreachable_replica_is_ejected(make_app, replica_urls, tmp_path):
+    dead = f'sqlite:///{tmp_path}/missing/replica.db'
+    app = make_app(DATABASE_REPLICA_URLS=f'{replica_urls[0]},{dead}')
+    picks = {served_by(app) for _ in range(4)}
+    assert picks == {replica_urls[0]}
+    replicas = {replica.url: replica for replica in app.extensions['replica_router'].replicas}
+    assert replicas[dead].failures == 1
+
+
+def test_replica_failing_queries_is_ejected(make_app, replica_urls, tmp_path):
+    # Accepts connections but has no tables, so every query fails
+    broken = f'sqlite:///{tmp_path}/empty.db'
+    app = make_app(DATABASE_REPLICA_URLS=f'{replica_urls[0]},{broken}')
+    client = app.test_client()
+    statuses = [client.get('/db/files').status_code for _ in range(2)]
+    assert sorted(statuses) == [200, 500]
+
+    replicas = {replica.url: replica for replica in app.extensions['replica_router'].replicas}
+    assert not replicas[broken].is_available(time.time())
+    assert all(client.get('/db/files').status_code == 200 for _ in range(4))
+    assert {served_by(app) for _ in range(4)} == {replica_urls[0]}
+
+
+def test_all_replicas_ejected_falls_back_to_primary(make_app, tmp_path):
+    dead = [f'sqlite:///{tmp_path}/missing/r{i}.db' for i in range(2)]
+    app = make_app(DATABASE_REPLICA_URLS=','.join(dead))
+    assert served_by(app) == app.config['SQLALCHEMY_DATABASE_URI']
@@ -0,0 +1,64 @@
+"""Segmented search index: incremental refresh, compaction lock and compactor start-up"""
+import numpy as np
+
+from utils.search_index import SearchIndex, get_search_index
+
+
+def full_norms(index):
+    """Norms recomputed from every segment at once, as a fresh process would"""
+    df = sum(index._document_frequency(matrix, index.num_features) for matrix in index._matrices)
+    weights = index._idf_weights(df, len(index._slide_ids))
+    return np.concatenate([index._row_norms(matrix, weights) for matrix in index._matrices])
+
+
+def test_refresh_adds_only_new_deltas(tmp_path):
+    index = SearchIndex(str(tmp_path), num_features=1 << 12)
+    index.build([(1, 'quarterly revenue grew'), (2, 'legal disclaimer text')])
+    index.refresh()
+    base_norms = index._base_norms
+
+    index.add_documents([(3, 'revenue forecast'), (4, 'disclaimer')])
+    assert index.search(['revenue'], k=5)[0][0][0] in (1, 3)
+    assert index._base_norms is base_norms
+    assert index._df.sum() == sum(len(set(text.split())) for text in
+                                  ['quarterly revenue grew', 'legal disclaimer text', 'revenue forecast', 'disclaimer'])
+
+    # A fresh process and a compaction both start from exact norms again
+    fresh = SearchIndex(str(tmp_path), num_features=1 << 12)
+    fresh.refresh()
+    np.testing.assert_allclose(fresh._norms, full_norms(fresh), rtol=1e-6)
+    assert index.compact(lambda: [1, 3, 4])
+    index.refresh()
+    assert sorted(index._slide_ids) == [1, 3, 4]
+    np.testing.assert_allclose(index._norms, full_norms(index), rtol=1e-6)
+
+
+def test_compact_loads_alive_ids_only_under_the_lock(tmp_path):
+    index = SearchIndex(str(tmp_path), num_features=1 << 12)
+    index.add_documents([(1, 'some text')])
+    calls = []
+    with index._exclusive() as acquired:
+        assert acquired
+        assert not index.compact(lambda: calls.append('loaded') or [1])
+    assert calls == []
+    assert index.compact(lambda: calls.append('loaded') or [1])
+    assert calls == ['loaded']
+
+
+def test_compactor_starts_with_the_first_request(make_app):
+    app = make_app(SEARCH_COMPACT_INTERVAL_SECONDS=3600)
+    index = get_search_index(app.config)
+    assert index._compactor is None
+    app.test_client().get('/db/files')
+    assert index._compactor is not None and index._compactor.is_alive()
+
+
+def test_clearing_the_database_empties_the_index(make_app):
+    app = make_app()
+    index = get_search_index(app.config)
+    index.add_documents([(1, 'quarterly revenue'), (2, 'revenue forecast')])
+    assert app.test_client().post('/db/clear').status_code == 200
+    index.refresh()
+    assert len(index._slide_ids) == 0
+    assert index.search(['revenue'], k=5) == [[]]
+    assert index.stats()['pending_deltas'] == 0
@@ -0,0 +1,54 @@
+"""Near-duplicate slide lookups stay bounded for bodies shared by many slides"""
+from sqlalchemy import event
+
+from models import db
+from utils.ingest import ingest_presentation
+from utils.parse_result import ParsedSlide
+
+BODY = 'confidential do not distribute quarterly results prepared by the finance team for internal review only'
+
+
+def test_similar_slides_limits_in_sql(make_app):
+    app = make_app()
+    with app.app_context():
+        deck = ingest_presentation('a.pptx', 'a.pptx', [ParsedSlide(n, BODY, []) for n in range(1, 41)] + [
+            ParsedSlide(41, BODY + ' appendix', [])
+        ])
+        db.session.commit()
+        slide_ids = sorted(slide.id for slide in deck.slides)
+        engine = db.engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        top = client.get(f'/db/slides/{slide_ids[0]}/similar?limit=5').get_json()['similar']
+        every = client.get(f'/db/slides/{slide_ids[0]}/similar?limit=100').get_json()['similar']
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert [slide['id'] for slide in top] == slide_ids[1:6]
+    assert all(slide['similarity'] == 1.0 for slide in top)
+    assert any('FROM presentation_slides' in statement and 'LIMIT' in statement for statement in statements)
+
+    # Identical bodies first, by id, then the near-duplicate
+    assert [slide['id'] for slide in every] == slide_ids[1:]
+    assert every[-1]['similarity'] < 1.0
+
+
+def test_similar_files_with_batched_signatures(make_app, monkeypatch):
+    monkeypatch.setattr('utils.similarity_index.SIGNATURE_BATCH_SIZE', 2)
+    app = make_app()
+    bodies = [f'{BODY} section {n} of the appendix' for n in range(5)]
+    with app.app_context():
+        first = ingest_presentation('a.pptx', 'a.pptx', [ParsedSlide(n, body, []) for n, body in enumerate(bodies, 1)])
+        second = ingest_presentation('b.pptx', 'b.pptx', [ParsedSlide(n, body, []) for n, body in enumerate(bodies, 1)])
+        db.session.commit()
+        first_id, second_id = first.id, second.id
+
+    body = app.test_client().get(f'/db/files/{first_id}/similar').get_json()
+    match, = body['similar']
+    assert match['file']['id'] == second_id and match['shared_slides'] == 5
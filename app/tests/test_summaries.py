@@ -0,0 +1,52 @@
+"""Dashboard summaries stay equal to a full rebuild when files are removed in bulk"""
+from models import db, PresentationFile, PresentationSlide, SlideUrl, DomainSummary, SummaryTotals
+from utils.ingest import ingest_presentation
+from utils.parse_result import ParsedSlide, SlideLink
+from utils.summaries import TOTALS_ID, rebuild_summaries, record_bulk_delete
+
+
+def snapshot():
+    totals = db.session.get(SummaryTotals, TOTALS_ID).to_dict()
+    totals.pop('updated_at')
+    domains = sorted((d.domain, d.url_count, d.file_count) for d in db.session.query(DomainSummary))
+    return totals, domains
+
+
+def test_bulk_delete_matches_a_rebuild(make_app):
+    app = make_app()
+    with app.app_context():
+        ids = [ingest_presentation(f'{n}.pptx', f'{n}.pptx', [
+            ParsedSlide(1, f'deck {n}', [SlideLink('https://shared.example/a', 'shared'),
+                                         SlideLink(f'https://only{n}.example/', 'own')]),
+        ]).id for n in range(3)]
+        db.session.commit()
+
+        record_bulk_delete(db.session, db.select(PresentationFile.id).where(PresentationFile.id.in_(ids[:2])))
+        for model, column in ((SlideUrl, SlideUrl.file_id), (PresentationSlide, PresentationSlide.file_id),
+                              (PresentationFile, PresentationFile.id)):
+            db.session.query(model).filter(column.in_(ids[:2])).delete()
+        db.session.commit()
+        incremental = snapshot()
+        assert incremental[0]['file_count'] == 1
+        assert incremental[1] == [('only2.example', 1, 1), ('shared.example', 1, 1)]
+
+        rebuild_summaries()
+        db.session.commit()
+        assert snapshot() == incremental
+
+    files = app.test_client().get('/db/files').get_json()['files']
+    assert [(f['id'], f['url_count']) for f in files] == [(ids[2], 2)]
+
+
+def test_files_route_keeps_the_file_fields(make_app):
+    app = make_app()
+    with app.app_context():
+        presentation_file = ingest_presentation('deck_1.pptx', 'deck 1.pptx', [
+            ParsedSlide(1, 'hello', [SlideLink('https://example.com/', 'example')])
+        ])
+        db.session.commit()
+        expected = presentation_file.to_dict()
+
+    listed, = app.test_client().get('/db/files').get_json()['files']
+    assert {key: listed[key] for key in expected} == expected
+    assert listed['domain_count'] == 1
@@ -0,0 +1,23 @@
+"""Table browsing returns pages in slide-number order with each slide's URLs and the table total"""
+from models import db
+from utils.ingest import ingest_presentation
+from utils.parse_result import ParsedSlide, SlideLink
+
+
+def test_table_pages(make_app):
+    app = make_app()
+    with app.app_context():
+        for deck in ('a.pptx', 'b.pptx'):
+            ingest_presentation(deck, deck, [
+                ParsedSlide(number, f'{deck} slide {number}', [SlideLink(f'https://example.com/{deck}/{number}', 'link')])
+                for number in range(1, 4)
+            ])
+        db.session.commit()
+
+    client = app.test_client()
+    body = client.get('/db/table/presentation_slides?limit=2&offset=1').get_json()
+    assert (body['total'], body['count'], body['offset'], body['limit']) == (6, 2, 1, 2)
+    # Slide 1 of a is skipped; then slide 1 of b and slide 2 of a
+    assert [(slide['file_name'], slide['slide_number']) for slide in body['records']] == [('b.pptx', 1), ('a.pptx', 2)]
+    assert [url['url'] for url in body['records'][1]['urls']] == ['https://example.com/a.pptx/2']
+    assert client.get('/db/table/slide_urls?limit=5000').get_json()['limit'] == 1000
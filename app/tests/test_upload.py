@@ -0,0 +1,25 @@
+"""Single-request uploads are saved under a unique name and always cleaned up"""
+import os
+
+
+def test_uploads_with_the_same_name_get_their_own_file(make_app, tmp_path, monkeypatch):
+    monkeypatch.setattr('routes.database.UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    seen = []
+
+    def record_upload(filepath, filename, original_filename):
+        with open(filepath, 'rb') as f:
+            seen.append((filepath, filename, original_filename, f.read()))
+        return 'done', 200
+    monkeypatch.setattr('routes.database.process_saved_upload', record_upload)
+
+    client = make_app().test_client()
+    for body in (b'first', b'second'):
+        with open(tmp_path / 'deck.pptx', 'wb') as f:
+            f.write(body)
+        with open(tmp_path / 'deck.pptx', 'rb') as f:
+            assert client.post('/db/upload', data={'file': (f, 'My Deck.pptx')}).status_code == 200
+
+    assert seen[0][0] != seen[1][0]
+    assert [entry[1:] for entry in seen] == [('My_Deck.pptx', 'My Deck.pptx', b'first'),
+                                             ('My_Deck.pptx', 'My Deck.pptx', b'second')]
+    assert os.listdir(tmp_path / 'uploads') == []
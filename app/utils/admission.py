@@ -0,0 +1,247 @@
+"""Admission control for expensive endpoints
+
+Each gunicorn worker serves requests on a fixed number of threads. If a handful
+of uploads or large table reads take all of them, cheap requests such as
+``/api/health`` queue behind them and time out. Admission control instead
+rejects excess heavy requests straight away:
+
+- Rules match request paths (``/db/upload`` matches itself and anything below
+  it, not ``/db/uploads``) and give each path a concurrency limit and/or a
+  per-client token bucket (``count/seconds``). A rule written as
+  ``POST /db/upload`` only applies to that method.
+- Clients are keyed by ``remote_addr``. Behind a reverse proxy set
+  PROXY_FIX_X_FOR so it comes from the trusted X-Forwarded-For entry.
+- All limited requests share a heavy lane of ADMISSION_HEAVY_SLOTS threads.
+  Keeping it below the worker's thread count leaves the remaining threads as
+  a reserved lane for health checks and the unlimited cheap reads.
+- A request whose client bucket is empty gets ``429``. A request that finds
+  the heavy lane or its route full gets ``503``. Both responses carry
+  ``Retry-After``. A request may wait up to ADMISSION_QUEUE_TIMEOUT_SECONDS
+  for a route slot. It waits while holding a heavy-lane slot, so waiting
+  never takes threads from the reserved lane.
+
+Limits and counters are per worker process, like parse_stats().
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+import math
+import threading
+import time
+
+from flask import g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+# Client buckets are pruned once there are this many, dropping the ones that have refilled
+_MAX_BUCKETS = 10000
+
+
+def parse_rules(entries: List[str]) -> Dict[str, str]:
+    """Parse ``[METHOD ]path=value`` entries from a comma-separated setting; keys are ``[METHOD ]path``"""
+    rules = {}
+    for entry in entries:
+        target, sep, value = entry.strip().partition('=')
+        method, _, path = target.strip().rpartition(' ')
+        if not sep or not path.startswith('/') or (method and not method.isalpha()):
+            raise ValueError(f"Invalid admission rule '{entry}', expected [METHOD ]/path=value")
+        path = path.rstrip('/') or '/'
+        rules[f'{method.upper()} {path}' if method else path] = value.strip()
+    return rules
+
+
+def parse_rate(value: str) -> Tuple[float, float]:
+    """``'30/60'`` -> (capacity 30, refill 0.5 tokens per second)"""
+    count, _, seconds = value.partition('/')
+    capacity, period = float(count), float(seconds or 1)
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate '{value}', expected count/seconds")
+    return capacity, capacity / period
+
+
+class _Rule:
+    def __init__(self, key: str, concurrency: int = 0, rate: Optional[Tuple[float, float]] = None):
+        self.key = key
+        method, _, self.path = key.rpartition(' ')
+        self.method = method or None
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self.capacity, self.refill = rate if rate else (0.0, 0.0)
+        self.buckets = {}  # client -> [tokens, last refill time]
+        self.lock = threading.Lock()
+        self.counts = {
+            'admitted': 0, 'queued': 0, 'rejected_rate': 0, 'rejected_busy': 0, 'in_flight': 0
+        }
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method is not None and method != self.method:
+            return False
+        return path == self.path or path.startswith(self.path + '/') or self.path == '/'
+
+    def take_token(self, client: str, now: float) -> float:
+        """Consume a token for ``client``; returns 0 or the seconds until one is available"""
+        if not self.capacity:
+            return 0.0
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                if len(self.buckets) >= _MAX_BUCKETS:
+                    self._prune(now)
+                bucket = self.buckets[client] = [self.capacity, now]
+            tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                return (1 - tokens) / self.refill
+            bucket[0] = tokens - 1
+            return 0.0
+
+    def _prune(self, now: float):
+        full_after = self.capacity / self.refill
+        for client, (_, last) in list(self.buckets.items()):
+            if now - last >= full_after:
+                del self.buckets[client]
+
+    def count(self, key: str, delta: int = 1):
+        with self.lock:
+            self.counts[key] += delta
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counts)
+        stats['concurrency'] = self.concurrency or None
+        stats['rate'] = f'{self.capacity:g}/{self.capacity / self.refill:g}s' if self.capacity else None
+        return stats
+
+
+class AdmissionController:
+    def __init__(self, concurrency: Dict[str, int], rates: Dict[str, Tuple[float, float]],
+                 heavy_slots: int, queue_timeout: float = 0.0, retry_after: int = 1):
+        rules = [_Rule(key, concurrency.get(key, 0), rates.get(key)) for key in set(concurrency) | set(rates)]
+        # Longest path first; for the same path a method-specific rule wins
+        self.rules = sorted(rules, key=lambda rule: (len(rule.path), rule.method is not None), reverse=True)
+        self.heavy_slots = heavy_slots
+        self.heavy_lane = threading.BoundedSemaphore(heavy_slots)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._heavy_in_flight = 0
+        self._heavy_rejected = 0
+
+    def match(self, method: str, path: str) -> Optional[_Rule]:
+        """Most specific rule for a request (rules are sorted longest path first)"""
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    def admit(self, rule: _Rule, client: str):
+        """
+        Take a token and slots for one request.
+
+        Returns:
+            None when admitted (call release() afterwards), else an error response
+        """
+        wait = rule.take_token(client, time.monotonic())
+        if wait:
+            rule.count('rejected_rate')
+            return self._reject(429, f'Rate limit for {rule.key} exceeded', math.ceil(wait))
+
+        if not self.heavy_lane.acquire(blocking=False):
+            rule.count('rejected_busy')
+            with self._lock:
+                self._heavy_rejected += 1
+            return self._reject(503, 'Server busy, retry shortly', self.retry_after)
+
+        if rule.slots is not None and not rule.slots.acquire(blocking=False):
+            acquired = False
+            if self.queue_timeout > 0:
+                rule.count('queued')
+                acquired = rule.slots.acquire(timeout=self.queue_timeout)
+            if not acquired:
+                self.heavy_lane.release()
+                rule.count('rejected_busy')
+                return self._reject(503, f'Too many concurrent requests to {rule.key}', self.retry_after)
+
+        with self._lock:
+            self._heavy_in_flight += 1
+        rule.count('admitted')
+        rule.count('in_flight')
+        return None
+
+    def release(self, rule: _Rule):
+        rule.count('in_flight', -1)
+        if rule.slots is not None:
+            rule.slots.release()
+        with self._lock:
+            self._heavy_in_flight -= 1
+        self.heavy_lane.release()
+
+    @staticmethod
+    def _reject(status: int, message: str, retry_after: int):
+        response = jsonify({'error': message, 'retry_after': retry_after})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, retry_after))
+        return response
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lane = {
+                'slots': self.heavy_slots,
+                'in_flight': self._heavy_in_flight,
+                'rejected': self._heavy_rejected
+            }
+        return {
+            'heavy_lane': lane,
+            'routes': {rule.key: rule.to_dict() for rule in self.rules}
+        }
+
+
+def admission_stats(app) -> Optional[Dict]:
+    """Counters of this worker process, or None when admission control is off"""
+    controller = app.extensions.get('admission')
+    return controller.stats() if controller is not None else None
+
+
+def init_admission(app):
+    """Install the admission checks as request hooks (ADMISSION_ENABLED=False skips this)"""
+    if not app.config.get('ADMISSION_ENABLED', True):
+        return
+
+    concurrency = {path: int(value) for path, value in parse_rules(app.config.get('ADMISSION_CONCURRENCY', [])).items()}
+    rates = {path: parse_rate(value) for path, value in parse_rules(app.config.get('ADMISSION_RATE_LIMITS', [])).items()}
+    controller = AdmissionController(
+        concurrency, rates,
+        heavy_slots=max(1, app.config.get('ADMISSION_HEAVY_SLOTS', 6)),
+        queue_timeout=app.config.get('ADMISSION_QUEUE_TIMEOUT_SECONDS', 0.0),
+        retry_after=app.config.get('ADMISSION_RETRY_AFTER_SECONDS', 1)
+    )
+    app.extensions['admission'] = controller
+
+    threads = app.config.get('GUNICORN_THREADS')
+    if threads and controller.heavy_slots >= threads:
+        logger.warning(f"ADMISSION_HEAVY_SLOTS={controller.heavy_slots} leaves no reserved threads "
+                       f"out of {threads}; health checks can queue behind heavy requests")
+
+    @app.before_request
+    def admit_request():
+        if request.method == 'OPTIONS':
+            return None
+        rule = controller.match(request.method, request.path)
+        if rule is None:
+            return None
+        rejected = controller.admit(rule, request.remote_addr or 'unknown')
+        if rejected is not None:
+            logger.info(f"Admission rejected {request.method} {request.path} from {request.remote_addr}: "
+                        f"{rejected.status_code}")
+            return rejected
+        g.admission_rule = rule
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        rule = g.pop('admission_rule', None)
+        if rule is not None:
+            controller.release(rule)
+
+    logger.info(f"Admission control: {len(controller.rules)} rule(s), "
+                f"{controller.heavy_slots} heavy slot(s) per worker")
@@ -0,0 +1,29 @@
+"""Bearer-token checks for endpoints that must not be public"""
+from functools import wraps
+import hmac
+
+from flask import current_app, jsonify, request
+
+
+def require_token(config_key: str):
+    """
+    Decorator rejecting requests without ``Authorization: Bearer <token>`` matching ``app.config[config_key]``.
+
+    The endpoint is disabled (403) while the token is not configured, so a
+    missing environment variable never leaves it open.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            expected = current_app.config.get(config_key)
+            if not expected:
+                return jsonify({'error': f'Endpoint disabled: {config_key} is not set'}), 403
+
+            scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.strip().encode(), expected.encode()):
+                response = jsonify({'error': 'Invalid or missing bearer token'})
+                response.headers['WWW-Authenticate'] = 'Bearer'
+                return response, 401
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
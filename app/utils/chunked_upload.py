@@ -0,0 +1,341 @@
+"""Resumable chunked uploads stored on local disk
+
+A session is two files in UPLOAD_SESSION_DIR: ``<id>.json`` with the
+metadata and verified offset, and ``<id>.part`` which chunks are written into
+at their byte offset. The part file is the assembled upload, so finalizing
+needs no concatenation. Every chunk is hashed while it streams to disk; a
+chunk whose SHA-256 doesn't match the client's is cut off again and the offset
+stays where it was. Offsets live in the metadata rather than being read from
+the part file size, so bytes from a request that died mid-write are discarded
+by the next PUT. Sessions are shared by all gunicorn workers through the
+filesystem and serialized with a per-session flock. Expired sessions, and
+part or temporary files left without a session, are swept under that lock
+at most once per EXPIRE_INTERVAL_SECONDS by whichever request uses the store.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+_COPY_BUFFER = 1024 * 1024
+
+# Seconds between sweeps of a session directory, per process
+EXPIRE_INTERVAL_SECONDS = 60
+# A part file is created just before its metadata and metadata is written through a
+# temporary file; younger files without a session may still be in the middle of that
+ORPHAN_GRACE_SECONDS = 600
+
+_last_expiry = {}
+_last_expiry_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Base class; ``status`` is the HTTP status the routes answer with"""
+    status = 400
+
+
+class UploadNotFound(UploadError):
+    status = 404
+
+
+class UploadExpired(UploadError):
+    status = 410
+
+
+class UploadConflict(UploadError):
+    """The chunk doesn't start at the received offset; the client should query it and resume"""
+    status = 409
+
+
+class UploadTooLarge(UploadError):
+    status = 413
+
+
+class UploadSessionStore:
+    def __init__(self, root: str, ttl_seconds: float = 86400, max_bytes: int = 1 << 30,
+                 max_chunk_bytes: int = 64 << 20):
+        self.root = root
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_bytes = max_bytes
+        self.max_chunk_bytes = max_chunk_bytes
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _paths(self, upload_id: str):
+        if not _SESSION_ID.match(upload_id or ''):
+            raise UploadNotFound(f'Upload session {upload_id} not found')
+        base = os.path.join(self.root, upload_id)
+        return base + '.json', base + '.part'
+
+    def part_path(self, upload_id: str) -> str:
+        return self._paths(upload_id)[1]
+
+    def _read(self, upload_id: str, locked: bool = False) -> Dict:
+        """Session metadata; an expired session is removed when the caller holds its lock"""
+        meta_path, _ = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            raise UploadNotFound(f'Upload session {upload_id} not found')
+        if datetime.fromisoformat(session['expires_at']) < datetime.utcnow():
+            if locked:
+                self.delete(upload_id)
+            raise UploadExpired(f'Upload session {upload_id} expired')
+        return session
+
+    def _write(self, session: Dict):
+        meta_path, _ = self._paths(session['id'])
+        tmp = f'{meta_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(session, f)
+        os.replace(tmp, meta_path)
+
+    @contextmanager
+    def _locked(self, upload_id: str, blocking: bool = True):
+        """
+        Exclusive access to one session across threads and gunicorn workers.
+
+        Yields the part file's descriptor, or None when ``blocking`` is False
+        and another request holds the lock.
+        """
+        _, part_path = self._paths(upload_id)
+        try:
+            fd = os.open(part_path, os.O_RDWR)
+        except FileNotFoundError:
+            raise UploadNotFound(f'Upload session {upload_id} not found')
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield None
+                return
+            yield fd
+        finally:
+            os.close(fd)  # releases the lock
+
+    def _touch(self, session: Dict):
+        session['expires_at'] = (datetime.utcnow() + self.ttl).isoformat()
+
+    # ------------------------------------------------------------------
+    # Protocol
+    # ------------------------------------------------------------------
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> Dict:
+        """Open a session for a file of ``size`` bytes; ``sha256`` (hex) is verified on finalize"""
+        if size <= 0:
+            raise UploadError('size must be a positive number of bytes')
+        if size > self.max_bytes:
+            raise UploadTooLarge(f'Upload of {size} bytes exceeds the {self.max_bytes} byte limit')
+
+        upload_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        session = {
+            'id': upload_id,
+            'filename': filename,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'offset': 0,
+            'created_at': now.isoformat(),
+            'expires_at': (now + self.ttl).isoformat()
+        }
+        _, part_path = self._paths(upload_id)
+        with open(part_path, 'wb'):
+            pass
+        self._write(session)
+        return session
+
+    def status(self, upload_id: str) -> Dict:
+        try:
+            return self._read(upload_id)
+        except UploadExpired:
+            self._expire_session(upload_id)
+            raise
+
+    def abort(self, upload_id: str):
+        """Remove a session, waiting for a chunk being written to it"""
+        with self._locked(upload_id):
+            self._read(upload_id, locked=True)
+            self.delete(upload_id)
+
+    def write_chunk(self, upload_id: str, start: int, length: int, stream,
+                    sha256: Optional[str] = None, total: Optional[int] = None) -> Dict:
+        """
+        Write ``length`` bytes read from ``stream`` at byte ``start``.
+
+        A chunk that ends at or before the received offset was already stored
+        (a retried request) and is acknowledged without being read.
+
+        Args:
+            upload_id: Session ID
+            start: Byte offset of the chunk (from Content-Range)
+            length: Chunk size (from Content-Length)
+            stream: File-like request body
+            sha256: Hex digest of the chunk to verify, if the client sent one
+            total: File size the client declared in Content-Range, if it sent one
+
+        Returns:
+            The updated session
+        """
+        if length <= 0:
+            raise UploadError('Empty chunk')
+        if length > self.max_chunk_bytes:
+            raise UploadTooLarge(f'Chunk of {length} bytes exceeds the {self.max_chunk_bytes} byte limit')
+
+        with self._locked(upload_id) as fd:
+            session = self._read(upload_id, locked=True)
+            if total is not None and total != session['size']:
+                raise UploadError(f"Content-Range size {total} does not match the declared size {session['size']}")
+            offset = session['offset']
+            if start + length > session['size']:
+                raise UploadError(f"Chunk ends at byte {start + length}, past the declared size {session['size']}")
+            if start + length <= offset:
+                return session
+            if start != offset:
+                raise UploadConflict(f'Chunk starts at byte {start} but {offset} bytes have been received')
+
+            # Discard anything past the verified offset left by an interrupted request
+            os.ftruncate(fd, offset)
+            digest = hashlib.sha256()
+            remaining = length
+            position = offset
+            while remaining:
+                data = stream.read(min(_COPY_BUFFER, remaining))
+                if not data:
+                    break
+                digest.update(data)
+                os.pwrite(fd, data, position)
+                position += len(data)
+                remaining -= len(data)
+
+            if remaining:
+                os.ftruncate(fd, offset)
+                raise UploadError(f'Chunk ended after {length - remaining} of {length} bytes')
+            if sha256 and digest.hexdigest() != sha256.lower():
+                os.ftruncate(fd, offset)
+                raise UploadError('Chunk checksum mismatch')
+
+            os.fsync(fd)
+            session['offset'] = position
+            self._touch(session)
+            self._write(session)
+            return session
+
+    @contextmanager
+    def finalized(self, upload_id: str, sha256: Optional[str] = None):
+        """
+        Verify a complete upload and yield its session and assembled file.
+
+        The block runs while holding the session lock, so a late chunk can't
+        change the file. The session is removed when the block completes, and
+        kept when it raises (e.g. the database commit failed) or a check fails,
+        so the client can finalize again.
+        """
+        with self._locked(upload_id) as fd:
+            session = self._read(upload_id, locked=True)
+            if session['offset'] != session['size']:
+                raise UploadConflict(f"Upload incomplete: {session['offset']} of {session['size']} bytes received")
+
+            expected = (sha256 or session['sha256'] or '').lower()
+            if expected:
+                digest = hashlib.sha256()
+                position = 0
+                while position < session['size']:
+                    data = os.pread(fd, _COPY_BUFFER, position)
+                    if not data:
+                        break
+                    digest.update(data)
+                    position += len(data)
+                if digest.hexdigest() != expected:
+                    raise UploadError('File checksum mismatch')
+
+            yield session, self.part_path(upload_id)
+            # A file that failed to parse returns a response rather than raising; its bytes won't improve
+            self.delete(upload_id)
+
+    def delete(self, upload_id: str):
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def expire(self) -> int:
+        """
+        Remove expired sessions and files left without a session.
+
+        Each session is removed under its lock and only if it is still expired
+        then; sessions a request is busy with are skipped until the next sweep.
+
+        Returns:
+            Number of sessions and orphaned files removed
+        """
+        removed = 0
+        orphan_cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        names = set(os.listdir(self.root))
+        for name in names:
+            path = os.path.join(self.root, name)
+            upload_id = name.split('.', 1)[0]
+            try:
+                if name.endswith('.json') and f'{upload_id}.part' in names:
+                    removed += self._expire_session(upload_id)
+                elif name.endswith('.part') and f'{upload_id}.json' not in names:
+                    if os.path.getmtime(path) < orphan_cutoff:
+                        with self._locked(upload_id, blocking=False) as fd:
+                            if fd is not None and not os.path.exists(self._paths(upload_id)[0]):
+                                os.remove(path)
+                                removed += 1
+                elif name.endswith(('.json', '.tmp')) and os.path.getmtime(path) < orphan_cutoff:
+                    # Metadata without a part file, or a temporary file a crashed write left behind
+                    os.remove(path)
+                    removed += 1
+            except (UploadError, OSError, ValueError, KeyError):
+                continue
+        if removed:
+            logger.info(f"Removed {removed} expired upload session(s) and orphaned file(s)")
+        return removed
+
+    def _expire_session(self, upload_id: str) -> int:
+        with self._locked(upload_id, blocking=False) as fd:
+            if fd is None:
+                return 0
+            try:
+                self._read(upload_id, locked=True)
+            except UploadExpired:
+                return 1
+            return 0
+
+    def expire_periodically(self) -> int:
+        """Run expire() if this process hasn't swept the directory for EXPIRE_INTERVAL_SECONDS"""
+        now = time.monotonic()
+        with _last_expiry_lock:
+            if now - _last_expiry.get(self.root, float('-inf')) < EXPIRE_INTERVAL_SECONDS:
+                return 0
+            _last_expiry[self.root] = now
+        return self.expire()
+
+
+def get_upload_store(config) -> UploadSessionStore:
+    """Store for the configured directory, sweeping it first when a sweep is due"""
+    store = UploadSessionStore(
+        config.get('UPLOAD_SESSION_DIR', '/tmp/uploads/sessions'),
+        ttl_seconds=config.get('UPLOAD_SESSION_TTL_SECONDS', 86400),
+        max_bytes=config.get('UPLOAD_MAX_BYTES', 1 << 30),
+        max_chunk_bytes=config.get('UPLOAD_CHUNK_MAX_BYTES', 64 << 20)
+    )
+    store.expire_periodically()
+    return store
@@ -0,0 +1,190 @@
+"""Persist parsed PowerPoint data"""
+from datetime import datetime
+from typing import Iterable, List, Dict
+from flask import current_app
+import hashlib
+import logging
+import zlib
+
+from models import db, PresentationFile, PresentationSlide, SlideText, SlideUrl
+from models.database import DIALECT_INSERTS
+from utils.similarity_index import get_hasher, index_texts, unindex_texts
+from utils.parse_result import ParsedSlide
+from utils.summaries import record_ingest
+from utils.link_checker import normalize_url
+
+logger = logging.getLogger(__name__)
+
+def text_hash(text: str) -> str:
+    """Content address of a slide body"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def store_slide_texts(texts: Iterable[str], compress_min_chars: int = 0) -> Dict[str, str]:
+    """
+    Insert slide bodies into slide_texts unless already present, in one statement.
+
+    Args:
+        texts: Slide bodies, duplicates allowed
+        compress_min_chars: Bodies at least this long are stored zlib-compressed (0 disables)
+
+    Every stored row is then locked FOR SHARE until the caller commits, so
+    delete_unreferenced_texts can't remove a body this upload reuses before
+    its slides point at it. Rows such a delete removed before the lock was
+    granted are inserted again.
+
+    Returns:
+        Mapping of text to its hash
+    """
+    hashes = {}
+    rows = []
+    now = datetime.utcnow()
+    for text in texts:
+        if text in hashes:
+            continue
+        digest = hashes[text] = text_hash(text)
+        row = {'hash': digest, 'text': text, 'compressed_text': None, 'length': len(text), 'created_at': now}
+        if compress_min_chars and len(text) >= compress_min_chars:
+            row['text'] = None
+            row['compressed_text'] = zlib.compress(text.encode('utf-8'))
+        rows.append(row)
+    if not rows:
+        return hashes
+
+    insert = DIALECT_INSERTS.get(db.engine.dialect.name)
+    while rows:
+        if insert is not None:
+            # Concurrent uploads of the same boilerplate may race; the loser just skips the row
+            db.session.execute(insert(SlideText).on_conflict_do_nothing(index_elements=['hash']), rows)
+        else:
+            existing = set(db.session.execute(
+                db.select(SlideText.hash).where(SlideText.hash.in_([row['hash'] for row in rows]))
+            ).scalars())
+            missing = [row for row in rows if row['hash'] not in existing]
+            if missing:
+                db.session.execute(db.insert(SlideText), missing)
+        # Hash order, like delete_unreferenced_texts, so the two can't deadlock
+        locked = set(db.session.execute(
+            db.select(SlideText.hash)
+            .where(SlideText.hash.in_([row['hash'] for row in rows]))
+            .order_by(SlideText.hash)
+            .with_for_update(read=True)
+        ).scalars())
+        rows = [row for row in rows if row['hash'] not in locked]
+    return hashes
+
+def delete_unreferenced_texts(hashes: Iterable[str] = None) -> int:
+    """
+    Remove slide_texts rows no slide points to any more.
+
+    The candidate rows are locked FOR UPDATE first and only then checked for
+    references, in a separate statement: an upload reusing one of them holds
+    it FOR SHARE (see store_slide_texts), so the check runs after that upload
+    committed and sees its slides.
+
+    Args:
+        hashes: Only consider these hashes (e.g. those of a deleted file); None checks all
+
+    Returns:
+        Number of rows deleted
+    """
+    candidates = db.select(SlideText.hash).order_by(SlideText.hash).with_for_update()
+    if hashes is not None:
+        hashes = list(hashes)
+        if not hashes:
+            return 0
+        candidates = candidates.where(SlideText.hash.in_(hashes))
+    locked = list(db.session.execute(candidates).scalars())
+    if not locked:
+        return 0
+
+    referenced = db.select(PresentationSlide.id).where(PresentationSlide.text_hash == SlideText.hash).exists()
+    orphans = list(db.session.execute(
+        db.select(SlideText.hash).where(SlideText.hash.in_(locked), ~referenced)
+    ).scalars())
+    if not orphans:
+        return 0
+    unindex_texts(orphans)
+    return db.session.execute(
+        db.delete(SlideText).where(SlideText.hash.in_(orphans)).execution_options(synchronize_session=False)
+    ).rowcount
+
+def ingest_presentation(filename: str, original_filename: str, slides_data: List[ParsedSlide]) -> PresentationFile:
+    """
+    Store a parsed presentation with its slides and URLs in the current session.
+
+    Slides and URLs are stamped with the file's ``file_id`` and ``uploaded_at``
+    so that every row of an upload shares one partition key (see
+    models/partitioning.py). Slide bodies go to the content-addressed
+    slide_texts table, so boilerplate repeated across decks is stored once,
+    and new bodies are added to the near-duplicate index. The dashboard
+    summaries are updated in the same transaction.
+    The caller commits or rolls back.
+
+    Args:
+        filename: Sanitized filename
+        original_filename: Filename as uploaded
+        slides_data: Output of extract_text_and_urls
+
+    Returns:
+        The new PresentationFile with slide_count and url_count filled in
+    """
+    uploaded_at = datetime.utcnow()
+    presentation_file = PresentationFile(
+        filename=filename,
+        original_filename=original_filename,
+        uploaded_at=uploaded_at
+    )
+    db.session.add(presentation_file)
+    db.session.flush()  # Get the file ID
+
+    hashes = store_slide_texts(
+        (slide_data.text for slide_data in slides_data),
+        compress_min_chars=current_app.config.get('SLIDE_TEXT_COMPRESS_MIN_CHARS', 0)
+    )
+
+    if current_app.config.get('SIMILARITY_INDEX_ENABLED', True):
+        # Only bodies no earlier upload contained get shingled and hashed
+        index_texts({digest: text for text, digest in hashes.items()}, get_hasher(current_app.config))
+
+    # Slides go in as one multi-row insert that returns their IDs in order, so
+    # the URL rows can reference them without a flush per slide
+    slide_ids = db.session.execute(
+        db.insert(PresentationSlide).returning(PresentationSlide.id, sort_by_parameter_order=True),
+        [
+            {
+                'slide_number': slide_data.slide_number,
+                'text_hash': hashes[slide_data.text],
+                'source_file': filename,  # Keep for backward compatibility
+                'file_id': presentation_file.id,
+                'created_at': uploaded_at
+            }
+            for slide_data in slides_data
+        ]
+    ).scalars().all() if slides_data else []
+
+    url_rows = [
+        {
+            'slide_id': slide_id,
+            'file_id': presentation_file.id,
+            'url': url_data.url,
+            'normalized_url': normalize_url(url_data.url) or '',
+            'link_text': url_data.text,
+            'created_at': uploaded_at
+        }
+        for slide_id, slide_data in zip(slide_ids, slides_data)
+        for url_data in slide_data.urls
+    ]
+    if url_rows:
+        db.session.execute(db.insert(SlideUrl), url_rows)
+
+    saved_count = len(slide_ids)
+    url_count = len(url_rows)
+
+    # Update file counts
+    presentation_file.slide_count = saved_count
+    presentation_file.url_count = url_count
+
+    # Last, because it locks the dashboard totals row until the caller commits
+    record_ingest(presentation_file, slides_data)
+
+    return presentation_file
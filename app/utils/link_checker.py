@@ -0,0 +1,282 @@
+"""Concurrent health checks for URLs extracted from slides"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import ThreadedResolver
+from sqlalchemy import bindparam
+
+from models import db, SlideUrl, LinkStatus
+from models.database import DIALECT_INSERTS
+
+logger = logging.getLogger(__name__)
+
+CHECKABLE_SCHEMES = {'http', 'https'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+USER_AGENT = 'slide-link-checker/1.0'
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class BlockedTarget(Exception):
+    """A URL (or a redirect) points at an address the checker must not reach"""
+
+
+def is_public_address(address: str) -> bool:
+    """Whether ``address`` is a globally routable unicast IP (not loopback, private, link-local, ...)"""
+    try:
+        ip = ipaddress.ip_address(address.split('%')[0])
+    except ValueError:
+        return False
+    return ip.is_global and not ip.is_multicast
+
+
+def check_target(url: str) -> None:
+    """Reject non-HTTP URLs and literal non-public IPs before any request; hostnames are checked on resolution"""
+    parts = urlsplit(url)
+    if parts.scheme not in CHECKABLE_SCHEMES or not parts.hostname:
+        raise BlockedTarget(f'unsupported URL {url[:100]}')
+    try:
+        ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return
+    if not is_public_address(parts.hostname):
+        raise BlockedTarget(f'{parts.hostname} is not a public address')
+
+
+class PublicResolver(AbstractResolver):
+    """
+    DNS resolver that drops non-public addresses.
+
+    Connections only go to the addresses it returns, so a hostname that
+    resolves to an internal address is refused however it was reached,
+    including through redirects or DNS records changed after a first check.
+    """
+
+    def __init__(self):
+        self._resolver = ThreadedResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET):
+        addresses = [address for address in await self._resolver.resolve(host, port, family)
+                     if is_public_address(address['host'])]
+        if not addresses:
+            raise BlockedTarget(f'{host} does not resolve to a public address')
+        return addresses
+
+    async def close(self):
+        await self._resolver.close()
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Canonical form used as the cache key, so variants of one link are checked once.
+
+    Lowercases scheme and host, drops default ports and fragments and gives an
+    empty path a trailing slash. Returns None for URLs that can't be checked
+    over HTTP (mailto:, file:, relative links, ...).
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in CHECKABLE_SCHEMES or not parts.hostname:
+        return None
+    netloc = parts.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f'{netloc}:{port}'
+    if parts.username:
+        netloc = f'{parts.username}@{netloc}'
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+class LinkChecker:
+    """
+    Check many URLs concurrently over one pooled HTTP session.
+
+    Each URL gets a HEAD request; servers that refuse or mishandle HEAD
+    (any status >= 400) are retried with a GET whose body is never read.
+    Concurrency is capped globally and per host so a deck full of links to
+    one site doesn't hammer it. A check waits for its host's slot before
+    taking a global one, so URLs queued behind a busy host don't hold global
+    slots that checks of other hosts could use.
+
+    The URLs come from uploaded decks, so unless ``allow_private`` is set,
+    loopback, private, link-local and other non-public targets are refused,
+    both for the URL itself and for every redirect it leads to.
+    """
+
+    def __init__(self, concurrency: int = 50, per_domain: int = 4, timeout: float = 10.0,
+                 max_redirects: int = 5, allow_private: bool = False):
+        self.concurrency = concurrency
+        self.per_domain = per_domain
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.allow_private = allow_private
+
+    async def _request(self, session, method, url):
+        # Redirects are followed here rather than by aiohttp so each hop is checked first
+        for _ in range(self.max_redirects + 1):
+            if not self.allow_private:
+                check_target(url)
+            async with session.request(method, url, allow_redirects=False) as response:
+                location = response.headers.get('Location')
+                if response.status not in REDIRECT_STATUSES or not location:
+                    return response.status
+                url = urljoin(str(response.url), location)
+        raise aiohttp.ClientError(f'more than {self.max_redirects} redirects')
+
+    async def _check_one(self, session, url, global_limit, domain_limits):
+        host = urlsplit(url).hostname
+        domain_limit = domain_limits.setdefault(host, asyncio.Semaphore(self.per_domain))
+        result = {'url': url, 'status_code': None, 'ok': False, 'method': 'HEAD', 'error': None}
+        start = time.perf_counter()
+        async with domain_limit, global_limit:
+            try:
+                status = await self._request(session, 'HEAD', url)
+                if status >= 400:
+                    result['method'] = 'GET'
+                    status = await self._request(session, 'GET', url)
+                result['status_code'] = status
+                result['ok'] = status < 400
+            except asyncio.TimeoutError:
+                result['error'] = 'timeout'
+            except BlockedTarget as e:
+                result['error'] = f'blocked: {e}'[:255]
+            except aiohttp.ClientError as e:
+                result['error'] = f'{type(e).__name__}: {e}'[:255]
+        result['elapsed_ms'] = int((time.perf_counter() - start) * 1000)
+        result['checked_at'] = datetime.utcnow()
+        return result
+
+    async def check_async(self, urls: Iterable[str]) -> List[Dict]:
+        """Check already-normalized URLs; returns one result dict per URL"""
+        global_limit = asyncio.Semaphore(self.concurrency)
+        domain_limits = {}
+        resolver = None if self.allow_private else PublicResolver()
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_domain, resolver=resolver)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            return await asyncio.gather(*(
+                self._check_one(session, url, global_limit, domain_limits) for url in urls
+            ))
+
+    def check(self, urls: Iterable[str]) -> List[Dict]:
+        """Blocking wrapper around check_async for CLI and request contexts"""
+        return asyncio.run(self.check_async(list(urls)))
+
+
+def backfill_normalized_urls(batch_size: int = 1000) -> int:
+    """
+    Fill slide_urls.normalized_url for rows stored before ingest set it.
+
+    Returns:
+        Number of rows updated
+    """
+    table = SlideUrl.__table__
+    statement = table.update().where(table.c.id == bindparam('row_id')).values(normalized_url=bindparam('normalized'))
+    updated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(SlideUrl.id, SlideUrl.url).where(SlideUrl.normalized_url.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        db.session.execute(statement, [{'row_id': row_id, 'normalized': normalize_url(url) or ''} for row_id, url in rows])
+        db.session.commit()
+        updated += len(rows)
+
+
+def urls_due_for_check(ttl_seconds: float, limit: int = None, file_id: int = None, after: str = None) -> List[str]:
+    """
+    Normalized URLs from slide_urls whose cached status is missing or older than the TTL.
+
+    Each distinct URL appears once no matter how many slides link to it.
+    URLs come in order, so ``after`` (the last URL of the previous batch)
+    continues where that batch stopped.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    fresh = db.select(LinkStatus.url).where(
+        LinkStatus.url == SlideUrl.normalized_url, LinkStatus.checked_at >= cutoff
+    ).exists()
+    query = db.select(SlideUrl.normalized_url).where(SlideUrl.normalized_url != '', ~fresh)
+    if file_id is not None:
+        query = query.where(SlideUrl.file_id == file_id)
+    if after is not None:
+        query = query.where(SlideUrl.normalized_url > after)
+    query = query.distinct().order_by(SlideUrl.normalized_url)
+    if limit:
+        query = query.limit(limit)
+    return list(db.session.execute(query).scalars())
+
+
+def save_results(results: List[Dict]) -> int:
+    """Upsert check results into link_status in one statement"""
+    if not results:
+        return 0
+    insert = DIALECT_INSERTS.get(db.engine.dialect.name)
+    if insert is not None:
+        statement = insert(LinkStatus)
+        statement = statement.on_conflict_do_update(
+            index_elements=['url'],
+            set_={column: statement.excluded[column]
+                  for column in ('status_code', 'ok', 'method', 'error', 'elapsed_ms', 'checked_at')}
+        )
+        db.session.execute(statement, results)
+    else:
+        for result in results:
+            db.session.merge(LinkStatus(**result))
+    db.session.commit()
+    return len(results)
+
+
+def run_link_check(config, limit: int = None, file_id: int = None, force: bool = False) -> Dict:
+    """
+    Check every due URL and store the results. Must run inside an app context.
+
+    URLs are checked and saved in batches of LINK_CHECK_BATCH_SIZE, so memory
+    stays flat with a large backlog and an interrupted run keeps the batches
+    it finished.
+
+    Args:
+        config: App config holding the LINK_CHECK_* settings
+        limit: Check at most this many URLs
+        file_id: Only check URLs of this file
+        force: Ignore the TTL and recheck everything
+
+    Returns:
+        dict: counts of checked, ok and broken URLs
+    """
+    backfilled = backfill_normalized_urls()
+    if backfilled:
+        logger.info(f"Normalized {backfilled} URLs stored before normalized_url existed")
+    ttl = 0 if force else config.get('LINK_CHECK_TTL_SECONDS', 86400)
+    batch_size = config.get('LINK_CHECK_BATCH_SIZE', 500)
+    checker = LinkChecker(
+        concurrency=config.get('LINK_CHECK_CONCURRENCY', 50),
+        per_domain=config.get('LINK_CHECK_PER_DOMAIN', 4),
+        timeout=config.get('LINK_CHECK_TIMEOUT_SECONDS', 10.0),
+        allow_private=config.get('LINK_CHECK_ALLOW_PRIVATE', False)
+    )
+    checked = ok = 0
+    after = None
+    while limit is None or checked < limit:
+        size = batch_size if limit is None else min(batch_size, limit - checked)
+        urls = urls_due_for_check(ttl, limit=size, file_id=file_id, after=after)
+        if not urls:
+            break
+        results = checker.check(urls)
+        save_results(results)
+        checked += len(results)
+        ok += sum(1 for result in results if result['ok'])
+        after = urls[-1]
+        logger.info(f"Checked {checked} URLs")
+    return {'checked': checked, 'ok': ok, 'broken': checked - ok}
@@ -0,0 +1,202 @@
+"""Opt-in memory instrumentation of the upload path
+
+With MEMORY_PROFILE_ENABLED, tracemalloc runs for the life of the worker and
+each upload records a profile. The upload path marks phase boundaries:
+parse, ingest (through the last flush), commit, search indexing, and release
+of the session's objects. At each boundary a snapshot is compared with the
+previous one. The phase's net allocation, its traced peak, the
+MEMORY_PROFILE_TOP allocation sites that grew most, and the RSS change are
+kept. Each profile also records the peak RSS of the upload. The peak is
+reset at the start of the profile through /proc/self/clear_refs where the
+kernel allows it.
+
+tracemalloc is process-wide, so allocations made by other threads during an
+upload are counted too. Profile on a quiet worker to get clean numbers. When
+parsing runs in the sandbox, python-pptx's object graph lives in the child
+process. Only the result transfer shows up in the parse phase, and the
+child's own peak RSS is reported separately. Set PARSE_EXECUTOR_WORKERS=0 to
+trace the parser itself.
+
+Profiles are logged and the most recent MEMORY_PROFILE_KEEP are served by
+GET /api/admin/memory.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+_profiles = deque(maxlen=20)
+_profiles_lock = threading.Lock()
+
+# Allocations made while taking and comparing snapshots, or holding earlier phases, are not the upload's
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def proc_memory(pid='self') -> Dict[str, int]:
+    """Current (``rss``) and peak (``peak_rss``) resident set size in bytes, from /proc"""
+    fields = {'VmRSS': 'rss', 'VmHWM': 'peak_rss'}
+    memory = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key = fields.get(line.split(':', 1)[0])
+                if key:
+                    memory[key] = int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+def reset_peak_rss() -> bool:
+    """Restart this process's peak RSS (VmHWM) from its current RSS; Linux 4.0+ only"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class MemoryProfile:
+    """Phase-by-phase memory use of one upload; create it right before the first phase"""
+
+    def __init__(self, label: str, top: int = 10):
+        self.label = label
+        self.top = top
+        self.started_at = datetime.utcnow()
+        self.phases = []
+        self.peak_reset = reset_peak_rss()
+        self._snapshot = self._take_snapshot()
+        self._rss = proc_memory().get('rss')
+        self._time = time.perf_counter()
+        tracemalloc.reset_peak()
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def mark(self, phase: str):
+        """Close ``phase``: everything since the previous mark (or the start) is attributed to it"""
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        rss = proc_memory().get('rss')
+        snapshot = self._take_snapshot()
+        stats = snapshot.compare_to(self._snapshot, 'lineno')
+        self.phases.append({
+            'phase': phase,
+            'seconds': round(now - self._time, 4),
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'traced_delta_bytes': sum(stat.size_diff for stat in stats),
+            'rss_bytes': rss,
+            'rss_delta_bytes': rss - self._rss if rss is not None and self._rss is not None else None,
+            'top': [
+                {
+                    'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                    'size': stat.size
+                }
+                for stat in sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:self.top]
+                if stat.size_diff > 0
+            ]
+        })
+        self._snapshot = snapshot
+        self._rss = rss
+        # Taking the snapshot allocates too; restart the timer and peak after it
+        self._time = time.perf_counter()
+        tracemalloc.reset_peak()
+
+    def finish(self, **details) -> Dict:
+        """Record the profile (details such as file_id or error are stored with it) and log a summary"""
+        self._snapshot = None
+        memory = proc_memory()
+        profile = {
+            'label': self.label,
+            'pid': os.getpid(),
+            'started_at': self.started_at.isoformat(),
+            'peak_rss_bytes': memory.get('peak_rss'),
+            # False: the kernel refused the reset, so the peak may predate this upload
+            'peak_rss_reset': self.peak_reset,
+            'rss_bytes': memory.get('rss'),
+            'phases': self.phases,
+            **details
+        }
+        with _profiles_lock:
+            _profiles.append(profile)
+
+        summary = ', '.join(
+            f"{p['phase']} {p['traced_delta_bytes'] / 1048576:+.1f}MB (peak {p['traced_peak_bytes'] / 1048576:.1f}MB)"
+            for p in self.phases
+        )
+        if profile['peak_rss_bytes'] is not None:
+            summary += f"; peak RSS {profile['peak_rss_bytes'] / 1048576:.0f}MB"
+        logger.info(f"Memory profile of {self.label}: {summary}")
+        for phase in self.phases:
+            for site in phase['top'][:3]:
+                logger.info(f"   {phase['phase']}: {site['size_diff'] / 1024:+.0f}KB in {site['count_diff']:+d} blocks at {site['site']}")
+        return profile
+
+
+class _DisabledProfile:
+    """Stand-in when profiling is off, so callers don't need to check"""
+
+    def mark(self, phase: str):
+        pass
+
+    def finish(self, **details):
+        return None
+
+
+_DISABLED = _DisabledProfile()
+
+
+def memory_profile(config, label: str):
+    """A MemoryProfile for ``label`` when MEMORY_PROFILE_ENABLED and tracemalloc is running, else a no-op"""
+    if not config.get('MEMORY_PROFILE_ENABLED', False) or not tracemalloc.is_tracing():
+        return _DISABLED
+    return MemoryProfile(label, top=config.get('MEMORY_PROFILE_TOP', 10))
+
+
+def recent_profiles(limit: Optional[int] = None) -> List[Dict]:
+    """Profiles recorded by this worker process, newest first"""
+    with _profiles_lock:
+        profiles = list(reversed(_profiles))
+    return profiles[:limit] if limit else profiles
+
+
+def memory_status() -> Dict:
+    """Current memory use of this worker process"""
+    memory = proc_memory()
+    status = {
+        'pid': os.getpid(),
+        'tracing': tracemalloc.is_tracing(),
+        'rss_bytes': memory.get('rss'),
+        'peak_rss_bytes': memory.get('peak_rss')
+    }
+    if status['tracing']:
+        status['traced_bytes'], status['traced_peak_bytes'] = tracemalloc.get_traced_memory()
+    return status
+
+
+def init_memory_profiling(app):
+    """Start tracemalloc for this process when MEMORY_PROFILE_ENABLED (it slows allocation-heavy code)"""
+    global _profiles
+    if not app.config.get('MEMORY_PROFILE_ENABLED', False):
+        return
+    with _profiles_lock:
+        _profiles = deque(_profiles, maxlen=app.config.get('MEMORY_PROFILE_KEEP', 20))
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(app.config.get('MEMORY_PROFILE_FRAMES', 1))
+    logger.info("Memory profiling enabled: tracemalloc is tracing uploads")
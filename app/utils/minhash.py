@@ -0,0 +1,85 @@
+"""Vectorized MinHash signatures and LSH banding for near-duplicate text detection"""
+from typing import List, Optional
+import re
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WHITESPACE = re.compile(r'\s+')
+
+
+class MinHasher:
+    """
+    Compute MinHash signatures over character shingles and split them into LSH bands.
+
+    Two texts land in the same bucket of at least one band with probability
+    1 - (1 - s**rows)**bands for Jaccard similarity s; with the defaults
+    (16 bands of 8 rows) the 50% point is around s = 0.7.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        if not 1 <= shingle_size <= 7:
+            raise ValueError("shingle_size must be between 1 and 7 bytes")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed seed: signatures stored in the database must stay comparable across processes
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm).astype(np.uint64)[:, None]
+        self._b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm).astype(np.uint64)[:, None]
+        self._powers = (np.uint64(256) ** np.arange(shingle_size - 1, -1, -1, dtype=np.uint64))
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct byte k-shingles of the normalized text, each packed into one integer"""
+        normalized = _WHITESPACE.sub(' ', text.lower()).strip().encode('utf-8')
+        if not normalized:
+            return np.empty(0, dtype=np.uint64)
+        data = np.frombuffer(normalized, dtype=np.uint8).astype(np.uint64)
+        if len(data) < self.shingle_size:
+            data = np.concatenate([np.zeros(self.shingle_size - len(data), dtype=np.uint64), data])
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size)
+        return np.unique(windows @ self._powers)
+
+    def signature(self, text: str, chunk_size: int = 4096) -> Optional[np.ndarray]:
+        """
+        MinHash signature of ``text`` as ``num_perm`` uint32 values, or None for empty text.
+
+        Shingles are processed in chunks so a very long slide doesn't allocate a
+        num_perm x shingles matrix all at once.
+        """
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return None
+        shingles = shingles % MERSENNE_PRIME
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(shingles), chunk_size):
+            chunk = shingles[start:start + chunk_size][None, :]
+            hashed = (self._a * chunk + self._b) % MERSENNE_PRIME
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """One signed 64-bit bucket key per band (fits a BIGINT column)"""
+        bands = signature.astype(np.uint64).reshape(self.bands, self.rows)
+        keys = np.zeros(self.bands, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            # FNV-style mixing of the band's rows; wrap-around is intended
+            for column in range(self.rows):
+                keys = (keys ^ bands[:, column]) * np.uint64(1099511628211)
+        return keys.view(np.int64).tolist()
+
+    @staticmethod
+    def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity of one signature against a matrix of signatures"""
+        return (others == signature[None, :]).mean(axis=1)
+
+    @staticmethod
+    def to_bytes(signature: np.ndarray) -> bytes:
+        return signature.astype('<u4').tobytes()
+
+    @staticmethod
+    def from_bytes(data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype='<u4')
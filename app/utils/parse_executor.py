@@ -0,0 +1,369 @@
+"""Run PowerPoint parsing in supervised, resource-limited worker processes
+
+Uploads are untrusted: a malformed deck or a zip bomb can spin the parser for
+minutes or inflate gigabytes of XML. Every upload is first checked against the
+sizes its zip directory declares, then parsed in a pooled child process that
+runs under a CPU-time rlimit and an address-space backstop while the
+supervisor enforces a wall-clock timeout and an RSS ceiling, killing the
+child when either is exceeded. Children are recycled after a fixed number of
+jobs so memory fragmentation in lxml doesn't accumulate.
+"""
+from typing import List, Dict, Optional
+import multiprocessing
+import logging
+import os
+import re
+import signal
+import threading
+import time
+import zipfile
+
+from utils.pptx_parser import extract_text_and_urls
+from utils.memory_profile import proc_memory, reset_peak_rss
+
+try:
+    import resource
+except ImportError:  # Windows: limits are enforced by the supervisor only
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_SLIDE_PART = re.compile(r'^ppt/slides/slide\d+\.xml$')
+_POLL_SECONDS = 0.05
+
+
+class ParseError(Exception):
+    """An upload was refused or its parse was stopped; ``reason`` is a short machine-readable code"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class ParseRejected(ParseError):
+    """The upload failed a pre-check and was never parsed"""
+
+
+class ParseKilled(ParseError):
+    """The parse exceeded a resource limit or crashed its worker"""
+
+
+class ParseLimits:
+    """Resource limits for one parse; 0 disables a limit"""
+
+    def __init__(self, timeout: float = 300, cpu_seconds: int = 120, max_rss_mb: int = 1024,
+                 max_uncompressed_mb: int = 500, max_slides: int = 2000, max_entries: int = 20000,
+                 max_jobs_per_worker: int = 50):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.max_rss_mb = max_rss_mb
+        self.max_uncompressed_mb = max_uncompressed_mb
+        self.max_slides = max_slides
+        self.max_entries = max_entries
+        self.max_jobs_per_worker = max_jobs_per_worker
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            timeout=config.get('PARSE_TIMEOUT_SECONDS', 300) or 0,
+            cpu_seconds=config.get('PARSE_CPU_SECONDS', 120),
+            max_rss_mb=config.get('PARSE_MAX_RSS_MB', 1024),
+            max_uncompressed_mb=config.get('PARSE_MAX_UNCOMPRESSED_MB', 500),
+            max_slides=config.get('PARSE_MAX_SLIDES', 2000),
+            max_entries=config.get('PARSE_MAX_ZIP_ENTRIES', 20000),
+            max_jobs_per_worker=config.get('PARSE_WORKER_MAX_JOBS', 50)
+        )
+
+
+# ----------------------------------------------------------------------
+# Statistics (per gunicorn worker process)
+# ----------------------------------------------------------------------
+
+_stats_lock = threading.Lock()
+_stats = {'parsed': 0, 'rejected': {}, 'killed': {}, 'failed': 0, 'workers_started': 0, 'workers_recycled': 0}
+
+
+def _count(key: str, reason: str = None):
+    with _stats_lock:
+        if reason is None:
+            _stats[key] += 1
+        else:
+            _stats[key][reason] = _stats[key].get(reason, 0) + 1
+
+
+_last_parse = threading.local()
+
+
+def last_parse_peak_rss() -> Optional[int]:
+    """Peak RSS in bytes of the sandbox process for this thread's last parse (None when parsed inline)"""
+    return getattr(_last_parse, 'peak_rss', None)
+
+
+def parse_stats() -> Dict:
+    """Counters of parsed, rejected and killed uploads since this process started"""
+    with _stats_lock:
+        return {
+            'pid': os.getpid(),
+            'parsed': _stats['parsed'],
+            'failed': _stats['failed'],
+            'rejected': dict(_stats['rejected']),
+            'killed': dict(_stats['killed']),
+            'workers_started': _stats['workers_started'],
+            'workers_recycled': _stats['workers_recycled']
+        }
+
+
+# ----------------------------------------------------------------------
+# Pre-checks
+# ----------------------------------------------------------------------
+
+def check_archive(pptx_path: str, limits: ParseLimits) -> int:
+    """
+    Refuse archives whose zip directory declares too much data, too many parts or too many slides.
+
+    Only the central directory is read, so this is cheap even for a zip bomb.
+    A forged directory can understate sizes; the RSS limit catches those at parse time.
+
+    Returns:
+        Number of slides declared by the archive
+    """
+    try:
+        with zipfile.ZipFile(pptx_path) as archive:
+            entries = archive.infolist()
+    except (zipfile.BadZipFile, OSError) as e:
+        _count('rejected', 'invalid_zip')
+        raise ParseRejected('invalid_zip', f'Not a valid .pptx archive: {e}')
+
+    if limits.max_entries and len(entries) > limits.max_entries:
+        _count('rejected', 'too_many_entries')
+        raise ParseRejected('too_many_entries',
+                            f'Archive has {len(entries)} parts (limit {limits.max_entries})')
+    uncompressed = sum(entry.file_size for entry in entries)
+    if limits.max_uncompressed_mb and uncompressed > limits.max_uncompressed_mb * 1024 * 1024:
+        _count('rejected', 'too_large')
+        raise ParseRejected('too_large', f'Archive expands to {uncompressed // (1024 * 1024)} MB '
+                                         f'(limit {limits.max_uncompressed_mb} MB)')
+    slides = sum(1 for entry in entries if _SLIDE_PART.match(entry.filename))
+    if limits.max_slides and slides > limits.max_slides:
+        _count('rejected', 'too_many_slides')
+        raise ParseRejected('too_many_slides', f'Presentation has {slides} slides (limit {limits.max_slides})')
+    return slides
+
+
+# ----------------------------------------------------------------------
+# Worker processes
+# ----------------------------------------------------------------------
+
+def _worker_main(conn, cpu_seconds: int, address_space_bytes: int):
+    """Child loop: receive a path and notes flag, parse under the CPU budget, send back the outcome"""
+    if resource is not None and address_space_bytes:
+        # Linux ignores RLIMIT_RSS; the address-space cap only backstops the supervisor's RSS polling
+        resource.setrlimit(resource.RLIMIT_AS, (address_space_bytes, address_space_bytes))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        pptx_path, include_notes = job
+        if resource is not None and cpu_seconds:
+            # RLIMIT_CPU counts the process lifetime, so each job gets the budget on top of what's used
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY))
+        # The peak RSS of each job goes back with its outcome (see last_parse_peak_rss)
+        reset_peak_rss()
+        try:
+            outcome = ('ok', extract_text_and_urls(pptx_path, include_notes))
+        except MemoryError:
+            outcome = ('memory', 'Parser ran out of memory')
+        except Exception as e:
+            outcome = ('error', f'{type(e).__name__}: {e}')
+        try:
+            conn.send(outcome + (proc_memory().get('peak_rss'),))
+        except MemoryError:
+            conn.send(('memory', 'Parse result too large', None))
+
+
+class _Worker:
+    def __init__(self, context, limits: ParseLimits):
+        self.conn, child_conn = context.Pipe()
+        max_rss = limits.max_rss_mb * 1024 * 1024
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, limits.cpu_seconds, 2 * max_rss), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        _count('workers_started')
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ParseSandbox:
+    """
+    Pool of supervised parse processes shared by the threads of one gunicorn worker.
+
+    At most ``max_workers`` parses run at once; further uploads wait for a free
+    worker. A worker is replaced after it is killed and retired after
+    ``max_jobs_per_worker`` jobs; the CPU and memory limits it was started
+    with apply for its whole life.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        # spawn avoids forking a process that is already running request threads
+        self._context = multiprocessing.get_context('spawn')
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _checkout(self, limits: ParseLimits) -> _Worker:
+        self._slots.acquire()
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.kill()
+        try:
+            return _Worker(self._context, limits)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, worker: Optional[_Worker], limits: ParseLimits):
+        if worker is not None:
+            if limits.max_jobs_per_worker and worker.jobs >= limits.max_jobs_per_worker:
+                worker.stop()
+                _count('workers_recycled')
+            else:
+                with self._lock:
+                    self._idle.append(worker)
+        self._slots.release()
+
+    def parse(self, pptx_path: str, limits: ParseLimits, include_notes: bool = False) -> List[Dict]:
+        worker = self._checkout(limits)
+        try:
+            outcome = self._run(worker, pptx_path, limits, include_notes)
+        except BaseException:
+            # Killed, or the supervisor itself failed: the worker's state is unknown
+            worker.kill()
+            self._checkin(None, limits)
+            raise
+
+        status, payload, _last_parse.peak_rss = outcome
+        if status == 'memory':
+            # A child that hit its address-space cap may be left half-broken; don't reuse it
+            worker.kill()
+            self._checkin(None, limits)
+            _count('killed', 'memory')
+            logger.warning(f"{payload}; worker {worker.process.pid} retired")
+            raise ParseKilled('memory', payload)
+        self._checkin(worker, limits)
+        if status == 'ok':
+            _count('parsed')
+            return payload
+        _count('failed')
+        raise RuntimeError(payload)
+
+    def _run(self, worker: _Worker, pptx_path: str, limits: ParseLimits, include_notes: bool):
+        worker.jobs += 1
+        worker.conn.send((os.path.abspath(pptx_path), include_notes))
+        deadline = time.monotonic() + limits.timeout if limits.timeout else None
+        max_rss = limits.max_rss_mb * 1024 * 1024
+
+        while not worker.conn.poll(_POLL_SECONDS):
+            if not worker.process.is_alive():
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                self._killed(worker, 'timeout', f'Parse exceeded {limits.timeout:g}s wall-clock limit')
+            rss = proc_memory(worker.process.pid).get('rss')
+            if max_rss and rss is not None and rss > max_rss:
+                self._killed(worker, 'memory', f'Parse exceeded {limits.max_rss_mb} MB RSS limit')
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join(timeout=5)
+            if hasattr(signal, 'SIGXCPU') and worker.process.exitcode == -signal.SIGXCPU:
+                self._killed(worker, 'cpu', f'Parse exceeded {limits.cpu_seconds}s CPU limit')
+            self._killed(worker, 'crashed', f'Parse worker died (exit code {worker.process.exitcode})')
+
+    @staticmethod
+    def _killed(worker: _Worker, reason: str, message: str):
+        worker.kill()
+        _count('killed', reason)
+        logger.warning(f"{message}; worker {worker.process.pid} killed")
+        raise ParseKilled(reason, message)
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+def _get_sandbox(max_workers: int) -> ParseSandbox:
+    """Create the pool lazily so each gunicorn worker gets its own after forking"""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = ParseSandbox(max_workers)
+            logger.info(f"Started parse sandbox with up to {max_workers} process(es)")
+        return _sandbox
+
+
+def parse_presentation(pptx_path: str, max_workers: int = 0, limits: ParseLimits = None,
+                       include_notes: bool = False) -> List[Dict]:
+    """
+    Check and parse an uploaded PowerPoint file, in a sandboxed worker process when configured.
+
+    Parsing holds the GIL for its whole run, so with threaded workers it would
+    stall every other request in the same process; a separate process keeps
+    those threads responsive and lets runaway parses be killed.
+
+    Args:
+        pptx_path: Path to the .pptx file
+        max_workers: Number of parse processes; 0 parses inline (pre-checks only, no resource limits)
+        limits: Resource limits (defaults to ParseLimits())
+        include_notes: Also extract speaker notes (see extract_text_and_urls)
+
+    Returns:
+        Same structure as extract_text_and_urls
+
+    Raises:
+        ParseRejected: The archive failed a pre-check
+        ParseKilled: The parse exceeded a resource limit or crashed
+    """
+    limits = limits or ParseLimits()
+    check_archive(pptx_path, limits)
+    _last_parse.peak_rss = None
+    if max_workers <= 0:
+        try:
+            slides = extract_text_and_urls(pptx_path, include_notes)
+        except Exception:
+            _count('failed')
+            raise
+        _count('parsed')
+        return slides
+    return _get_sandbox(max_workers).parse(pptx_path, limits, include_notes)
@@ -0,0 +1,94 @@
+"""Compact result model returned by the PowerPoint parser
+
+A dict costs a hash table per slide and per link, plus a repeated slide
+number and url_count. These ``__slots__`` classes hold only the fields,
+in fixed slots. They also answer the old dict-style lookups
+(``slide['text']``, ``link['url']``, ``link.get('text')``), so callers written
+against the dict shape keep working; ``slide['urls']`` builds the legacy link
+dicts, while new code reads the ``urls`` attribute. ``to_dict()`` produces the
+exact legacy structure for JSON responses.
+"""
+from typing import Dict, List, Optional
+
+
+class SlideLink:
+    """A hyperlink found on a slide; its slide number comes from the owning ParsedSlide"""
+    __slots__ = ('url', 'text')
+
+    def __init__(self, url: str, text: str = ''):
+        self.url = url
+        self.text = text
+
+    def __getitem__(self, key: str):
+        if key == 'url':
+            return self.url
+        if key == 'text':
+            return self.text
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __reduce__(self):
+        # Positional state pickles smaller than the default per-slot dict (results cross a process pipe)
+        return SlideLink, (self.url, self.text)
+
+    def to_dict(self, slide_number: int) -> Dict:
+        return {'url': self.url, 'text': self.text, 'slide': slide_number}
+
+    def __eq__(self, other):
+        return isinstance(other, SlideLink) and (self.url, self.text) == (other.url, other.text)
+
+    def __repr__(self):
+        return f'<SlideLink {self.url[:50]}>'
+
+
+class ParsedSlide:
+    """Text and links extracted from one slide"""
+    __slots__ = ('slide_number', 'text', 'urls')
+
+    def __init__(self, slide_number: int, text: str, urls: Optional[List[SlideLink]] = None):
+        self.slide_number = slide_number
+        self.text = text
+        self.urls = urls if urls is not None else []
+
+    @property
+    def url_count(self) -> int:
+        return len(self.urls)
+
+    def __getitem__(self, key: str):
+        # Old callers index the dict shape; attribute lookups cost nothing extra
+        if key in ('slide_number', 'text', 'url_count'):
+            return getattr(self, key)
+        if key == 'urls':
+            # Those callers expect link dicts, not SlideLink objects
+            return [link.to_dict(self.slide_number) for link in self.urls]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __reduce__(self):
+        return ParsedSlide, (self.slide_number, self.text, self.urls)
+
+    def to_dict(self) -> Dict:
+        """The legacy ``{'slide_number', 'text', 'urls': [{'url', 'text', 'slide'}], 'url_count'}`` shape"""
+        return {
+            'slide_number': self.slide_number,
+            'text': self.text,
+            'urls': [link.to_dict(self.slide_number) for link in self.urls],
+            'url_count': len(self.urls)
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, ParsedSlide) and \
+            (self.slide_number, self.text, self.urls) == (other.slide_number, other.text, other.urls)
+
+    def __repr__(self):
+        return f'<ParsedSlide {self.slide_number}: {len(self.urls)} links>'
@@ -1,238 +1,188 @@
-"""Utility to parse PowerPoint files and extract text with URLs"""
+"""Utility to parse PowerPoint files and extract text with URLs
+
+python-pptx opens the package and yields the slides; the shapes on each slide
+are then walked directly on the underlying XML. The walk takes a single pass
+over every paragraph, building the text and collecting hyperlinks at the same
+time. Each slide's relationships are resolved into a dict up front, so a
+hyperlink lookup is a single dict access. Going through python-pptx's shape,
+paragraph and run proxies costs a proxy object and several child lookups per
+run, and ``run.hyperlink`` even adds an ``a:rPr`` element to every run it
+inspects.
+
+The walk recurses into group shapes and table cells. It can also include the
+speaker notes, whose text is appended to the slide's text and whose links
+are added to the slide's links. Text is joined the way python-pptx's
+``.text`` joins it: paragraphs with ``\\n``, line breaks as ``\\v``, and
+field text included.
+"""
 from pptx import Presentation
-from pptx.shapes.base import BaseShape
-from typing import List, Dict
+from typing import Dict, List, Optional
 import logging
 
+from utils.parse_result import ParsedSlide, SlideLink
+
 logger = logging.getLogger(__name__)
 
-def extract_text_and_urls(pptx_path: str) -> List[Dict]:
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+_SP = _P + 'sp'
+_GRP_SP = _P + 'grpSp'
+_GRAPHIC_FRAME = _P + 'graphicFrame'
+_P_TX_BODY = _P + 'txBody'
+_TBL_PATH = f'{_A}graphic/{_A}graphicData/{_A}tbl'
+_TR = _A + 'tr'
+_TC = _A + 'tc'
+_A_TX_BODY = _A + 'txBody'
+_PARAGRAPH = _A + 'p'
+_RUN = _A + 'r'
+_BREAK = _A + 'br'
+_FIELD = _A + 'fld'
+_TEXT = _A + 't'
+_HLINK_PATH = f'{_A}rPr/{_A}hlinkClick'
+
+# Longest link text kept per URL
+MAX_LINK_TEXT = 200
+
+
+def part_links(part) -> Dict[str, str]:
+    """
+    Targets of every relationship of a slide or notes part, keyed by rId.
+
+    Internal targets (e.g. slide-jump links) map to their relative partname,
+    as python-pptx's ``hyperlink.address`` reports them.
+    """
+    return {rId: rel.target_ref for rId, rel in part.rels.items()}
+
+
+class _SlideWalker:
+    """Collects one slide's text parts and links; ``seen`` drops repeated URLs across the slide and its notes"""
+
+    def __init__(self):
+        self.text_parts = []
+        self.links = []
+        self.seen = set()
+
+    def visit_shapes(self, container, rels: Dict[str, str]):
+        """Walk the shapes of an ``p:spTree`` or ``p:grpSp`` in document order"""
+        for shape in container.iterchildren():
+            tag = shape.tag
+            if tag == _SP:
+                self.add_text(shape.find(_P_TX_BODY), rels)
+            elif tag == _GRP_SP:
+                self.visit_shapes(shape, rels)
+            elif tag == _GRAPHIC_FRAME:
+                # Charts, diagrams and OLE objects carry no text of their own
+                table = shape.find(_TBL_PATH)
+                if table is not None:
+                    for row in table.iterchildren(_TR):
+                        for cell in row.iterchildren(_TC):
+                            self.add_text(cell.find(_A_TX_BODY), rels)
+            # Pictures and connectors have no text frame
+
+    def add_text(self, tx_body, rels: Dict[str, str]):
+        """Add a text body's stripped text, if any, and its run hyperlinks"""
+        if tx_body is None:
+            return
+        text = self.read_text_body(tx_body, rels).strip()
+        if text:
+            self.text_parts.append(text)
+
+    def read_text_body(self, tx_body, rels: Dict[str, str]) -> str:
+        """Text of an ``a:txBody``, collecting the links of its runs on the way"""
+        paragraphs = []
+        for paragraph in tx_body.iterchildren(_PARAGRAPH):
+            pieces = []
+            run_texts = []
+            untitled = []  # links on runs without text, labelled with the whole paragraph's run text
+            for child in paragraph.iterchildren():
+                tag = child.tag
+                if tag == _RUN:
+                    t = child.find(_TEXT)
+                    run_text = (t.text if t is not None else None) or ''
+                    pieces.append(run_text)
+                    run_texts.append(run_text)
+                    hlink = child.find(_HLINK_PATH)
+                    if hlink is not None:
+                        link = self.add_link(rels.get(hlink.get(_R_ID)), run_text)
+                        if link is not None and not run_text:
+                            untitled.append(link)
+                elif tag == _BREAK:
+                    pieces.append('\v')
+                elif tag == _FIELD:
+                    t = child.find(_TEXT)
+                    pieces.append((t.text if t is not None else None) or '')
+            if untitled:
+                paragraph_text = ''.join(run_texts).strip()[:MAX_LINK_TEXT]
+                for link in untitled:
+                    link.text = paragraph_text
+            paragraphs.append(''.join(pieces))
+        return '\n'.join(paragraphs)
+
+    def add_link(self, url: Optional[str], run_text: str) -> Optional[SlideLink]:
+        """Record ``url`` unless it is empty, an in-document anchor or already on the slide"""
+        if not url:
+            return None
+        url = url.strip()
+        if not url or url in self.seen or url.startswith('#'):
+            return None
+        self.seen.add(url)
+        link = SlideLink(url, run_text.strip()[:MAX_LINK_TEXT])
+        self.links.append(link)
+        return link
+
+
+def parse_slide(slide, slide_number: int, include_notes: bool = False) -> Optional[ParsedSlide]:
+    """
+    Extract text and hyperlinks from one python-pptx slide.
+
+    Args:
+        slide: A slide of ``Presentation.slides``
+        slide_number: 1-based position of the slide
+        include_notes: Append the speaker notes' text and links
+
+    Returns:
+        ParsedSlide, or None when the slide has neither text nor links
+    """
+    walker = _SlideWalker()
+    walker.visit_shapes(slide.element.cSld.spTree, part_links(slide.part))
+    if include_notes and slide.has_notes_slide:
+        notes_slide = slide.notes_slide
+        notes = notes_slide.notes_placeholder
+        if notes is not None:
+            walker.add_text(notes.element.find(_P_TX_BODY), part_links(notes_slide.part))
+
+    full_text = ' '.join(walker.text_parts)
+    if not full_text and not walker.links:
+        return None
+    return ParsedSlide(slide_number, full_text, walker.links)
+
+
+def extract_text_and_urls(pptx_path: str, include_notes: bool = False) -> List[ParsedSlide]:
     """
     Extract text and hyperlinks from a PowerPoint file.
-    
+
     Args:
         pptx_path: Path to the .pptx file
-        
+        include_notes: Also extract each slide's speaker notes
+
     Returns:
-        List of dictionaries containing slide data with text and URLs
+        List of ParsedSlide objects (index them like the old dicts, or call to_dict())
     """
     try:
         prs = Presentation(pptx_path)
         slides_data = []
-        
+
         for slide_num, slide in enumerate(prs.slides, 1):
-            slide_text_parts = []
-            slide_urls = []
-            seen_urls = set()  # Track URLs to avoid duplicates
-            
-            # Extract text and hyperlinks from all shapes
-            for shape in slide.shapes:
-                # Handle tables separately (they store hyperlinks differently)
-                # Tables are stored as GraphicFrame objects with a .table attribute
-                if hasattr(shape, 'table'):
-                    table = shape.table
-                    for row in table.rows:
-                        for cell in row.cells:
-                            # Get cell text
-                            if cell.text and cell.text.strip():
-                                slide_text_parts.append(cell.text.strip())
-                            
-                            # Extract hyperlinks from table cell
-                            if hasattr(cell, "text_frame"):
-                                for paragraph in cell.text_frame.paragraphs:
-                                    cell_para_text = ""
-                                    for run in paragraph.runs:
-                                        if run.text:
-                                            cell_para_text += run.text
-                                        
-                                        # Check for hyperlinks in table cell runs
-                                        if hasattr(run, "hyperlink") and run.hyperlink:
-                                            try:
-                                                hyperlink = run.hyperlink
-                                                url = getattr(hyperlink, 'address', None)
-                                                
-                                                # If no address, try to resolve through XML/rId
-                                                if not url and hasattr(hyperlink, '_element'):
-                                                    try:
-                                                        element = hyperlink._element
-                                                        rId = element.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id') or element.get('rId')
-                                                        if rId and hasattr(slide, 'part') and hasattr(slide.part, 'rels'):
-                                                            rels = slide.part.rels
-                                                            if rId in rels:
-                                                                rel = rels[rId]
-                                                                if hasattr(rel, 'target_ref'):
-                                                                    url = rel.target_ref
-                                                    except Exception:
-                                                        pass
-                                                
-                                                if url:
-                                                    url = str(url).strip()
-                                                    if url and url not in seen_urls and not url.startswith('#'):
-                                                        seen_urls.add(url)
-                                                        link_text = run.text.strip() if run.text else cell_para_text.strip()
-                                                        slide_urls.append({
-                                                            'url': url,
-                                                            'text': link_text[:200] if link_text else '',
-                                                            'slide': slide_num
-                                                        })
-                                            except Exception as e:
-                                                logger.debug(f"Error extracting hyperlink from table cell: {e}")
-                                                continue
-                    continue  # Skip to next shape after processing table
-                
-                # Get text from shape
-                if hasattr(shape, "text") and shape.text:
-                    text = shape.text.strip()
-                    if text:
-                        slide_text_parts.append(text)
-                
-                # Extract hyperlinks from text runs and paragraphs
-                if hasattr(shape, "text_frame"):
-                    for paragraph in shape.text_frame.paragraphs:
-                        paragraph_text = ""
-                        paragraph_urls = []
-                        
-                        # First, collect all text from runs in the paragraph
-                        for run in paragraph.runs:
-                            if run.text:
-                                paragraph_text += run.text
-                        
-                        # Check hyperlinks at multiple levels
-                        # Method 1: Check each run for hyperlinks
-                        for run in paragraph.runs:
-                            if hasattr(run, "hyperlink"):
-                                try:
-                                    hyperlink = run.hyperlink
-                                    url = None
-                                    
-                                    # Get URL from hyperlink
-                                    if hyperlink:
-                                        # Try direct address attribute first
-                                        url = getattr(hyperlink, 'address', None)
-                                        
-                                        # If address is None, try to get rId from XML element and resolve it
-                                        if not url and hasattr(hyperlink, '_element'):
-                                            try:
-                                                element = hyperlink._element
-                                                # Check for rId in XML attributes
-                                                rId = element.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id') or element.get('rId')
-                                                
-                                                if rId:
-                                                    # Try to resolve through the slide's part relationships
-                                                    if hasattr(slide, 'part') and hasattr(slide.part, 'rels'):
-                                                        rels = slide.part.rels
-                                                        if rId in rels:
-                                                            rel = rels[rId]
-                                                            # Get the target reference
-                                                            if hasattr(rel, 'target_ref'):
-                                                                url = rel.target_ref
-                                                            elif hasattr(rel, 'target_uri'):
-                                                                url = rel.target_uri
-                                                            elif hasattr(rel, '_target'):
-                                                                url = rel._target
-                                            except Exception as xml_error:
-                                                logger.debug(f"Could not get URL from XML/rId: {xml_error}")
-                                                pass
-                                        
-                                        # Also try the rId attribute if it exists
-                                        if not url and hasattr(hyperlink, "rId"):
-                                            rId = hyperlink.rId
-                                            try:
-                                                # Try to resolve through the slide's part
-                                                if hasattr(slide, 'part') and hasattr(slide.part, 'rels'):
-                                                    rels = slide.part.rels
-                                                    if rId in rels:
-                                                        rel = rels[rId]
-                                                        if hasattr(rel, 'target_ref'):
-                                                            url = rel.target_ref
-                                                        elif hasattr(rel, 'target_uri'):
-                                                            url = rel.target_uri
-                                            except Exception as resolve_error:
-                                                logger.debug(f"Could not resolve rId {rId}: {resolve_error}")
-                                                pass
-                                    
-                                    if url:
-                                        url = str(url).strip()
-                                        # Filter out empty URLs and internal links
-                                        if url and url not in seen_urls and not url.startswith('#'):
-                                            seen_urls.add(url)
-                                            link_text = run.text.strip() if run.text else paragraph_text.strip()
-                                            paragraph_urls.append({
-                                                'url': url,
-                                                'text': link_text[:200] if link_text else '',
-                                                'slide': slide_num
-                                            })
-                                except Exception as e:
-                                    logger.debug(f"Error extracting hyperlink from run: {e}")
-                                    continue
-                        
-                        # Method 2: Check paragraph-level hyperlinks (less common but possible)
-                        if hasattr(paragraph, "hyperlink"):
-                            try:
-                                hyperlink = paragraph.hyperlink
-                                if hyperlink:
-                                    url = getattr(hyperlink, 'address', None)
-                                    if url:
-                                        url = str(url).strip()
-                                        if url and url not in seen_urls and not url.startswith('#'):
-                                            seen_urls.add(url)
-                                            paragraph_urls.append({
-                                                'url': url,
-                                                'text': paragraph_text.strip()[:200] if paragraph_text else '',
-                                                'slide': slide_num
-                                            })
-                            except Exception as e:
-                                logger.debug(f"Error extracting paragraph hyperlink: {e}")
-                                pass
-                        
-                        # Add all URLs found in this paragraph
-                        slide_urls.extend(paragraph_urls)
-                
-                # Also check if the shape itself has a hyperlink (for images, shapes, etc.)
-                # Skip group shapes as they don't support click actions
-                # Check if it's a group shape first
-                is_group = hasattr(shape, "shapes")  # Group shapes have a shapes collection
-                if not is_group and hasattr(shape, "click_action"):
-                    try:
-                        click_action = shape.click_action
-                        if click_action and hasattr(click_action, "hyperlinks"):
-                            for hyperlink in click_action.hyperlinks:
-                                if hasattr(hyperlink, "address") and hyperlink.address:
-                                    url = hyperlink.address.strip()
-                                    if url and url not in seen_urls:
-                                        seen_urls.add(url)
-                                        # Try to get associated text
-                                        link_text = ""
-                                        if hasattr(shape, "text") and shape.text:
-                                            link_text = shape.text.strip()
-                                        slide_urls.append({
-                                            'url': url,
-                                            'text': link_text[:200] if link_text else '',
-                                            'slide': slide_num
-                                        })
-                    except Exception as e:
-                        # Silently skip shapes that don't support click actions (like groups)
-                        # The error message "a group shape cannot have a click action" is expected
-                        if "group shape" not in str(e).lower():
-                            logger.debug(f"Skipping click_action check for shape: {type(shape).__name__} - {e}")
-                        pass
-            
-            # Combine all text
-            full_text = ' '.join(slide_text_parts)
-            
-            if full_text or slide_urls:
-                slides_data.append({
-                    'slide_number': slide_num,
-                    'text': full_text,
-                    'urls': slide_urls,
-                    'url_count': len(slide_urls)
-                })
-        
-        total_urls = sum(len(slide['urls']) for slide in slides_data)
+            parsed = parse_slide(slide, slide_num, include_notes)
+            if parsed is not None:
+                slides_data.append(parsed)
+
+        total_urls = sum(len(slide.urls) for slide in slides_data)
         logger.info(f"Extracted {len(slides_data)} slides with {total_urls} URLs from {pptx_path}")
         return slides_data
-        
+
     except Exception as e:
         logger.error(f"Error parsing PowerPoint file: {str(e)}")
         raise
-
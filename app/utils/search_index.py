@@ -0,0 +1,552 @@
+"""TF-IDF relevance and "more like this" search over slide text
+
+Layout of SEARCH_INDEX_DIR:
+    CURRENT                 JSON pointer: base generation and the deltas merged into it
+    gen-<N>/*.npy           Base segment, opened with mmap so every gunicorn worker
+                            on the host shares one copy through the page cache
+    deltas/delta-*.npz      Small segments appended on upload
+
+Terms are mapped to columns with the hashing trick, so there is no vocabulary
+to keep in sync between workers and new slides can be appended without
+touching existing segments. Stored values are sublinear term frequencies;
+IDF weights are derived from all segments whenever a worker picks up a
+change, so adding slides never rewrites older segments. Document frequencies
+and norms of the base are computed once per generation and a new delta only
+adds its own, so norms keep the IDF of the moment their segment was loaded
+until the next compaction. A background thread in each server worker
+periodically compacts deltas into a new base generation and drops slides
+that no longer exist.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence, Tuple
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+from models import db, PresentationSlide, SlideText
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were will with'.split()
+)
+ARRAYS = ('indptr', 'indices', 'data', 'slide_ids')
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall((text or '').lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def _empty_segment() -> Dict[str, np.ndarray]:
+    return {
+        'indptr': np.zeros(1, dtype=np.int32),
+        'indices': np.empty(0, dtype=np.int32),
+        'data': np.empty(0, dtype=np.float32),
+        'slide_ids': np.empty(0, dtype=np.int64)
+    }
+
+
+class SearchIndex:
+    """Segmented on-disk TF-IDF index; one instance per process"""
+
+    def __init__(self, path: str, num_features: int = 1 << 20):
+        self.path = path
+        self.num_features = num_features
+        self._lock = threading.RLock()
+        self._state_key = None
+        self._base = _empty_segment()
+        self._deltas = []
+        self._matrices = []
+        self._slide_ids = None
+        self._df = None
+        self._base_norms = None
+        self._norms = None
+        self._weights = None
+        self._compactor = None
+        os.makedirs(os.path.join(path, 'deltas'), exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Vectorizing
+    # ------------------------------------------------------------------
+
+    def _feature(self, token: str) -> int:
+        return zlib.crc32(token.encode('utf-8')) % self.num_features
+
+    def vectorize(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """Sublinear term-frequency rows (1 + log tf) over hashed features"""
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            counts = {}
+            for token in tokenize(text):
+                feature = self._feature(token)
+                counts[feature] = counts.get(feature, 0) + 1
+            features = sorted(counts)
+            indices.extend(features)
+            data.extend(1.0 + np.log(counts[f]) for f in features)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, self.num_features)
+        )
+
+    @staticmethod
+    def _document_frequency(matrix: sparse.csr_matrix, num_features: int) -> np.ndarray:
+        return np.bincount(matrix.indices, minlength=num_features).astype(np.int64)
+
+    @staticmethod
+    def _idf_weights(df: np.ndarray, num_docs: int) -> np.ndarray:
+        return (np.log((1.0 + num_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    @staticmethod
+    def _row_norms(matrix: sparse.csr_matrix, idf: np.ndarray) -> np.ndarray:
+        squared = np.square(matrix.data, dtype=np.float64) * np.square(idf[matrix.indices], dtype=np.float64)
+        sums = np.add.reduceat(squared, matrix.indptr[:-1]) if len(squared) else np.zeros(matrix.shape[0])
+        # reduceat repeats the next value for empty rows; those rows have no terms
+        sums[np.diff(matrix.indptr) == 0] = 0.0
+        return np.sqrt(sums).astype(np.float32)
+
+    # ------------------------------------------------------------------
+    # Segment files
+    # ------------------------------------------------------------------
+
+    def _read_current(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, 'CURRENT')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'merged_deltas': []}
+
+    def _write_current(self, current: Dict):
+        tmp = os.path.join(self.path, f'CURRENT.{uuid.uuid4().hex}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(current, f)
+        os.replace(tmp, os.path.join(self.path, 'CURRENT'))
+
+    def _pending_deltas(self, current: Dict) -> List[str]:
+        merged = set(current['merged_deltas'])
+        deltas_dir = os.path.join(self.path, 'deltas')
+        return sorted(name for name in os.listdir(deltas_dir)
+                      if name.endswith('.npz') and name not in merged)
+
+    def _load_base(self, generation: int) -> Dict[str, np.ndarray]:
+        if not generation:
+            return _empty_segment()
+        directory = os.path.join(self.path, f'gen-{generation}')
+        return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+
+    def _load_delta(self, name: str) -> Dict[str, np.ndarray]:
+        with np.load(os.path.join(self.path, 'deltas', name)) as delta:
+            return {array: delta[array] for array in ARRAYS}
+
+    def _segment_matrix(self, segment) -> sparse.csr_matrix:
+        # copy=False keeps the memory-mapped arrays shared instead of reading them into the heap
+        return sparse.csr_matrix(
+            (segment['data'], segment['indices'], segment['indptr']),
+            shape=(len(segment['slide_ids']), self.num_features), copy=False
+        )
+
+    def refresh(self):
+        """Pick up a new base generation or deltas written by other processes"""
+        for attempt in range(3):
+            try:
+                return self._refresh()
+            except FileNotFoundError:
+                # A concurrent compaction removed files between reading CURRENT and loading them
+                if attempt == 2:
+                    raise
+
+    def _refresh(self):
+        current = self._read_current()
+        pending = self._pending_deltas(current)
+        state_key = (current['generation'], tuple(pending))
+        with self._lock:
+            if state_key == self._state_key:
+                return
+            loaded = [name for name, _, _ in self._deltas]
+            # Merged deltas only disappear together with a new generation
+            if (self._state_key is None or current['generation'] != self._state_key[0]
+                    or any(name not in pending for name in loaded)):
+                self._base = self._load_base(current['generation'])
+                self._deltas = []
+                loaded = []
+                self._df = self._document_frequency(self._segment_matrix(self._base), self.num_features)
+                self._weights = self._idf_weights(self._df, len(self._base['slide_ids']))
+                self._base_norms = None
+
+            new_deltas = [(name, self._load_delta(name)) for name in pending if name not in loaded]
+            if new_deltas:
+                num_docs = len(self._base['slide_ids'])
+                num_docs += sum(len(segment['slide_ids']) for _, segment, _ in self._deltas)
+                for _, segment in new_deltas:
+                    # Terms are unique within a row, so each index counts one document
+                    np.add.at(self._df, segment['indices'], 1)
+                    num_docs += len(segment['slide_ids'])
+                self._weights = self._idf_weights(self._df, num_docs)
+                for name, segment in new_deltas:
+                    self._deltas.append((name, segment, self._row_norms(self._segment_matrix(segment), self._weights)))
+            if self._base_norms is None:
+                self._base_norms = self._row_norms(self._segment_matrix(self._base), self._weights)
+
+            segments = [self._base] + [segment for _, segment, _ in self._deltas]
+            # Segments are scored one by one rather than stacked, which would copy the mapped base
+            self._matrices = [self._segment_matrix(segment) for segment in segments]
+            self._slide_ids = np.concatenate([np.asarray(segment['slide_ids']) for segment in segments])
+            self._norms = np.concatenate([self._base_norms] + [norms for _, _, norms in self._deltas])
+            self._state_key = state_key
+
+    @staticmethod
+    def _segment_arrays(matrix: sparse.csr_matrix, slide_ids) -> Dict[str, np.ndarray]:
+        return {
+            'indptr': matrix.indptr.astype(np.int32),
+            'indices': matrix.indices.astype(np.int32),
+            'data': matrix.data.astype(np.float32),
+            'slide_ids': np.asarray(slide_ids, dtype=np.int64)
+        }
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def add_documents(self, documents: Sequence[Tuple[int, str]]) -> int:
+        """
+        Append slides as a new delta segment visible to every worker.
+
+        Args:
+            documents: (slide_id, text) pairs
+
+        Returns:
+            Number of slides added
+        """
+        if not documents:
+            return 0
+        matrix = self.vectorize(text for _, text in documents)
+        segment = self._segment_arrays(matrix, [slide_id for slide_id, _ in documents])
+
+        name = f'delta-{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}.npz'
+        tmp = os.path.join(self.path, 'deltas', f'.{name}.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, **segment)
+        os.replace(tmp, os.path.join(self.path, 'deltas', name))
+        return len(documents)
+
+    def _write_base(self, generation: int, segment: Dict[str, np.ndarray], merged_deltas: List[str]):
+        directory = os.path.join(self.path, f'gen-{generation}')
+        tmp_directory = directory + '.tmp'
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_directory, f'{name}.npy'), segment[name])
+        os.replace(tmp_directory, directory)
+        previous = self._read_current()
+        self._write_current({'generation': generation, 'merged_deltas': merged_deltas})
+
+        # Processes still mapping the old generation keep their open files until they refresh
+        if previous['generation'] and previous['generation'] != generation:
+            shutil.rmtree(os.path.join(self.path, f"gen-{previous['generation']}"), ignore_errors=True)
+        for name in merged_deltas:
+            try:
+                os.remove(os.path.join(self.path, 'deltas', name))
+            except FileNotFoundError:
+                pass
+        self._write_current({'generation': generation, 'merged_deltas': []})
+
+    def build(self, documents: Iterable[Tuple[int, str]], batch_size: int = 5000) -> int:
+        """Replace the whole index with ``documents`` ((slide_id, text) pairs)"""
+        with self._exclusive() as acquired:
+            if not acquired:
+                raise RuntimeError("Another process is compacting or building the search index")
+            # Deltas written while the build reads the database stay pending
+            current = self._read_current()
+            merged_deltas = self._pending_deltas(current)
+            matrices = []
+            slide_ids = []
+            batch = []
+            for document in documents:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    matrices.append(self.vectorize(text for _, text in batch))
+                    slide_ids.extend(slide_id for slide_id, _ in batch)
+                    batch = []
+            if batch:
+                matrices.append(self.vectorize(text for _, text in batch))
+                slide_ids.extend(slide_id for slide_id, _ in batch)
+
+            if matrices:
+                matrix = sparse.vstack(matrices, format='csr')
+            else:
+                matrix = self._segment_matrix(_empty_segment())
+            self._store_compacted(matrix, np.asarray(slide_ids, dtype=np.int64),
+                                  current['generation'] + 1, merged_deltas)
+            return len(slide_ids)
+
+    def clear(self):
+        """
+        Replace the index with an empty generation, dropping every pending delta.
+
+        Waits for a running compaction instead of failing, so a compaction
+        that read the old slides can't publish them after the clear.
+        """
+        with self._exclusive(blocking=True):
+            current = self._read_current()
+            self._store_compacted(self._segment_matrix(_empty_segment()), np.zeros(0, dtype=np.int64),
+                                  current['generation'] + 1, self._pending_deltas(current))
+
+    def _store_compacted(self, matrix, slide_ids, generation, merged_deltas):
+        order = np.argsort(slide_ids, kind='stable')
+        matrix = matrix[order]
+        slide_ids = slide_ids[order]
+        self._write_base(generation, self._segment_arrays(matrix, slide_ids), merged_deltas)
+        logger.info(f"Search index generation {generation}: {len(slide_ids)} slides")
+
+    def compact(self, alive_ids_loader=None) -> bool:
+        """
+        Merge pending deltas into a new base generation, dropping deleted slides.
+
+        Args:
+            alive_ids_loader: Callable returning the slide IDs that still exist, called only
+                once the compaction lock is held (None keeps every indexed slide)
+
+        Returns:
+            False when another process holds the compaction lock or there is nothing to do
+        """
+        with self._exclusive() as acquired:
+            if not acquired:
+                return False
+            self.refresh()
+            with self._lock:
+                current = self._read_current()
+                pending = [name for name, _, _ in self._deltas]
+                matrices, slide_ids = self._matrices, self._slide_ids
+            if not pending and alive_ids_loader is None:
+                return False
+
+            keep = np.ones(len(slide_ids), dtype=bool)
+            if alive_ids_loader is not None:
+                keep = np.isin(slide_ids, np.fromiter(alive_ids_loader(), dtype=np.int64))
+            # A slide re-added in a later delta supersedes its older row
+            _, last = np.unique(slide_ids[::-1], return_index=True)
+            latest = np.zeros(len(slide_ids), dtype=bool)
+            latest[len(slide_ids) - 1 - last] = True
+            keep &= latest
+            if not pending and keep.all():
+                return False
+
+            rows = np.flatnonzero(keep)
+            matrix = sparse.vstack(matrices, format='csr')
+            self._store_compacted(matrix[rows], slide_ids[rows], current['generation'] + 1, pending)
+            return True
+
+    @contextmanager
+    def _exclusive(self, blocking: bool = False):
+        """Inter-process lock so only one worker builds or compacts at a time; yields whether it was acquired"""
+        with open(os.path.join(self.path, 'compact.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True  # closing the file releases the lock
+
+    def start_compactor(self, interval: float, alive_ids_loader):
+        """
+        Compact in a daemon thread every ``interval`` seconds.
+
+        Args:
+            interval: Seconds between compactions
+            alive_ids_loader: Callable returning the IDs of slides that still exist
+        """
+        with self._lock:
+            if self._compactor is not None or interval <= 0:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.compact(alive_ids_loader)
+                    except Exception as e:
+                        logger.error(f"Search index compaction failed: {str(e)}")
+
+            self._compactor = threading.Thread(target=loop, name='search-index-compactor', daemon=True)
+            self._compactor.start()
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _top_k(self, query_matrix: sparse.csr_matrix, k: int, exclude=None) -> List[List[Tuple[int, float]]]:
+        """Cosine top-k for each query row, scored in one sparse matrix product"""
+        with self._lock:
+            matrices, slide_ids, norms, idf = self._matrices, self._slide_ids, self._norms, self._weights
+        if not len(slide_ids):
+            return [[] for _ in range(query_matrix.shape[0])]
+
+        weighted = query_matrix.multiply(idf[None, :]).tocsr()
+        query_norms = np.sqrt(np.asarray(weighted.power(2).sum(axis=1)).ravel())
+        # Documents hold raw tf, so the second idf factor is folded into the queries
+        queries = weighted.multiply(idf[None, :]).T.tocsc()
+        scores = sparse.vstack([matrix @ queries for matrix in matrices], format='csc')
+
+        results = []
+        for column in range(scores.shape[1]):
+            start, end = scores.indptr[column], scores.indptr[column + 1]
+            rows = scores.indices[start:end]
+            values = scores.data[start:end] / (norms[rows] * max(query_norms[column], 1e-12) + 1e-12)
+            if exclude is not None and exclude[column] is not None:
+                values = np.where(slide_ids[rows] == exclude[column], 0.0, values)
+            count = min(k, len(values))
+            if not count:
+                results.append([])
+                continue
+            best = np.argpartition(-values, count - 1)[:count]
+            best = best[np.argsort(-values[best], kind='stable')]
+            results.append([(int(slide_ids[rows[i]]), float(values[i])) for i in best if values[i] > 0])
+        return results
+
+    def search(self, queries: Sequence[str], k: int = 10) -> List[List[Tuple[int, float]]]:
+        """Top-k (slide_id, cosine score) for each free-text query"""
+        self.refresh()
+        return self._top_k(self.vectorize(queries), k)
+
+    def more_like_this(self, slide_ids: Sequence[int], k: int = 10) -> List[List[Tuple[int, float]]]:
+        """Top-k slides most similar to each indexed slide (the slide itself excluded)"""
+        self.refresh()
+        with self._lock:
+            matrices, indexed_ids = self._matrices, self._slide_ids
+        offsets = np.cumsum([0] + [matrix.shape[0] for matrix in matrices])
+        rows = []
+        for slide_id in slide_ids:
+            positions = np.flatnonzero(indexed_ids == slide_id)
+            rows.append(positions[-1] if len(positions) else None)
+
+        vectors = []
+        for row in rows:
+            if row is None:
+                vectors.append(sparse.csr_matrix((1, self.num_features), dtype=np.float32))
+            else:
+                segment = np.searchsorted(offsets, row, side='right') - 1
+                vectors.append(matrices[segment][row - offsets[segment]])
+        query_matrix = sparse.vstack(vectors, format='csr')
+        results = self._top_k(query_matrix, k, exclude=list(slide_ids))
+        return [result if row is not None else None for result, row in zip(results, rows)]
+
+    def stats(self) -> Dict:
+        self.refresh()
+        with self._lock:
+            return {
+                'generation': self._state_key[0] if self._state_key else 0,
+                'documents': int(len(self._slide_ids)),
+                'pending_deltas': len(self._deltas),
+                'num_features': self.num_features
+            }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(config) -> SearchIndex:
+    """Process-wide SearchIndex for the configured directory"""
+    path = config.get('SEARCH_INDEX_DIR', '/tmp/search_index')
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = SearchIndex(path, num_features=config.get('SEARCH_NUM_FEATURES', 1 << 20))
+        return _indexes[path]
+
+
+def slide_documents(session, slide_ids: Iterable[int] = None, batch_size: int = 1000):
+    """Stream (slide_id, text) pairs from presentation_slides, resolving shared and inline text"""
+    query = session.query(
+        PresentationSlide.id, PresentationSlide.inline_text, SlideText.text, SlideText.compressed_text
+    ).outerjoin(SlideText, PresentationSlide.text_hash == SlideText.hash).order_by(PresentationSlide.id)
+    if slide_ids is not None:
+        query = query.filter(PresentationSlide.id.in_(list(slide_ids)))
+    for slide_id, inline_text, text, compressed_text in query.yield_per(batch_size):
+        if compressed_text is not None:
+            text = zlib.decompress(compressed_text).decode('utf-8')
+        yield slide_id, text if text is not None else inline_text or ''
+
+
+def resolve_hits(session, hits: List[Tuple[int, float]], k: int) -> List[Dict]:
+    """
+    Turn (slide_id, score) hits into result dicts, skipping slides deleted since they were indexed.
+
+    Args:
+        session: Session to load the slides with
+        hits: Ranked hits, best first
+        k: Maximum number of results
+
+    Returns:
+        list: Slide summaries with their score, best first
+    """
+    ids = list(dict.fromkeys(slide_id for slide_id, _ in hits))
+    slides = {slide.id: slide for slide in session.query(PresentationSlide).filter(PresentationSlide.id.in_(ids))}
+    results = []
+    seen = set()
+    for slide_id, score in hits:
+        slide = slides.get(slide_id)
+        if slide is None or slide_id in seen:
+            continue
+        seen.add(slide_id)
+        text = slide.text or ''
+        results.append({
+            'id': slide.id,
+            'slide_number': slide.slide_number,
+            'file_id': slide.file_id,
+            'file_name': slide.file.original_filename if slide.file else slide.source_file,
+            'score': round(score, 4),
+            'text_preview': text[:100] + '...' if len(text) > 100 else text
+        })
+        if len(results) >= k:
+            break
+    return results
+
+
+def index_new_slides(config, slides) -> int:
+    """Add freshly committed slides to the search index as one delta"""
+    if not config.get('SEARCH_INDEX_ENABLED', True):
+        return 0
+    return get_search_index(config).add_documents([(slide.id, slide.text or '') for slide in slides])
+
+
+def clear_search_index(config) -> None:
+    """Empty the search index after every slide was deleted"""
+    if config.get('SEARCH_INDEX_ENABLED', True):
+        get_search_index(config).clear()
+
+
+def init_search_index(app):
+    """
+    Start the background compactor of each worker that serves requests; workers take turns through a file lock.
+
+    The thread is started on the first request rather than here, so scripts
+    that only call create_app() don't run one, and each gunicorn worker gets
+    its own after forking.
+    """
+    if not app.config.get('SEARCH_INDEX_ENABLED', True):
+        return
+    index = get_search_index(app.config)
+
+    def alive_ids():
+        with app.app_context():
+            return db.session.execute(db.select(PresentationSlide.id)).scalars().all()
+
+    @app.before_request
+    def start_search_compactor():
+        if index._compactor is None:
+            index.start_compactor(app.config.get('SEARCH_COMPACT_INTERVAL_SECONDS', 300), alive_ids)
@@ -0,0 +1,225 @@
+"""Near-duplicate slide and deck lookup backed by a MinHash/LSH index
+
+The index is keyed by slide_texts.hash, so each distinct slide body is
+shingled and hashed once no matter how many decks repeat it. Lookups only
+touch bodies that share an LSH bucket with the query, found through the
+(band, bucket) primary key of text_lsh_buckets, and verify those candidates
+against their stored signatures.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased, selectinload
+import logging
+
+import numpy as np
+
+from models import db, PresentationFile, PresentationSlide, TextSignature, TextLshBucket
+from models.database import DIALECT_INSERTS
+from utils.minhash import MinHasher
+
+logger = logging.getLogger(__name__)
+
+# Candidate signatures per query; a long IN list over a sizable share of the table turns into a seq scan
+SIGNATURE_BATCH_SIZE = 100
+
+_hashers = {}
+
+
+def get_hasher(config) -> MinHasher:
+    """MinHasher for the configured parameters (changing them requires rebuilding the index)"""
+    key = (config.get('SIMILARITY_NUM_PERM', 128), config.get('SIMILARITY_BANDS', 16))
+    if key not in _hashers:
+        _hashers[key] = MinHasher(num_perm=key[0], bands=key[1])
+    return _hashers[key]
+
+
+def index_texts(texts_by_hash: Dict[str, str], hasher: MinHasher) -> int:
+    """
+    Add signatures and LSH buckets for slide bodies not indexed yet, in bulk.
+
+    Args:
+        texts_by_hash: slide_texts hash -> text
+        hasher: MinHasher from get_hasher
+
+    Returns:
+        Number of newly indexed bodies
+    """
+    if not texts_by_hash:
+        return 0
+    indexed = set(db.session.execute(
+        db.select(TextSignature.text_hash).where(TextSignature.text_hash.in_(list(texts_by_hash)))
+    ).scalars())
+
+    signatures = []
+    buckets = []
+    for digest, text in texts_by_hash.items():
+        if digest in indexed:
+            continue
+        signature = hasher.signature(text or '')
+        if signature is None:
+            continue
+        signatures.append({'text_hash': digest, 'signature': hasher.to_bytes(signature)})
+        buckets.extend({'band': band, 'bucket': key, 'text_hash': digest}
+                       for band, key in enumerate(hasher.band_keys(signature)))
+    if not signatures:
+        return 0
+
+    insert = DIALECT_INSERTS.get(db.engine.dialect.name)
+    if insert is not None:
+        # Another upload may index the same boilerplate concurrently
+        db.session.execute(insert(TextSignature).on_conflict_do_nothing(), signatures)
+        db.session.execute(insert(TextLshBucket).on_conflict_do_nothing(), buckets)
+    else:
+        db.session.execute(db.insert(TextSignature), signatures)
+        db.session.execute(db.insert(TextLshBucket), buckets)
+    return len(signatures)
+
+
+def unindex_texts(hashes: Iterable[str] = None) -> None:
+    """Drop index entries for these slide bodies (all entries when hashes is None)"""
+    bucket_delete = db.delete(TextLshBucket)
+    signature_delete = db.delete(TextSignature)
+    if hashes is not None:
+        hashes = list(hashes)
+        if not hashes:
+            return
+        bucket_delete = bucket_delete.where(TextLshBucket.text_hash.in_(hashes))
+        signature_delete = signature_delete.where(TextSignature.text_hash.in_(hashes))
+    db.session.execute(bucket_delete.execution_options(synchronize_session=False))
+    db.session.execute(signature_delete.execution_options(synchronize_session=False))
+
+
+def _load_signatures(session, hashes, hasher) -> Dict[str, np.ndarray]:
+    """Signatures of ``hashes``, read in primary-key batches small enough to stay index lookups"""
+    hashes = list(hashes)
+    signatures = {}
+    for start in range(0, len(hashes), SIGNATURE_BATCH_SIZE):
+        rows = session.query(TextSignature.text_hash, TextSignature.signature).filter(
+            TextSignature.text_hash.in_(hashes[start:start + SIGNATURE_BATCH_SIZE])
+        )
+        signatures.update((digest, hasher.from_bytes(data)) for digest, data in rows)
+    return signatures
+
+
+def _matching_texts(session, hashes, hasher, threshold) -> Dict[str, Dict[str, float]]:
+    """
+    For each query body, the indexed bodies whose estimated Jaccard similarity reaches ``threshold``.
+
+    Identical bodies always match themselves with similarity 1.0.
+    """
+    hashes = list(hashes)
+    query_bucket = aliased(TextLshBucket)
+    candidate_bucket = aliased(TextLshBucket)
+    pairs = session.query(query_bucket.text_hash, candidate_bucket.text_hash).join(
+        candidate_bucket,
+        and_(query_bucket.band == candidate_bucket.band, query_bucket.bucket == candidate_bucket.bucket)
+    ).filter(
+        query_bucket.text_hash.in_(hashes),
+        candidate_bucket.text_hash != query_bucket.text_hash
+    ).distinct().all()
+
+    matches = {digest: {digest: 1.0} for digest in hashes}
+    if not pairs:
+        return matches
+
+    signatures = _load_signatures(session, set(hashes) | {candidate for _, candidate in pairs}, hasher)
+    candidates_by_query = defaultdict(list)
+    for query_hash, candidate_hash in pairs:
+        if query_hash in signatures and candidate_hash in signatures:
+            candidates_by_query[query_hash].append(candidate_hash)
+
+    for query_hash, candidates in candidates_by_query.items():
+        scores = hasher.similarity(signatures[query_hash], np.stack([signatures[c] for c in candidates]))
+        for candidate_hash, score in zip(candidates, scores):
+            if score >= threshold:
+                matches[query_hash][candidate_hash] = float(score)
+    return matches
+
+
+def similar_slides(session, slide: PresentationSlide, hasher: MinHasher,
+                   threshold: float = 0.5, limit: int = 20) -> List[Dict]:
+    """
+    Slides whose text is a near-duplicate of ``slide``, most similar first.
+
+    A boilerplate body can be shared by thousands of slides, so slides are
+    fetched one similarity level at a time with a SQL LIMIT, stopping once
+    ``limit`` slides are found.
+    """
+    if not slide.text_hash:
+        return []
+    matches = _matching_texts(session, [slide.text_hash], hasher, threshold)[slide.text_hash]
+    hashes_by_score = defaultdict(list)
+    for text_hash, score in matches.items():
+        hashes_by_score[score].append(text_hash)
+
+    others = []
+    for score in sorted(hashes_by_score, reverse=True):
+        others += session.query(PresentationSlide).options(selectinload(PresentationSlide.file)).filter(
+            PresentationSlide.text_hash.in_(hashes_by_score[score]),
+            PresentationSlide.id != slide.id
+        ).order_by(PresentationSlide.id).limit(limit - len(others)).all()
+        if len(others) >= limit:
+            break
+
+    results = []
+    for other in others:
+        text = other.text or ''
+        results.append({
+            'id': other.id,
+            'slide_number': other.slide_number,
+            'file_id': other.file_id,
+            'file_name': other.file.original_filename if other.file else other.source_file,
+            'similarity': round(matches[other.text_hash], 4),
+            'text_preview': text[:100] + '...' if len(text) > 100 else text
+        })
+    return results
+
+
+def similar_files(session, presentation_file: PresentationFile, hasher: MinHasher,
+                  threshold: float = 0.5, min_score: float = 0.3, limit: int = 20) -> List[Dict]:
+    """
+    Decks sharing near-duplicate slides with ``presentation_file``, most similar first.
+
+    ``containment`` is the share of this deck's distinct slide bodies with a
+    near-duplicate in the other deck; ``similarity`` divides the same count
+    by the larger of the two decks, so a short deck contained in a long one
+    doesn't score as a copy.
+    """
+    own_hashes = {digest for (digest,) in session.query(PresentationSlide.text_hash).filter(
+        PresentationSlide.file_id == presentation_file.id,
+        PresentationSlide.text_hash.isnot(None)
+    ).distinct()}
+    if not own_hashes:
+        return []
+
+    matches = _matching_texts(session, own_hashes, hasher, threshold)
+    own_by_candidate = defaultdict(set)
+    for own_hash, candidates in matches.items():
+        for candidate_hash in candidates:
+            own_by_candidate[candidate_hash].add(own_hash)
+
+    matched_own = defaultdict(set)
+    rows = session.query(PresentationSlide.text_hash, PresentationSlide.file_id).filter(
+        PresentationSlide.text_hash.in_(list(own_by_candidate)),
+        PresentationSlide.file_id != presentation_file.id
+    ).distinct()
+    for candidate_hash, other_file_id in rows:
+        matched_own[other_file_id].update(own_by_candidate[candidate_hash])
+    if not matched_own:
+        return []
+
+    results = []
+    for other in session.query(PresentationFile).filter(PresentationFile.id.in_(list(matched_own))):
+        shared = len(matched_own[other.id])
+        score = shared / max(len(own_hashes), other.slide_count or 0, 1)
+        if score < min_score:
+            continue
+        results.append({
+            'file': other.to_dict(),
+            'shared_slides': shared,
+            'containment': round(shared / len(own_hashes), 4),
+            'similarity': round(score, 4)
+        })
+    results.sort(key=lambda result: (-result['similarity'], result['file']['id']))
+    return results[:limit]
@@ -0,0 +1,279 @@
+"""Columnar snapshots of the presentation tables for analytics
+
+Each snapshot is a directory under EXPORT_DIR holding one Parquet (or Arrow
+IPC) file per table, written in record batches straight from a streaming
+query so memory stays flat however large the tables are. ``manifest.json``
+lists the snapshots in order together with each table's watermark, an ``id``
+below which every row has committed (see id_watermark): a full snapshot
+exports everything up to the watermark, an incremental one only rows whose
+``id`` lies after the previous snapshot's watermark. Deletes are not
+captured by incremental snapshots; take a full one to reset.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+import zlib
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from models import db, PresentationFile, PresentationSlide, SlideText, SlideUrl
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+MANIFEST = 'manifest.json'
+
+
+def _slide_rows(rows):
+    for row in rows:
+        slide_id, slide_number, inline_text, text, compressed_text, text_hash, source_file, file_id, created_at = row
+        if compressed_text is not None:
+            text = zlib.decompress(compressed_text).decode('utf-8')
+        yield (slide_id, slide_number, text if text is not None else inline_text,
+               text_hash, source_file, file_id, created_at)
+
+
+# table -> watermark column, query, Arrow schema and optional row transform
+TABLES = {
+    'presentation_files': {
+        'watermark': PresentationFile.id,
+        'query': lambda: db.select(
+            PresentationFile.id, PresentationFile.filename, PresentationFile.original_filename,
+            PresentationFile.uploaded_at, PresentationFile.slide_count, PresentationFile.url_count
+        ).order_by(PresentationFile.id),
+        'schema': pa.schema([
+            ('id', pa.int64()), ('filename', pa.string()), ('original_filename', pa.string()),
+            ('uploaded_at', pa.timestamp('us')), ('slide_count', pa.int32()), ('url_count', pa.int32())
+        ]),
+        'rows': None
+    },
+    'presentation_slides': {
+        'watermark': PresentationSlide.id,
+        # Shared slide bodies are resolved so consumers get plain text
+        'query': lambda: db.select(
+            PresentationSlide.id, PresentationSlide.slide_number, PresentationSlide.inline_text,
+            SlideText.text, SlideText.compressed_text, PresentationSlide.text_hash,
+            PresentationSlide.source_file, PresentationSlide.file_id, PresentationSlide.created_at
+        ).outerjoin(SlideText, PresentationSlide.text_hash == SlideText.hash).order_by(PresentationSlide.id),
+        'schema': pa.schema([
+            ('id', pa.int64()), ('slide_number', pa.int32()), ('text', pa.large_string()),
+            ('text_hash', pa.string()), ('source_file', pa.string()), ('file_id', pa.int64()),
+            ('created_at', pa.timestamp('us'))
+        ]),
+        'rows': _slide_rows
+    },
+    'slide_urls': {
+        'watermark': SlideUrl.id,
+        'query': lambda: db.select(
+            SlideUrl.id, SlideUrl.slide_id, SlideUrl.file_id, SlideUrl.url, SlideUrl.link_text, SlideUrl.created_at
+        ).order_by(SlideUrl.id),
+        'schema': pa.schema([
+            ('id', pa.int64()), ('slide_id', pa.int64()), ('file_id', pa.int64()), ('url', pa.string()),
+            ('link_text', pa.string()), ('created_at', pa.timestamp('us'))
+        ]),
+        'rows': None
+    }
+}
+
+
+def read_manifest(export_dir: str) -> Dict:
+    try:
+        with open(os.path.join(export_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'snapshots': []}
+
+
+def _write_manifest(export_dir: str, manifest: Dict):
+    tmp = os.path.join(export_dir, f'.{MANIFEST}.{uuid.uuid4().hex}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(export_dir, MANIFEST))
+
+
+def find_snapshot(export_dir: str, snapshot_id: str) -> Optional[Dict]:
+    """Manifest entry of a snapshot; ``latest`` resolves to the newest one"""
+    snapshots = read_manifest(export_dir)['snapshots']
+    if snapshot_id == 'latest':
+        return snapshots[-1] if snapshots else None
+    return next((snapshot for snapshot in snapshots if snapshot['id'] == snapshot_id), None)
+
+
+class _Writer:
+    """Same interface over ParquetWriter and the Arrow IPC file writer"""
+
+    def __init__(self, path: str, schema: pa.Schema, file_format: str, compression: str):
+        if file_format == 'parquet':
+            self._writer = pq.ParquetWriter(path, schema, compression=compression)
+        else:
+            options = ipc.IpcWriteOptions(compression=compression if compression != 'none' else None)
+            self._writer = ipc.new_file(path, schema, options=options)
+
+    def write(self, batch: pa.RecordBatch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+def id_watermark(table: str, timeout: float = 60.0) -> int:
+    """
+    Highest ``id`` of a table at or below which every row has committed. Must run inside an app context.
+
+    IDs are handed out when a row is inserted, not when it commits, so a slow
+    upload can still commit rows below the highest visible ID. On PostgreSQL
+    that ID is read together with the transactions in progress, and this
+    waits until all of them have ended. SQLite commits one writer at a time,
+    so its highest visible ID already is a watermark.
+
+    Args:
+        table: Key of TABLES
+        timeout: Seconds to wait for transactions in progress
+
+    Raises:
+        TimeoutError: A transaction that was in progress is still open after ``timeout``
+    """
+    highest = db.func.coalesce(db.func.max(TABLES[table]['watermark']), 0)
+    if db.engine.dialect.name != 'postgresql':
+        return db.session.execute(db.select(highest)).scalar()
+
+    watermark, snapshot = db.session.execute(
+        db.select(highest, db.cast(db.func.txid_current_snapshot(), db.Text))
+    ).one()
+    # Every transaction in progress at ``snapshot`` has a lower xid than its xmax
+    finished = db.text(
+        "SELECT txid_snapshot_xmin(txid_current_snapshot()) >= txid_snapshot_xmax(CAST(:snapshot AS txid_snapshot))"
+    )
+    deadline = time.monotonic() + timeout
+    while not db.session.execute(finished, {'snapshot': snapshot}).scalar():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Transactions in progress since {snapshot} are still open; {table} has no safe watermark")
+        time.sleep(0.1)
+    return watermark
+
+
+def export_table(table: str, path: str, since: Optional[int], until: int,
+                 file_format: str = 'parquet', compression: str = 'zstd', batch_size: int = 10000) -> int:
+    """
+    Stream one table into a columnar file. Must run inside an app context.
+
+    Args:
+        table: Key of TABLES
+        path: Output file
+        since: Only rows with a higher ``id`` (None for all rows)
+        until: Only rows with this ``id`` or lower, a watermark from id_watermark
+        file_format: 'parquet' or 'arrow'
+        compression: Codec name understood by pyarrow ('zstd', 'lz4', 'snappy', 'none', ...)
+        batch_size: Rows fetched and written per record batch
+
+    Returns:
+        Number of rows written
+    """
+    spec = TABLES[table]
+    watermark = spec['watermark']
+    query = spec['query']().where(watermark <= until)
+    if since is not None:
+        query = query.where(watermark > since)
+
+    schema = spec['schema']
+    writer = _Writer(path, schema, file_format, compression)
+    count = 0
+    try:
+        # yield_per streams through a server-side cursor on PostgreSQL instead of buffering the table
+        result = db.session.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            rows = spec['rows'](partition) if spec['rows'] else partition
+            columns = list(zip(*rows))
+            if not columns:
+                continue
+            writer.write(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            count += len(columns[0])
+    finally:
+        # Closing without any batch still leaves a valid file carrying the schema
+        writer.close()
+    return count
+
+
+def create_snapshot(config, incremental: bool = False, file_format: str = None,
+                    tables: List[str] = None) -> Dict:
+    """
+    Write a new snapshot of the presentation tables and record it in the manifest.
+
+    Args:
+        config: App config holding the EXPORT_* settings
+        incremental: Export only rows newer than the previous snapshot's watermarks
+            (falls back to a full snapshot when there is none)
+        file_format: 'parquet' or 'arrow' (default EXPORT_FORMAT)
+        tables: Subset of TABLES to export (default all)
+
+    Returns:
+        dict: The manifest entry of the new snapshot
+    """
+    export_dir = config.get('EXPORT_DIR', '/tmp/exports')
+    file_format = file_format or config.get('EXPORT_FORMAT', 'parquet')
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{file_format}' (expected one of {', '.join(FORMATS)})")
+    tables = tables or list(TABLES)
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+    os.makedirs(export_dir, exist_ok=True)
+
+    manifest = read_manifest(export_dir)
+    previous = {}
+    for snapshot in manifest['snapshots']:
+        for table, entry in snapshot['tables'].items():
+            previous[table] = entry['watermark']
+
+    now = datetime.utcnow()
+    kind = 'incremental' if incremental and previous else 'full'
+    snapshot_id = f"{now.strftime('%Y%m%dT%H%M%SZ')}-{kind}"
+    taken = {snapshot['id'] for snapshot in manifest['snapshots']}
+    suffix = 1
+    while snapshot_id in taken or os.path.exists(os.path.join(export_dir, snapshot_id)):
+        suffix += 1
+        snapshot_id = f"{now.strftime('%Y%m%dT%H%M%SZ')}-{kind}-{suffix}"
+    directory = os.path.join(export_dir, snapshot_id)
+    tmp_directory = os.path.join(export_dir, f'.{snapshot_id}.tmp')
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    entry = {'id': snapshot_id, 'kind': kind, 'format': file_format, 'created_at': now.isoformat(), 'tables': {}}
+    try:
+        for table in tables:
+            since = None
+            # Snapshots taken before watermarks were IDs recorded timestamps; those tables start over
+            if kind == 'incremental' and isinstance(previous.get(table), int):
+                since = previous[table]
+            until = id_watermark(table, timeout=config.get('EXPORT_WATERMARK_WAIT_SECONDS', 60))
+            filename = f'{table}{FORMATS[file_format]}'
+            rows = export_table(
+                table, os.path.join(tmp_directory, filename), since, until, file_format=file_format,
+                compression=config.get('EXPORT_COMPRESSION', 'zstd'),
+                batch_size=config.get('EXPORT_BATCH_SIZE', 10000)
+            )
+            entry['tables'][table] = {
+                'file': filename,
+                'rows': rows,
+                'since': since,
+                'watermark': until,
+                'bytes': os.path.getsize(os.path.join(tmp_directory, filename))
+            }
+            logger.info(f"Exported {rows} rows of {table} to {snapshot_id}")
+        os.replace(tmp_directory, directory)
+    except Exception:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+
+    manifest['snapshots'].append(entry)
+    _write_manifest(export_dir, manifest)
+    return entry
@@ -0,0 +1,300 @@
+"""Per-file and global aggregates for the dashboard, maintained incrementally
+
+The dashboard needs slide, URL, domain and text totals that would otherwise
+take joins across presentation_files, presentation_slides and slide_urls on
+every page view. Instead, ingest and delete adjust four summary tables in
+the same transaction as the rows they describe:
+
+- file_summaries: one row per file
+- file_domains: URLs per (file, domain)
+- domain_summaries: URLs and files per domain across all uploads
+- summary_totals: a single row of global totals
+
+The totals row is updated first, so concurrent ingests and deletes queue on
+its row lock until the holder commits. That makes the "is this domain new"
+check exact without a table lock, at the cost of serializing the end of each
+ingest transaction. The same code runs on SQLite and PostgreSQL, where a
+materialized view would only exist on PostgreSQL and would be refreshed by
+recomputing everything.
+
+rebuild_summaries() recomputes everything from the base tables. It runs
+automatically the first time the app starts against a database without
+summaries, and scripts/build_summaries.py runs it on demand.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import logging
+
+from sqlalchemy import bindparam, func
+from sqlalchemy.exc import IntegrityError
+
+from models import (db, PresentationFile, PresentationSlide, SlideText, SlideUrl,
+                    FileSummary, FileDomain, DomainSummary, SummaryTotals)
+from utils.parse_result import ParsedSlide
+
+logger = logging.getLogger(__name__)
+
+TOTALS_ID = 1
+
+
+def url_domain(url: str) -> Optional[str]:
+    """Lowercased host of a URL, or None for links without one (mailto:, relative paths)"""
+    try:
+        host = urlsplit(url.strip()).hostname
+    except ValueError:
+        return None
+    return host[:255] if host else None
+
+
+def _adjust_totals(now: datetime, last_upload_at: Optional[datetime] = None, session=None, **deltas) -> None:
+    """Add ``deltas`` to the totals row, creating it if missing; takes the row lock"""
+    session = session or db.session
+    table = SummaryTotals.__table__
+    values = {name: getattr(table.c, name) + delta for name, delta in deltas.items()}
+    values['updated_at'] = now
+    if last_upload_at is not None:
+        values['last_upload_at'] = last_upload_at
+    updated = session.execute(table.update().where(table.c.id == TOTALS_ID).values(**values)).rowcount
+    if not updated:
+        session.execute(table.insert().values(id=TOTALS_ID, updated_at=now, last_upload_at=last_upload_at, **deltas))
+
+
+def _adjust_domains(counts: Dict[str, int], sign: int, files: Optional[Dict[str, int]] = None, session=None) -> int:
+    """
+    Add (sign=1) or remove (sign=-1) URL counts per domain.
+
+    ``files`` holds the number of files behind each domain's count when
+    several are removed at once; by default the counts belong to one file.
+
+    Returns:
+        Change in the number of distinct domains
+    """
+    if not counts:
+        return 0
+    session = session or db.session
+    files = files or {}
+    table = DomainSummary.__table__
+    existing = set(session.execute(
+        db.select(table.c.domain).where(table.c.domain.in_(list(counts)))
+    ).scalars())
+    rows = [{'b_domain': domain, 'b_urls': sign * count, 'b_files': sign * files.get(domain, 1)}
+            for domain, count in counts.items() if domain in existing]
+    if rows:
+        session.execute(
+            table.update().where(table.c.domain == bindparam('b_domain')).values(
+                url_count=table.c.url_count + bindparam('b_urls'),
+                file_count=table.c.file_count + bindparam('b_files')
+            ),
+            rows
+        )
+    if sign > 0:
+        new = [{'domain': domain, 'url_count': count, 'file_count': 1}
+               for domain, count in counts.items() if domain not in existing]
+        if new:
+            session.execute(table.insert(), new)
+        return len(new)
+    return -session.execute(
+        table.delete().where(table.c.domain.in_(list(counts)), table.c.file_count <= 0)
+    ).rowcount
+
+
+def record_ingest(presentation_file: PresentationFile, slides_data: List[ParsedSlide]) -> None:
+    """Add a freshly ingested file to the summaries (in the caller's transaction)"""
+    now = datetime.utcnow()
+    domains = Counter(
+        domain for slide in slides_data for link in slide.urls for domain in (url_domain(link.url),) if domain
+    )
+    url_count = sum(slide.url_count for slide in slides_data)
+    text_chars = sum(len(slide.text) for slide in slides_data)
+
+    # Lock the totals row before reading domain_summaries (see module docstring)
+    _adjust_totals(now, last_upload_at=presentation_file.uploaded_at or now, file_count=1,
+                   slide_count=len(slides_data), url_count=url_count, text_chars=text_chars)
+    new_domains = _adjust_domains(domains, 1)
+    if new_domains:
+        _adjust_totals(now, domain_count=new_domains)
+
+    if domains:
+        db.session.execute(FileDomain.__table__.insert(), [
+            {'file_id': presentation_file.id, 'domain': domain, 'url_count': count}
+            for domain, count in domains.items()
+        ])
+    db.session.execute(FileSummary.__table__.insert().values(
+        file_id=presentation_file.id,
+        original_filename=presentation_file.original_filename,
+        uploaded_at=presentation_file.uploaded_at,
+        slide_count=len(slides_data),
+        url_count=url_count,
+        domain_count=len(domains),
+        text_chars=text_chars,
+        updated_at=now
+    ))
+
+
+def record_delete(file_id: int) -> None:
+    """Remove a file from the summaries before its rows are deleted (in the caller's transaction)"""
+    record_bulk_delete(db.session, [file_id])
+
+
+def record_bulk_delete(session, file_ids) -> int:
+    """
+    Remove many files from the summaries at once, e.g. before retention deletes them.
+
+    Args:
+        session: Session or connection whose transaction also deletes the files
+        file_ids: IDs of the files being deleted, or a select of them
+
+    Returns:
+        Number of file summaries removed
+    """
+    removed = session.execute(
+        db.select(func.count(), func.coalesce(func.sum(FileSummary.slide_count), 0),
+                  func.coalesce(func.sum(FileSummary.url_count), 0), func.coalesce(func.sum(FileSummary.text_chars), 0))
+        .where(FileSummary.file_id.in_(file_ids))
+    ).one()
+    file_count, slide_count, url_count, text_chars = (int(value) for value in removed)
+    if not file_count:
+        return 0
+    now = datetime.utcnow()
+    _adjust_totals(now, session=session, file_count=-file_count, slide_count=-slide_count,
+                   url_count=-url_count, text_chars=-text_chars)
+    rows = session.execute(
+        db.select(FileDomain.domain, func.sum(FileDomain.url_count), func.count())
+        .where(FileDomain.file_id.in_(file_ids)).group_by(FileDomain.domain)
+    ).all()
+    gone = _adjust_domains({domain: urls for domain, urls, _ in rows}, -1,
+                           files={domain: files for domain, _, files in rows}, session=session)
+    if gone:
+        _adjust_totals(now, session=session, domain_count=gone)
+    session.execute(FileDomain.__table__.delete().where(FileDomain.file_id.in_(file_ids)))
+    session.execute(FileSummary.__table__.delete().where(FileSummary.file_id.in_(file_ids)))
+    return file_count
+
+
+def reset_summaries() -> None:
+    """Empty the summaries, e.g. when every presentation is deleted (in the caller's transaction)"""
+    for model in (FileDomain, FileSummary, DomainSummary):
+        db.session.execute(model.__table__.delete())
+    db.session.execute(SummaryTotals.__table__.delete())
+    db.session.execute(SummaryTotals.__table__.insert().values(id=TOTALS_ID, updated_at=datetime.utcnow()))
+
+
+def rebuild_summaries(batch_size: int = 10000) -> Dict:
+    """
+    Recompute every summary from the base tables (in the caller's transaction).
+
+    The totals row is written first, so a concurrent rebuild or ingest waits
+    for this one to commit.
+
+    Returns:
+        The new totals
+    """
+    now = datetime.utcnow()
+    db.session.execute(SummaryTotals.__table__.delete())
+    db.session.execute(SummaryTotals.__table__.insert().values(id=TOTALS_ID, updated_at=now))
+    for model in (FileDomain, FileSummary, DomainSummary):
+        db.session.execute(model.__table__.delete())
+
+    slides = dict(db.session.execute(
+        db.select(PresentationSlide.file_id, func.count()).group_by(PresentationSlide.file_id)
+    ).all())
+    chars = dict(db.session.execute(
+        db.select(PresentationSlide.file_id, func.sum(func.coalesce(SlideText.length, func.length(PresentationSlide.inline_text), 0)))
+        .outerjoin(SlideText, PresentationSlide.text_hash == SlideText.hash)
+        .group_by(PresentationSlide.file_id)
+    ).all())
+
+    # Domains need URL parsing, so URLs are streamed; old rows only reach their file through the slide
+    file_domains = Counter()
+    urls = Counter()
+    url_rows = db.session.execute(
+        db.select(func.coalesce(SlideUrl.file_id, PresentationSlide.file_id), SlideUrl.url)
+        .outerjoin(PresentationSlide, SlideUrl.slide_id == PresentationSlide.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for file_id, url in url_rows:
+        urls[file_id] += 1
+        domain = url_domain(url)
+        if domain and file_id is not None:
+            file_domains[file_id, domain] += 1
+
+    domains = Counter()
+    domain_files = Counter()
+    per_file_domains = Counter()
+    for (file_id, domain), count in file_domains.items():
+        domains[domain] += count
+        domain_files[domain] += 1
+        per_file_domains[file_id] += 1
+
+    files = db.session.execute(
+        db.select(PresentationFile.id, PresentationFile.original_filename, PresentationFile.uploaded_at)
+    ).all()
+    summaries = [{
+        'file_id': file_id,
+        'original_filename': original_filename,
+        'uploaded_at': uploaded_at,
+        'slide_count': slides.get(file_id, 0),
+        'url_count': urls.get(file_id, 0),
+        'domain_count': per_file_domains.get(file_id, 0),
+        'text_chars': int(chars.get(file_id) or 0),
+        'updated_at': now
+    } for file_id, original_filename, uploaded_at in files]
+
+    for table, rows in (
+        (FileSummary.__table__, summaries),
+        (FileDomain.__table__, [{'file_id': f, 'domain': d, 'url_count': c} for (f, d), c in file_domains.items()]),
+        (DomainSummary.__table__, [{'domain': d, 'url_count': c, 'file_count': domain_files[d]} for d, c in domains.items()])
+    ):
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(table.insert(), rows[start:start + batch_size])
+
+    totals = {
+        'file_count': len(files),
+        'slide_count': sum(slides.values()),
+        'url_count': sum(urls.values()),
+        'domain_count': len(domains),
+        'text_chars': int(sum(value or 0 for value in chars.values())),
+        'last_upload_at': max((uploaded_at for _, _, uploaded_at in files if uploaded_at), default=None)
+    }
+    db.session.execute(SummaryTotals.__table__.update().where(SummaryTotals.id == TOTALS_ID).values(**totals))
+    return totals
+
+
+def dashboard(session, files: int = 10, domains: int = 10) -> Dict:
+    """Totals, most recent files and most linked domains; a fixed number of indexed lookups"""
+    totals = session.get(SummaryTotals, TOTALS_ID)
+    recent = session.query(FileSummary).order_by(FileSummary.uploaded_at.desc()).limit(files).all()
+    top_domains = session.query(DomainSummary).order_by(DomainSummary.url_count.desc()).limit(domains).all()
+    return {
+        'totals': totals.to_dict() if totals is not None else None,
+        'recent_files': [summary.to_dict() for summary in recent],
+        'top_domains': [domain.to_dict() for domain in top_domains]
+    }
+
+
+def file_summary(session, file_id: int) -> Optional[Dict]:
+    """One file's aggregates with its URLs per domain, most linked first"""
+    summary = session.get(FileSummary, file_id)
+    if summary is None:
+        return None
+    file_domains = session.query(FileDomain).filter(FileDomain.file_id == file_id) \
+        .order_by(FileDomain.url_count.desc(), FileDomain.domain).all()
+    return {**summary.to_dict(), 'domains': [domain.to_dict() for domain in file_domains]}
+
+
+def init_summaries(app):
+    """Build the summaries once for a database that has none yet (e.g. right after upgrading)"""
+    with app.app_context():
+        if db.session.get(SummaryTotals, TOTALS_ID) is not None:
+            return
+        try:
+            totals = rebuild_summaries()
+            db.session.commit()
+        except IntegrityError:
+            # Another worker built them first
+            db.session.rollback()
+            return
+        logger.info(f"Built dashboard summaries: {totals['file_count']} files, {totals['slide_count']} slides, "
+                    f"{totals['url_count']} URLs")